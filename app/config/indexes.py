@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import sys
+from typing import Any, Dict, List
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from app.config.setting import settings
+
+logger = logging.getLogger(__name__)
+
+
+def declared_indexes() -> Dict[str, List[IndexModel]]:
+    """
+    Indexes the application relies on, per collection.
+
+    Keep this in sync with the queries in the services: every hot query should
+    be able to use one of these instead of falling back to a COLLSCAN.
+    """
+    return {
+        "transactions": [
+            # Dedupe lookup di handle_image / handle_text_message
+            IndexModel(
+                [("date", ASCENDING), ("time", ASCENDING), ("amount", ASCENDING)],
+                name="date_time_amount"
+            ),
+            # get_transactions dan pipeline stats: phone_number + rentang date.
+            # is_deleted ikut di belakang supaya filter {"$ne": True} bisa
+            # dievaluasi dari index tanpa membaca dokumen.
+            IndexModel(
+                [("phone_number", ASCENDING), ("date", ASCENDING), ("is_deleted", ASCENDING)],
+                name="phone_date_deleted"
+            ),
+            # Keyset pagination get_transactions: sort (date, _id) menurun
+            IndexModel(
+                [("phone_number", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)],
+                name="phone_date_id"
+            ),
+        ],
+        "chats": [
+            # get_last_message: find({phone_number}).sort(timestamp, -1)
+            IndexModel(
+                [("phone_number", ASCENDING), ("timestamp", DESCENDING)],
+                name="phone_timestamp"
+            ),
+        ],
+        "users": [
+            # upsert_user_stats by phone_number
+            IndexModel([("phone_number", ASCENDING)], name="phone_unique", unique=True),
+        ],
+        "transaction_rollups": [
+            # Summary tanpa filter bulan membaca semua rollup milik user
+            IndexModel([("phone_number", ASCENDING), ("month", ASCENDING)], name="phone_month"),
+        ],
+        "ocr_cache": [
+            IndexModel(
+                [("created_at", ASCENDING)],
+                name="created_at_ttl",
+                expireAfterSeconds=settings.ocr_cache_ttl_seconds
+            ),
+        ],
+        "webhook_messages": [
+            # _id adalah WhatsApp message ID (unik); dokumen kedaluwarsa lewat TTL
+            IndexModel(
+                [("created_at", ASCENDING)],
+                name="created_at_ttl",
+                expireAfterSeconds=settings.webhook_idempotency_ttl_seconds
+            ),
+        ],
+        "jobs": [
+            # Hanya job yang masih pending yang perlu dicari saat startup
+            IndexModel(
+                [("created_at", ASCENDING)],
+                name="pending_created_at",
+                partialFilterExpression={"status": "pending"}
+            ),
+        ],
+    }
+
+
+async def ensure_indexes(db):
+    """
+    Idempotently create all declared indexes.
+
+    Existing indexes with the same definition are a no-op. A conflicting
+    definition is logged and skipped so one bad index does not block startup.
+    """
+    for collection_name, models in declared_indexes().items():
+        collection = db[collection_name]
+        for model in models:
+            name = model.document["name"]
+            try:
+                await collection.create_indexes([model])
+            except OperationFailure as e:
+                logger.error(f"Could not create index {collection_name}.{name}: {e}")
+        logger.info(f"Indexes ensured for '{collection_name}'")
+
+
+def representative_queries() -> Dict[str, Dict[str, Any]]:
+    """Hot queries from the services, used to check index coverage with explain."""
+    date_range = {"$gte": "2025-01-01", "$lt": "2025-02-01"}
+    return {
+        "transactions.dedupe": {
+            "collection": "transactions",
+            "filter": {"date": "2025-01-01", "time": "10:00", "amount": 25000},
+        },
+        "transactions.by_month": {
+            "collection": "transactions",
+            "filter": {"phone_number": "0@c.us", "date": date_range},
+        },
+        "transactions.stats": {
+            "collection": "transactions",
+            "pipeline": [
+                {"$match": {"phone_number": "0@c.us", "date": date_range, "is_deleted": {"$ne": True}}},
+                {"$group": {"_id": "$type", "total": {"$sum": "$amount"}}},
+            ],
+        },
+        "chats.last_messages": {
+            "collection": "chats",
+            "filter": {"phone_number": "0@c.us"},
+            "sort": [("timestamp", DESCENDING)],
+            "limit": 5,
+        },
+        "users.by_phone": {
+            "collection": "users",
+            "filter": {"phone_number": "0@c.us"},
+        },
+    }
+
+
+def _has_collscan(plan: Any) -> bool:
+    if isinstance(plan, dict):
+        if plan.get("stage") == "COLLSCAN":
+            return True
+        return any(_has_collscan(v) for v in plan.values())
+    if isinstance(plan, list):
+        return any(_has_collscan(v) for v in plan)
+    return False
+
+
+async def report_collscans(db) -> List[str]:
+    """
+    Run ``explain`` on the representative queries and return the names of the
+    ones whose winning plan still contains a COLLSCAN.
+    """
+    collscans = []
+    for name, query in representative_queries().items():
+        collection = db[query["collection"]]
+        try:
+            if "pipeline" in query:
+                plan = await db.command(
+                    "explain",
+                    {"aggregate": query["collection"], "pipeline": query["pipeline"], "cursor": {}},
+                    verbosity="queryPlanner"
+                )
+            else:
+                cursor = collection.find(query["filter"])
+                if "sort" in query:
+                    cursor = cursor.sort(query["sort"])
+                if "limit" in query:
+                    cursor = cursor.limit(query["limit"])
+                plan = await cursor.explain()
+        except OperationFailure as e:
+            logger.error(f"Explain failed for {name}: {e}")
+            continue
+
+        if _has_collscan(plan):
+            logger.warning(f"Query '{name}' falls back to COLLSCAN")
+            collscans.append(name)
+    return collscans
+
+
+async def _main(argv: List[str]):
+    from app.config.mongodb import mongodb
+
+    await mongodb.init_db()
+    try:
+        await ensure_indexes(mongodb.db)
+        if "--explain" in argv:
+            collscans = await report_collscans(mongodb.db)
+            print("COLLSCAN queries:", ", ".join(collscans) if collscans else "none")
+    finally:
+        mongodb.close()
+
+
+if __name__ == "__main__":
+    # python -m app.config.indexes [--explain]
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(sys.argv[1:]))
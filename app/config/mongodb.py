@@ -1,4 +1,3 @@
-from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 from app.config.setting import settings
 import logging
@@ -14,6 +13,8 @@ class MongoDB:
         self.db_name = db_name
 
     async def init_db(self):
+        from motor.motor_asyncio import AsyncIOMotorClient
+
         # Create connection to MongoDB using the connection string
         self.client = AsyncIOMotorClient(self.uri)
         # Extracting database name from URI and sanitize it
@@ -1,5 +1,4 @@
 from pydantic_settings import BaseSettings
-import os
 
 class Settings(BaseSettings):
     app_name: str
@@ -9,6 +8,9 @@ class Settings(BaseSettings):
     frontend_base_url: str
     whatsapp_api_url: str
     whatsapp_session: str
+    whatsapp_timeout: float = 10.0
+    whatsapp_max_retries: int = 3
+    whatsapp_max_connections: int = 20
     allowed_origins: str
     
     @property
@@ -20,20 +22,108 @@ class Settings(BaseSettings):
     cloudinary_api_key: str
     cloudinary_api_secret: str
     cloudinary_folder: str
+
+    # Image storage & deferred uploads
+    image_storage_backend: str = "cloudinary"  # "cloudinary" atau "local"
+    image_storage_local_root: str = "./uploads"
+    image_storage_local_base_url: str = ""
+    image_upload_deferred: bool = True
+    image_upload_workers: int = 4
+    image_upload_queue_size: int = 100
+    image_upload_max_attempts: int = 3
     
     # MongoDB settings
     mongo_db_name: str
     mongo_uri: str
+    mongo_explain_on_startup: bool = False
+    write_behind_enabled: bool = True
+    write_behind_max_batch: int = 200
+    write_behind_flush_interval: float = 0.25
+    write_behind_max_pending: int = 10_000
     
     # Azure OCR settings
     azure_ocr_endpoint: str
     azure_ocr_key: str
+    azure_ocr_timeout: float = 30.0
+    azure_ocr_max_concurrency: int = 8
+    azure_ocr_poll_initial: float = 0.25
+    azure_ocr_poll_max: float = 2.0
+
+    # LLM client settings
+    llm_max_concurrency: int = 8
+    llm_timeout: float = 60.0
+    llm_batch_enabled: bool = True
+    llm_batch_max_size: int = 8
+    # Maksimum tunggu struk lain dari sender yang sama; struk tunggal tidak menunggu
+    llm_batch_window: float = 0.3
+    llm_structured_output: bool = True
+
+    # Balasan struk: "template" dirender lokal, "llm" memakai ringkasan LLM
+    reply_mode: str = "template"
+    reply_language: str = "id"  # "id" atau "en"
+    reply_max_items: int = 5
+
+    # Idempotency webhook per WhatsApp message ID
+    webhook_idempotency_ttl_seconds: int = 3 * 24 * 3600
+    webhook_idempotency_lease_seconds: float = 600.0
+
+    # Fast-path parser: pesan sederhana tidak dikirim ke LLM
+    fast_parser_enabled: bool = True
+    fast_parser_min_confidence: float = 0.75
+    # Zona waktu pengguna untuk "hari ini"/"kemarin" dan tanggal default transaksi
+    timezone: str = "Asia/Jakarta"
+
+    # Chat history ring buffer
+    chat_history_turns: int = 5
+    chat_history_max_senders: int = 5000
+    chat_history_ttl_seconds: float = 1800.0
+    chat_history_token_budget: int = 800
+
+    # Intent classifier; path kosong berarti pakai keyword default / tanpa model.
+    # Model Naive Bayes opsional (tidak aktif secara default); di bawah ambang 0.95
+    # fallback-nya menurunkan akurasi di benchmarks/bench_intent.py
+    intent_keywords_path: str = ""
+    intent_model_path: str = ""
+    intent_model_min_probability: float = 0.95
+
+    # OCR engine settings
+    ocr_engine: str = "azure"  # "azure", "local" atau "auto"
+    ocr_local_backend: str = "easyocr"  # "easyocr" atau "tesseract"
+    ocr_local_workers: int = 1
+    ocr_local_max_bytes: int = 300_000
+    ocr_azure_max_in_flight: int = 8
+    ocr_min_confidence: float = 0.6
+
+    # Image preprocessing settings (sebelum OCR dan upload)
+    image_preprocess_enabled: bool = False
+    image_preprocess_grayscale: bool = True
+    image_preprocess_max_long_edge: int = 1600
+    image_preprocess_format: str = "JPEG"  # "JPEG" atau "WEBP"
+    image_preprocess_quality: int = 80
+    image_preprocess_workers: int = 2
+
+    # OCR result cache settings
+    ocr_cache_max_entries: int = 512
+    ocr_cache_ttl_seconds: int = 30 * 24 * 3600
+
+    # Stats cache settings
+    stats_cache_backend: str = "memory"  # "memory" atau "redis"
+    stats_cache_redis_url: str = "redis://localhost:6379/0"
+    stats_cache_ttl_seconds: int = 300
+    stats_cache_max_entries: int = 2048
+
+    # Background job queue settings
+    job_queue_workers: int = 4
+    job_queue_maxsize: int = 1000
+    job_queue_max_attempts: int = 1
+    job_queue_backend: str = "memory"  # "memory" atau "mongo"
+
+    # Token operator untuk /api/metrics; kosong berarti endpoint dimatikan
+    metrics_token: str = ""
 
     class Config:
         env_file = "../../.env"
         case_sensitive = False
 
 settings = Settings()
-print("Loaded from .env →", os.getenv("MONGO_DB_NAME"))       # Langsung dari os
-print("Loaded from settings →", settings.mongo_db_name)       # Dari Pydantic
 
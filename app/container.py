@@ -0,0 +1,160 @@
+import asyncio
+import logging
+from typing import Optional
+from fastapi import Request
+from app.config.indexes import ensure_indexes, report_collscans
+from app.config.mongodb import mongodb
+from app.config.setting import settings
+from app.domains.auth.jwt_service import JWTService
+from app.domains.otp.otp_service import OTPService
+from app.domains.transactions.jobs import WebhookJobHandlers
+from app.domains.transactions.services import TransactionService
+from app.domains.transactions.stats_cache import stats_cache, create_backend as create_stats_cache_backend
+from app.domains.users.service import UserService
+from app.shared.job_queue import JobQueue, InMemoryJobBackend, MongoJobBackend
+from app.shared.whatsapp_service import WhatsAppAPI, AsyncWhatsAppAPI
+from app.shared.write_behind import write_behind
+
+logger = logging.getLogger(__name__)
+
+WHATSAPP_ENDPOINTS = {
+    "send_message": "/client/sendMessage/",
+    "status_typing": "/chat/sendStateTyping/",
+    "status_recording": "/chat/sendStateRecording/",
+    "download_media": "/message/downloadMedia/",
+}
+
+
+class Container:
+    """
+    Process-wide services, built once per worker and shared through
+    ``Depends``. ``startup``/``shutdown`` run from the FastAPI lifespan.
+
+    ``TransactionService`` is cheap to construct; its LLM chains and OCR
+    engine are built on first use or by the background ``warm_up`` task
+    started at the end of ``startup``, so the worker accepts requests
+    without waiting for them.
+    """
+
+    def __init__(self):
+        self.jwt_service = JWTService()
+        self.whatsapp_api: Optional[WhatsAppAPI] = None
+        self.async_whatsapp_api: Optional[AsyncWhatsAppAPI] = None
+        self.user_service: Optional[UserService] = None
+        self.otp_service: Optional[OTPService] = None
+        self.job_queue: Optional[JobQueue] = None
+        self._transaction_service: Optional[TransactionService] = None
+        self._warm_up: Optional[asyncio.Task] = None
+
+    @property
+    def warm(self) -> bool:
+        return self._warm_up is not None and self._warm_up.done()
+
+    @property
+    def transaction_service(self) -> TransactionService:
+        if self._transaction_service is None:
+            self._transaction_service = TransactionService()
+        return self._transaction_service
+
+    async def startup(self):
+        self.whatsapp_api = WhatsAppAPI(settings.whatsapp_api_url, settings.whatsapp_session, WHATSAPP_ENDPOINTS)
+        self.async_whatsapp_api = AsyncWhatsAppAPI(
+            settings.whatsapp_api_url,
+            settings.whatsapp_session,
+            WHATSAPP_ENDPOINTS,
+            timeout=settings.whatsapp_timeout,
+            max_retries=settings.whatsapp_max_retries,
+            max_connections=settings.whatsapp_max_connections
+        )
+
+        # Initialize MongoDB connection
+        try:
+            await mongodb.init_db()
+            # Perkiraan dari metadata koleksi; count_documents({}) memindai seluruh koleksi
+            count = await mongodb.db.transactions.estimated_document_count()
+            logger.info(f"MongoDB connected. About {count} documents in 'transactions' collection.")
+            await ensure_indexes(mongodb.db)
+            if settings.mongo_explain_on_startup:
+                await report_collscans(mongodb.db)
+        except Exception as e:
+            logger.error(f"MongoDB connection failed: {str(e)}")
+            raise
+
+        stats_cache.configure(create_stats_cache_backend())
+        if settings.write_behind_enabled:
+            await write_behind.start()
+
+        self.user_service = UserService()
+        self.otp_service = OTPService(self.whatsapp_api)
+
+        # Upload gambar struk di background; dimulai sebelum job queue yang memakainya
+        if settings.image_upload_deferred:
+            await self.transaction_service.upload_queue.start()
+
+        # Background job queue untuk memproses pesan webhook
+        if settings.job_queue_backend == "mongo":
+            job_backend = MongoJobBackend(mongodb.db)
+        else:
+            job_backend = InMemoryJobBackend()
+        self.job_queue = JobQueue(
+            workers=settings.job_queue_workers,
+            maxsize=settings.job_queue_maxsize,
+            max_attempts=settings.job_queue_max_attempts,
+            backend=job_backend
+        )
+        WebhookJobHandlers(
+            self.transaction_service,
+            self.async_whatsapp_api,
+            self.user_service,
+            self.jwt_service
+        ).register(self.job_queue)
+        await self.job_queue.start()
+
+        # LLM chain dan model OCR dimuat di background supaya startup tidak tertahan
+        self._warm_up = asyncio.create_task(self._warm_up_services())
+
+    async def _warm_up_services(self):
+        try:
+            await self.transaction_service.warm_up()
+        except Exception as e:
+            logger.error(f"Service warm-up failed: {e}")
+
+    async def shutdown(self):
+        if self._warm_up is not None:
+            self._warm_up.cancel()
+            # Tunggu sampai benar-benar berhenti sebelum OCR/LLM ditutup di bawah
+            await asyncio.gather(self._warm_up, return_exceptions=True)
+        if self.job_queue is not None:
+            await self.job_queue.stop()
+        if self._transaction_service is not None:
+            await self._transaction_service.aclose()
+        # Flush sisa chat log dan user stats sebelum koneksi Mongo ditutup
+        await write_behind.stop()
+        await stats_cache.backend.aclose()
+        if self.async_whatsapp_api is not None:
+            await self.async_whatsapp_api.aclose()
+        mongodb.close()
+
+
+def get_container(request: Request) -> Container:
+    return request.app.state.container
+
+
+def get_transaction_service(request: Request) -> TransactionService:
+    return get_container(request).transaction_service
+
+
+def get_job_queue(request: Request) -> JobQueue:
+    return get_container(request).job_queue
+
+
+def get_jwt_service(request: Request) -> JWTService:
+    return get_container(request).jwt_service
+
+
+def get_otp_service(request: Request) -> OTPService:
+    return get_container(request).otp_service
+
+
+def get_user_service(request: Request) -> UserService:
+    return get_container(request).user_service
@@ -1,11 +1,12 @@
+import hmac
 from fastapi import Request, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.domains.auth.jwt_service import JWTService
+from app.config.setting import settings
+from app.container import get_jwt_service
 
 class JWTAuthMiddleware(HTTPBearer):
     def __init__(self):
         super(JWTAuthMiddleware, self).__init__()
-        self.jwt_service = JWTService()
 
     async def __call__(self, request: Request) -> str:
         credentials: HTTPAuthorizationCredentials = await super(JWTAuthMiddleware, self).__call__(request)
@@ -13,7 +14,8 @@ class JWTAuthMiddleware(HTTPBearer):
         if not credentials:
             raise HTTPException(status_code=403, detail="Invalid authorization code.")
         
-        phone_number = self.jwt_service.verify_token(credentials.credentials)
+        # JWTService dibagikan lewat container aplikasi
+        phone_number = get_jwt_service(request).verify_token(credentials.credentials)
         if not phone_number:
             raise HTTPException(status_code=401, detail="Invalid token or expired token.")
             
@@ -22,4 +24,20 @@ class JWTAuthMiddleware(HTTPBearer):
         if url_phone and url_phone != phone_number:
             raise HTTPException(status_code=403, detail="Unauthorized access to this resource.")
             
-        return phone_number
\ No newline at end of file
+        return phone_number
+
+
+class MetricsTokenAuth(HTTPBearer):
+    """Operator-only bearer token (``METRICS_TOKEN``), separate from the users' JWTs."""
+
+    def __init__(self):
+        super(MetricsTokenAuth, self).__init__(auto_error=False)
+
+    async def __call__(self, request: Request) -> None:
+        # Tanpa token yang dikonfigurasi endpoint tidak ada sama sekali
+        if not settings.metrics_token:
+            raise HTTPException(status_code=404, detail="Not Found")
+
+        credentials = await super(MetricsTokenAuth, self).__call__(request)
+        if not credentials or not hmac.compare_digest(credentials.credentials, settings.metrics_token):
+            raise HTTPException(status_code=401, detail="Invalid metrics token.")
@@ -1,23 +1,23 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Depends, Request
+from app.container import get_otp_service
+from app.domains.otp.otp_service import OTPService
 
 router = APIRouter()
 
 @router.post("/otp")
-def send_otp(phone_number: str, request: Request):
+def send_otp(phone_number: str, otp_service: OTPService = Depends(get_otp_service)):
     """
     Endpoint to send OTP.
     """
-    otp_service = request.app.state.otp_service
     result = otp_service.send_otp(phone_number)
     # Implement the logic to send OTP here
     return {"message": result}
 
 @router.post("/verify")
-async def verify_otp(request: Request):
+async def verify_otp(request: Request, otp_service: OTPService = Depends(get_otp_service)):
     """
     Endpoint to verify OTP.
     """
-    otp_service = request.app.state.otp_service
     result = otp_service.verify_otp(request)
 
     # Implement the logic to verify OTP here
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import Dict, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class BatchExtractor:
+    """
+    Extracts OCR texts of one sender together with a single ``send_batch``
+    call, so a burst of receipts pays the rules prompt once instead of once
+    per receipt.
+
+    Texts are only ever batched with texts of the same ``key`` (the sender's
+    phone number), never across users. ``handle_image`` wraps each receipt
+    in ``receipt(key)``, so the extractor knows how many of the sender's
+    receipts are still in OCR. A text is held for at most ``window``
+    seconds, and only while siblings are still on their way: the batch is
+    sent as soon as every active receipt of the key has arrived, the batch
+    is full, or the window expires. A lone receipt is sent right away.
+    Texts that arrive while a call for the key is in flight are held the
+    same way for the next call.
+
+    ``extract`` returns the same validated dict ``extract_transaction``
+    would. Entries that are missing or fail validation in the batch answer
+    are retried one by one through ``extract_transaction``.
+    """
+
+    def __init__(self, processor, max_batch: int = 8, window: float = 0.3):
+        self.processor = processor
+        self.max_batch = max_batch
+        self.window = window
+        self._pending: Dict[str, List[Tuple[str, asyncio.Future]]] = {}
+        # key -> jumlah teks di call yang sedang berjalan
+        self._in_flight: Dict[str, int] = {}
+        # key -> jumlah struk sender ini yang sedang diproses (lihat receipt())
+        self._active: Dict[str, int] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        # Referensi task disimpan supaya tidak di-garbage-collect saat berjalan
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.batched_items = 0
+        self.single_calls = 0
+        self.fallbacks = 0
+        self.batch_failures = 0
+        self.window_expired = 0
+
+    @contextmanager
+    def receipt(self, key: str):
+        """Mark one receipt of ``key`` as being processed for the duration of the block."""
+        self._active[key] = self._active.get(key, 0) + 1
+        try:
+            yield
+        finally:
+            remaining = self._active[key] - 1
+            if remaining:
+                self._active[key] = remaining
+            else:
+                del self._active[key]
+            # Struk ini gagal/cache hit sebelum extract: jangan tunggu dia lagi
+            self._maybe_dispatch(key)
+
+    async def extract(self, text: str, key: str) -> dict:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(key, []).append((text, future))
+        self._maybe_dispatch(key)
+        return await future
+
+    def _maybe_dispatch(self, key: str):
+        pending = len(self._pending.get(key, ()))
+        if not pending or key in self._in_flight:
+            return
+        # Struk lain dari sender yang sama masih di OCR: tunggu sebentar supaya ikut satu batch
+        expected = self._active.get(key, 0) - self._in_flight.get(key, 0)
+        if pending >= self.max_batch or pending >= expected:
+            self._dispatch(key)
+        elif key not in self._timers:
+            self._timers[key] = asyncio.get_running_loop().call_later(self.window, self._window_expired, key)
+
+    def _window_expired(self, key: str):
+        self._timers.pop(key, None)
+        if self._pending.get(key) and key not in self._in_flight:
+            self.window_expired += 1
+            self._dispatch(key)
+
+    def _dispatch(self, key: str):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        pending = self._pending.pop(key, [])
+        batch, rest = pending[:self.max_batch], pending[self.max_batch:]
+        if rest:
+            self._pending[key] = rest
+        if not batch:
+            return
+        self._in_flight[key] = len(batch)
+        task = asyncio.ensure_future(self._run_key(key, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_key(self, key: str, batch: List[Tuple[str, asyncio.Future]]):
+        try:
+            await self._run(batch)
+        finally:
+            self._in_flight.pop(key, None)
+            # Teks yang masuk selama call berjalan dikirim sebagai batch berikutnya
+            self._maybe_dispatch(key)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]):
+        if len(batch) == 1:
+            self.single_calls += 1
+            await self._single(*batch[0])
+            return
+
+        self.batches += 1
+        self.batched_items += len(batch)
+        try:
+            raw = await self.processor.send_batch([text for text, _ in batch])
+            results = self.processor.output_parser.parse_batch(raw)
+        except Exception as e:
+            # Batch gagal total, semua item diproses satu per satu
+            self.batch_failures += 1
+            logger.error(f"Batch extraction of {len(batch)} texts failed, falling back: {e}")
+            results = {}
+
+        retries = []
+        for index, (text, future) in enumerate(batch):
+            item = results.get(index)
+            if item is not None and not future.done():
+                future.set_result(item)
+            else:
+                self.fallbacks += 1
+                retries.append(self._single(text, future))
+        if retries:
+            await asyncio.gather(*retries)
+
+    async def _single(self, text: str, future: asyncio.Future):
+        try:
+            result = await self.processor.extract_transaction(text)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "batched_items": self.batched_items,
+            "single_calls": self.single_calls,
+            "fallbacks": self.fallbacks,
+            "batch_failures": self.batch_failures,
+            "window_expired": self.window_expired,
+            "avg_batch_size": round(self.batched_items / self.batches, 2) if self.batches else 0.0,
+            "pending": sum(len(batch) for batch in self._pending.values()),
+            "in_flight": sum(self._in_flight.values()),
+            "active_receipts": sum(self._active.values()),
+        }
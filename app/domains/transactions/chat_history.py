@@ -0,0 +1,155 @@
+import copy
+import datetime
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Tuple
+from app.config.mongodb import mongodb
+from app.config.setting import settings
+from app.shared.write_behind import write_behind
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    # Perkiraan kasar ~4 karakter per token, cukup untuk membatasi panjang prompt
+    return len(text) // 4 + 1
+
+
+class ChatHistoryCache:
+    """
+    Per-sender ring buffer of the most recent chat turns.
+
+    Writes go to the buffer and, through the write-behind buffer, to the
+    ``chats`` collection, so building the history for the next LLM call
+    needs no database read. A sender's buffer is warmed from Mongo the first
+    time it is read and again after ``ttl`` seconds (other instances may
+    have written turns). Appends never read Mongo: turns for a cold sender
+    are kept aside and merged into the buffer when it is next warmed, in
+    case the write-behind buffer has not flushed them yet.
+    Buffers are evicted LRU once more than ``max_senders`` are held.
+    """
+
+    collection_name = "chats"
+
+    def __init__(self, turns: int = None, max_senders: int = None, ttl: float = None, token_budget: int = None):
+        self.turns = turns or settings.chat_history_turns
+        self.max_senders = max_senders or settings.chat_history_max_senders
+        self.ttl = ttl if ttl is not None else settings.chat_history_ttl_seconds
+        self.token_budget = token_budget or settings.chat_history_token_budget
+        # phone_number -> (waktu warm, deque[(role, message)])
+        self._buffers: "OrderedDict[str, Tuple[float, Deque[Tuple[str, Any]]]]" = OrderedDict()
+        # phone_number -> deque[(inserted_id, role, message)] untuk sender yang buffer-nya dingin
+        self._unsynced: "OrderedDict[str, Deque[Tuple[Any, str, Any]]]" = OrderedDict()
+
+        self.hits = 0
+        self.warms = 0
+        self.writes = 0
+
+    async def append(self, phone_number: str, role: str, message: Any) -> str:
+        """
+        Record a turn in the sender's buffer and queue its ``chats`` insert
+        on the write-behind buffer; returns the (client-side) id.
+        """
+        if mongodb.db is None:
+            raise Exception("MongoDB not connected")
+
+        # Disalin karena pemanggil bisa mengubah dict hasil transaksi setelah ini,
+        # sementara dokumen chats baru ditulis saat write-behind flush
+        message = copy.deepcopy(message)
+        inserted_id = await write_behind.insert(mongodb.db[self.collection_name], {
+            "phone_number": phone_number,
+            "role": role,  # "user" atau "bot"
+            "message": message,
+            "timestamp": datetime.datetime.utcnow()
+        })
+        self.writes += 1
+
+        buffer = self._fresh(phone_number)
+        if buffer is not None:
+            buffer.append((role, message))
+        else:
+            # Jangan warm di jalur tulis; digabung saat buffer di-warm berikutnya
+            self._buffers.pop(phone_number, None)
+            unsynced = self._unsynced.setdefault(phone_number, deque(maxlen=self.turns))
+            unsynced.append((inserted_id, role, message))
+            self._unsynced.move_to_end(phone_number)
+            while len(self._unsynced) > self.max_senders:
+                self._unsynced.popitem(last=False)
+        return str(inserted_id)
+
+    def _fresh(self, phone_number: str):
+        entry = self._buffers.get(phone_number)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            return entry[1]
+        return None
+
+    async def recent(self, phone_number: str) -> List[Tuple[str, Any]]:
+        """Return up to ``turns`` (role, message) pairs, oldest first."""
+        buffer = self._fresh(phone_number)
+        if buffer is not None:
+            self._buffers.move_to_end(phone_number)
+            self.hits += 1
+        else:
+            buffer = await self._warm(phone_number)
+        return list(buffer)
+
+    async def _warm(self, phone_number: str) -> Deque[Tuple[str, Any]]:
+        if mongodb.db is None:
+            raise Exception("MongoDB not connected")
+
+        cursor = mongodb.db[self.collection_name].find(
+            {"phone_number": phone_number}, {"_id": 1, "role": 1, "message": 1}
+        ).sort("timestamp", -1).limit(self.turns)
+        docs = await cursor.to_list(length=self.turns)
+        buffer = deque(((doc.get("role"), doc.get("message")) for doc in reversed(docs)), maxlen=self.turns)
+        # Turn yang di-append saat buffer dingin dan belum ter-flush ke Mongo
+        stored = {doc["_id"] for doc in docs}
+        for inserted_id, role, message in self._unsynced.pop(phone_number, ()):
+            if inserted_id not in stored:
+                buffer.append((role, message))
+
+        self._buffers[phone_number] = (time.monotonic(), buffer)
+        self._buffers.move_to_end(phone_number)
+        while len(self._buffers) > self.max_senders:
+            self._buffers.popitem(last=False)
+        self.warms += 1
+        return buffer
+
+    async def format(self, phone_number: str, token_budget: int = None) -> str:
+        """
+        Render the recent turns as "User: ..." / "Bot: ..." lines.
+
+        Turns are taken newest first until ``token_budget`` is reached, so
+        a long receipt reply does not crowd out the current message.
+        """
+        budget = token_budget or self.token_budget
+        lines: List[str] = []
+        used = 0
+        for role, message in reversed(await self.recent(phone_number)):
+            text = message if isinstance(message, str) else json.dumps(message, ensure_ascii=False, default=str)
+            line = f"{'User' if role == 'user' else 'Bot'}: {text}"
+            cost = estimate_tokens(line)
+            if used + cost > budget:
+                if lines:
+                    break
+                # Pesan terbaru tetap masuk, dipotong sesuai budget
+                line = line[:budget * 4]
+                cost = budget
+            lines.append(line)
+            used += cost
+        return "\n".join(reversed(lines))
+
+    def invalidate(self, phone_number: str):
+        self._buffers.pop(phone_number, None)
+
+    def stats(self):
+        total = self.hits + self.warms
+        return {
+            "senders": len(self._buffers),
+            "hits": self.hits,
+            "warms": self.warms,
+            "writes": self.writes,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
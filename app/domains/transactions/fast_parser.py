@@ -0,0 +1,346 @@
+import datetime
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from app.domains.transactions.models import Transaction
+
+# Kata kunci kategori, mengikuti aturan di send_text_prompt. Frasa dua kata
+# dicek lebih dulu sehingga "grab food" tidak jatuh ke Transportation.
+CATEGORY_KEYWORDS: Dict[str, List[str]] = {
+    "Groceries": [
+        "alfamart", "indomaret", "alfamidi", "supermarket", "superindo", "hypermart",
+        "lottemart", "sayur", "sayuran", "groceries", "belanja bulanan", "belanja dapur",
+    ],
+    "Food_and_drinks": [
+        "makan", "mkn", "makan siang", "makan malam", "sarapan", "minum", "kopi", "ngopi",
+        "jajan", "snack", "bakso", "nasi", "mie", "gofood", "grabfood", "go food", "grab food",
+        "shopeefood", "lunch", "dinner", "breakfast", "resto", "restoran", "warteg", "cafe",
+    ],
+    "Transportation": [
+        "bensin", "bbm", "pertalite", "pertamax", "solar", "parkir", "tol", "ojek", "ojol",
+        "gojek", "goride", "grab", "grabbike", "taksi", "taxi", "kereta", "krl", "mrt",
+        "busway", "transjakarta", "angkot", "bus", "pesawat", "tiket kereta",
+    ],
+    "Bills": [
+        "listrik", "lstrk", "pln", "token listrik", "internet", "wifi", "indihome", "pulsa",
+        "paket data", "kuota", "pdam", "air pdam", "bpjs", "tagihan", "cicilan", "sewa",
+        "kos", "kost", "iuran", "asuransi",
+    ],
+    "Shopping": [
+        "shopee", "tokopedia", "tokped", "lazada", "baju", "sepatu", "celana", "tas",
+        "skincare", "belanja online",
+    ],
+    "Entertainment": [
+        "steam", "game", "netflix", "spotify", "bioskop", "nonton", "disney", "youtube premium",
+        "karaoke", "konser",
+    ],
+    "Health": ["obat", "apotek", "dokter", "klinik", "rumah sakit", "vitamin", "periksa"],
+    "Education": ["buku", "kursus", "sekolah", "kuliah", "spp", "les", "ukt", "seminar"],
+    "Investment": [
+        "saving", "simpanan", "tabungan", "nabung", "reksadana", "saham", "investasi",
+        "emas", "deposito", "crypto",
+    ],
+    "Salary": ["gaji", "salary", "upah", "gajian"],
+    "Business": ["modal", "usaha", "jualan", "omzet", "dagangan"],
+    "Gift": ["hadiah", "kado", "angpao", "sumbangan", "donasi", "zakat", "sedekah", "infaq"],
+    "Transfer": ["transfer", "tf", "trf"],
+}
+
+INCOME_KEYWORDS = [
+    "gaji", "gajian", "salary", "terima", "diterima", "nerima", "masuk", "pemasukan",
+    "dapat", "dapet", "bonus", "thr", "refund", "cashback", "dividen", "transfer masuk", "tf masuk",
+]
+EXPENSE_KEYWORDS = [
+    "keluar", "pengeluaran", "bayar", "byr", "beli", "bli", "belanja", "jajan", "isi",
+    "topup", "top up", "transfer ke", "tf ke", "kirim",
+]
+TRANSFER_IN_KEYWORDS = ["transfer masuk", "tf masuk"]
+
+UNIT_MULTIPLIERS = {"rb": 1_000, "ribu": 1_000, "k": 1_000, "jt": 1_000_000, "juta": 1_000_000}
+
+MONTHS = {
+    "jan": 1, "januari": 1, "feb": 2, "februari": 2, "mar": 3, "maret": 3, "apr": 4, "april": 4,
+    "mei": 5, "jun": 6, "juni": 6, "jul": 7, "juli": 7, "agu": 8, "agt": 8, "ags": 8,
+    "agustus": 8, "sep": 9, "september": 9, "okt": 10, "oktober": 10, "nov": 11,
+    "november": 11, "des": 12, "desember": 12,
+}
+
+_AMOUNT_RE = re.compile(
+    r"(?<![\w:/])(?P<prefix>rp\.?\s*|idr\s*)?"
+    r"(?P<num>\d{1,3}(?:\.\d{3})+(?:,\d{1,2})?|\d{1,3}(?:,\d{3})+|\d+(?:[.,]\d+)?)"
+    r"\s*(?P<unit>rb|ribu|k|jt|juta)?(?![\w])",
+    re.IGNORECASE
+)
+_THOUSANDS_RE = re.compile(r"^\d{1,3}(?:([.,])\d{3})+(?:,\d{1,2})?$")
+_TIME_RE = re.compile(r"(?:\b(?:jam|pukul|pkl)\s*(\d{1,2})(?:[.:](\d{2}))?\b|\b(\d{1,2}):(\d{2})\b)", re.IGNORECASE)
+_NUMERIC_DATE_RE = re.compile(r"\b(\d{1,2})[/-](\d{1,2})(?:[/-](\d{2,4}))?\b")
+_NAMED_DATE_RE = re.compile(r"\b(?:tgl\.?|tanggal)?\s*(\d{1,2})\s+(" + "|".join(MONTHS) + r")\b(?:\s+(\d{4}))?", re.IGNORECASE)
+_DAY_ONLY_RE = re.compile(r"\b(?:tgl\.?|tanggal)\s*(\d{1,2})\b", re.IGNORECASE)
+_RELATIVE_DAYS = [("kemarin lusa", 2), ("kmrn lusa", 2), ("kemarin", 1), ("kemaren", 1), ("kmrn", 1), ("kmarin", 1), ("hari ini", 0), ("tadi", 0)]
+_RELATIVE_RE = re.compile(r"\b(" + "|".join(re.escape(k) for k, _ in _RELATIVE_DAYS) + r")\b", re.IGNORECASE)
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+def _phrase_index(keywords: Dict[str, List[str]]) -> Dict[str, str]:
+    index = {}
+    for label, words in keywords.items():
+        for word in words:
+            index.setdefault(word, label)
+    return index
+
+
+_CATEGORY_INDEX = _phrase_index(CATEGORY_KEYWORDS)
+_TYPE_INDEX = _phrase_index({"income": INCOME_KEYWORDS, "expense": EXPENSE_KEYWORDS})
+
+
+def _match_phrases(words: List[str], index: Dict[str, str]) -> List[Tuple[str, str]]:
+    """Return (phrase, label) matches, preferring two-word phrases over single words."""
+    matches = []
+    i = 0
+    while i < len(words):
+        bigram = f"{words[i]} {words[i + 1]}" if i + 1 < len(words) else None
+        if bigram in index:
+            matches.append((bigram, index[bigram]))
+            i += 2
+            continue
+        if words[i] in index:
+            matches.append((words[i], index[words[i]]))
+        i += 1
+    return matches
+
+
+def parse_amount(num: str, unit: Optional[str] = None) -> Optional[int]:
+    """
+    Convert an Indonesian amount string to integer IDR.
+
+    Handles "25.000", "25.000,00", "1,500,000", "25000", "1,5" + "jt", "25" + "rb".
+    """
+    thousands = _THOUSANDS_RE.match(num)
+    if thousands:
+        separator = thousands.group(1)
+        if separator == ".":
+            num = num.split(",")[0]
+        value = float(num.replace(separator, ""))
+    else:
+        value = float(num.replace(",", "."))
+    if unit:
+        value *= UNIT_MULTIPLIERS[unit.lower()]
+    return int(round(value))
+
+
+@dataclass
+class ParseResult:
+    transaction: Transaction
+    confidence: float
+
+
+class FastTransactionParser:
+    """
+    Rule-based parser for short transaction messages such as
+    "keluar 25rb makan siang" or "bayar listrik 350.000".
+
+    Returns a ``Transaction`` with a confidence score; callers fall back to
+    the LLM when the score is below ``min_confidence``. Relative dates
+    ("hari ini", "kemarin") and the default date use today in ``timezone``
+    (the users' zone), not the server's.
+    """
+
+    def __init__(self, min_confidence: float = 0.75, timezone: str = "Asia/Jakarta"):
+        self.min_confidence = min_confidence
+        self.timezone = ZoneInfo(timezone)
+        self.accepted = 0
+        self.rejected = 0
+
+    def try_parse(self, text: str, today: datetime.date = None) -> Optional[ParseResult]:
+        """Parse ``text`` and return the result only if it is confident enough."""
+        result = self.parse(text, today)
+        if result is not None and result.confidence >= self.min_confidence:
+            self.accepted += 1
+            return result
+        self.rejected += 1
+        return None
+
+    def stats(self):
+        total = self.accepted + self.rejected
+        return {
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "coverage": round(self.accepted / total, 4) if total else 0.0,
+        }
+
+    def today(self, now: datetime.datetime = None) -> datetime.date:
+        """Current date in the parser's timezone; ``now`` must be timezone-aware."""
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        return now.astimezone(self.timezone).date()
+
+    def parse(self, text: str, today: datetime.date = None) -> Optional[ParseResult]:
+        # Server biasanya UTC; pesan jam 00:00-07:00 WIB harus tetap tanggal hari ini di WIB
+        today = today or self.today()
+        lowered = text.lower()
+        spans: List[Tuple[int, int]] = []
+        confidence = 0.0
+
+        time_str = self._parse_time(lowered, spans)
+        date = self._parse_date(lowered, today, spans)
+
+        amount, amount_confidence = self._parse_amount(lowered, spans)
+        if amount is None:
+            return None
+        confidence += amount_confidence
+
+        words = _WORD_RE.findall(self._mask(lowered, spans))
+        categories = _match_phrases(words, _CATEGORY_INDEX)
+        types = _match_phrases(words, _TYPE_INDEX)
+
+        tx_type = "expense"
+        if types:
+            labels = {label for _, label in types}
+            tx_type = "income" if labels == {"income"} else "expense"
+            confidence += 0.15 if len(labels) == 1 else 0.05
+        else:
+            confidence += 0.05
+
+        category = None
+        note = None
+        if any(phrase in TRANSFER_IN_KEYWORDS for phrase, _ in types):
+            tx_type, category, note = "income", "Transfer in", "Transfer Masuk"
+            confidence += 0.3
+        elif categories:
+            category = self._pick_category(categories)
+            # Transfer keluar butuh nama penerima dan transfer antar rekening
+            # sendiri bertipe "transfer"; keduanya diserahkan ke LLM
+            confidence += 0.0 if category == "Transfer" else 0.3
+        else:
+            category = "Others"
+
+        if category == "Salary":
+            tx_type = "income"
+
+        # Pesan panjang atau berbentuk pertanyaan lebih aman diserahkan ke LLM
+        if "?" in text:
+            confidence -= 0.3
+        if len(words) > 12:
+            confidence -= 0.15
+
+        note = note or self._note(text, spans)
+        transaction = Transaction(
+            type=tx_type,
+            amount=amount,
+            date=date.isoformat(),
+            time=time_str,
+            category=category,
+            note=note,
+            source=None,
+            items=[]
+        )
+        return ParseResult(transaction, round(max(0.0, min(confidence, 1.0)), 3))
+
+    @staticmethod
+    def _overlaps(span: Tuple[int, int], spans: List[Tuple[int, int]]) -> bool:
+        return any(span[0] < end and start < span[1] for start, end in spans)
+
+    @staticmethod
+    def _mask(text: str, spans: List[Tuple[int, int]]) -> str:
+        chars = list(text)
+        for start, end in spans:
+            chars[start:end] = " " * (end - start)
+        return "".join(chars)
+
+    def _parse_time(self, text: str, spans: List[Tuple[int, int]]) -> Optional[str]:
+        match = _TIME_RE.search(text)
+        if not match:
+            return None
+        hour = match.group(1) or match.group(3)
+        minute = match.group(2) or match.group(4) or "00"
+        if int(hour) > 23 or int(minute) > 59:
+            return None
+        spans.append(match.span())
+        return f"{int(hour):02d}:{minute}"
+
+    def _parse_date(self, text: str, today: datetime.date, spans: List[Tuple[int, int]]) -> datetime.date:
+        match = _NAMED_DATE_RE.search(text)
+        if match and not self._overlaps(match.span(), spans):
+            day, month = int(match.group(1)), MONTHS[match.group(2).lower()]
+            year = int(match.group(3)) if match.group(3) else today.year
+            date = self._safe_date(year, month, day)
+            if date:
+                if not match.group(3) and date > today:
+                    date = self._safe_date(year - 1, month, day) or date
+                spans.append(match.span())
+                return date
+
+        match = _NUMERIC_DATE_RE.search(text)
+        if match and not self._overlaps(match.span(), spans):
+            day, month = int(match.group(1)), int(match.group(2))
+            year = match.group(3)
+            year = (int(year) + 2000 if len(year) == 2 else int(year)) if year else today.year
+            date = self._safe_date(year, month, day)
+            if date:
+                if not match.group(3) and date > today:
+                    date = self._safe_date(year - 1, month, day) or date
+                spans.append(match.span())
+                return date
+
+        match = _DAY_ONLY_RE.search(text)
+        if match and not self._overlaps(match.span(), spans):
+            day = int(match.group(1))
+            date = self._safe_date(today.year, today.month, day)
+            if date and date > today:
+                previous = today.replace(day=1) - datetime.timedelta(days=1)
+                date = self._safe_date(previous.year, previous.month, day)
+            if date:
+                spans.append(match.span())
+                return date
+
+        match = _RELATIVE_RE.search(text)
+        if match:
+            spans.append(match.span())
+            offset = dict(_RELATIVE_DAYS)[match.group(1).lower()]
+            return today - datetime.timedelta(days=offset)
+        return today
+
+    @staticmethod
+    def _safe_date(year: int, month: int, day: int) -> Optional[datetime.date]:
+        try:
+            return datetime.date(year, month, day)
+        except ValueError:
+            return None
+
+    def _parse_amount(self, text: str, spans: List[Tuple[int, int]]) -> Tuple[Optional[int], float]:
+        strong, weak = [], []
+        for match in _AMOUNT_RE.finditer(text):
+            if self._overlaps(match.span(), spans):
+                continue
+            num, unit = match.group("num"), match.group("unit")
+            value = parse_amount(num, unit)
+            if not value:
+                continue
+            is_strong = bool(match.group("prefix") or unit or _THOUSANDS_RE.match(num))
+            (strong if is_strong else weak).append((value, match.span()))
+
+        if strong:
+            value, span = strong[0]
+            confidence = 0.45 if len({v for v, _ in strong}) == 1 else 0.25
+        elif weak:
+            value, span = max(weak, key=lambda item: item[0])
+            confidence = 0.3 if value >= 1000 else 0.1
+        else:
+            return None, 0.0
+        spans.append(span)
+        return value, confidence
+
+    @staticmethod
+    def _pick_category(categories: List[Tuple[str, str]]) -> str:
+        counts: Dict[str, int] = {}
+        for _, label in categories:
+            counts[label] = counts.get(label, 0) + 1
+        # Transfer hanya dipilih kalau tidak ada kategori lain yang lebih spesifik
+        if len(counts) > 1:
+            counts.pop("Transfer", None)
+        best = max(counts.values())
+        return next(label for _, label in categories if counts.get(label) == best)
+
+    def _note(self, text: str, spans: List[Tuple[int, int]]) -> str:
+        note = " ".join(self._mask(text, spans).split())
+        return note[:1].upper() + note[1:] if note else None
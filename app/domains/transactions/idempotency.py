@@ -0,0 +1,172 @@
+import asyncio
+import datetime
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.config.mongodb import mongodb
+from app.config.setting import settings
+
+logger = logging.getLogger(__name__)
+
+PROCESSING = "processing"
+DONE = "done"
+FAILED = "failed"
+
+
+class IdempotencyStore:
+    """
+    Processing state per WhatsApp message ID, so gateway retries of the same
+    webhook do not run download, OCR, LLM and upload again.
+
+    Documents live in ``webhook_messages`` with the message ID as ``_id``
+    (unique by definition); the ``created_at`` TTL index in
+    ``app.config.indexes`` expires them. A claim is one atomic upsert on
+    ``_id``. Within this process, concurrent duplicates wait for the first
+    claim to be accepted or released instead of hitting Mongo again.
+    """
+
+    collection_name = "webhook_messages"
+
+    def __init__(self, lease_seconds: float = None):
+        # Claim "processing" yang lebih tua dari lease dianggap worker-nya mati
+        self.lease_seconds = lease_seconds or settings.webhook_idempotency_lease_seconds
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        self.claimed = 0
+        self.duplicates = 0
+        self.waited = 0
+        self.reclaimed = 0
+        self.released = 0
+
+    @asynccontextmanager
+    async def ingest(self, message_id: Optional[str]) -> AsyncIterator[bool]:
+        """
+        Claim ``message_id`` for the duration of the block.
+
+        Yields True when this caller owns the message and should process it,
+        False for a duplicate. If the block raises, the claim is released so
+        the gateway's next retry is accepted.
+        """
+        owner = await self.claim(message_id)
+        try:
+            yield owner
+        except BaseException:
+            if owner:
+                await self.release(message_id)
+            raise
+        else:
+            if owner:
+                self._resolve(message_id, True)
+
+    async def claim(self, message_id: Optional[str]) -> bool:
+        if not message_id or mongodb.db is None:
+            return True
+
+        waited = False
+        while True:
+            pending = self._inflight.get(message_id)
+            if pending is None:
+                break
+            if not waited:
+                self.waited += 1
+                waited = True
+            if await asyncio.shield(pending):
+                self.duplicates += 1
+                return False
+            # Claim pertama dilepas (enqueue gagal), coba claim ulang
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[message_id] = future
+        try:
+            owner = await self._claim_in_db(message_id)
+        except BaseException:
+            self._resolve(message_id, False)
+            raise
+
+        if not owner:
+            self.duplicates += 1
+            self._resolve(message_id, True)
+            return False
+        self.claimed += 1
+        return True
+
+    async def _claim_in_db(self, message_id: str) -> bool:
+        collection = mongodb.db[self.collection_name]
+        now = datetime.datetime.utcnow()
+        try:
+            previous = await collection.find_one_and_update(
+                {"_id": message_id},
+                {"$setOnInsert": {"status": PROCESSING, "created_at": now, "updated_at": now, "attempts": 1}},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE
+            )
+        except DuplicateKeyError:
+            # Upsert bersamaan dari instance lain menang lebih dulu
+            return False
+        if previous is None:
+            return True
+
+        status = previous.get("status")
+        stale = status == PROCESSING and previous.get("updated_at", now) < now - datetime.timedelta(seconds=self.lease_seconds)
+        if status == FAILED or stale:
+            result = await collection.update_one(
+                {"_id": message_id, "status": status, "updated_at": previous.get("updated_at")},
+                {"$set": {"status": PROCESSING, "updated_at": now}, "$inc": {"attempts": 1}}
+            )
+            if result.modified_count == 1:
+                self.reclaimed += 1
+                return True
+        return False
+
+    async def release(self, message_id: Optional[str]):
+        """Drop a claim that never reached the job queue."""
+        if not message_id or mongodb.db is None:
+            return
+        try:
+            await mongodb.db[self.collection_name].delete_one({"_id": message_id, "status": PROCESSING})
+            self.released += 1
+        except Exception as e:
+            logger.error(f"Failed to release idempotency claim {message_id}: {e}")
+        finally:
+            self._resolve(message_id, False)
+
+    async def start(self, message_id: Optional[str]):
+        """Renew the lease when the job actually starts; it may have waited in the queue."""
+        await self._set_status(message_id, PROCESSING)
+
+    async def complete(self, message_id: Optional[str]):
+        await self._set_status(message_id, DONE)
+
+    async def fail(self, message_id: Optional[str], error: str = None):
+        await self._set_status(message_id, FAILED, error)
+
+    async def _set_status(self, message_id: Optional[str], status: str, error: str = None):
+        if not message_id or mongodb.db is None:
+            return
+        update = {"status": status, "updated_at": datetime.datetime.utcnow()}
+        if error:
+            update["error"] = error
+        try:
+            await mongodb.db[self.collection_name].update_one({"_id": message_id}, {"$set": update})
+        except Exception as e:
+            logger.error(f"Failed to mark message {message_id} as {status}: {e}")
+
+    def _resolve(self, message_id: str, accepted: bool):
+        future = self._inflight.pop(message_id, None)
+        if future is not None and not future.done():
+            future.set_result(accepted)
+
+    def stats(self):
+        return {
+            "claimed": self.claimed,
+            "duplicates": self.duplicates,
+            "waited": self.waited,
+            "reclaimed": self.reclaimed,
+            "released": self.released,
+            "in_flight": len(self._inflight),
+        }
+
+
+idempotency = IdempotencyStore()
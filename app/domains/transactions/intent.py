@@ -0,0 +1,222 @@
+import json
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+TRANSACTION = "transaction"
+QUESTION = "question"
+SMALL_TALK = "small_talk"
+CHAT = "chat"
+
+# Kata kunci default; bisa diganti lewat file JSON (INTENT_KEYWORDS_PATH)
+# dengan bentuk {"transaction": [...], "question": [...], "small_talk": [...]}
+DEFAULT_KEYWORDS: Dict[str, List[str]] = {
+    TRANSACTION: [
+        "beli", "bli", "bayar", "byr", "transfer", "tf", "trf", "topup", "top up", "makan", "mkn",
+        "keluar", "uang", "rp", "idr", "belanja", "jajan", "gaji", "terima", "transfer masuk",
+        "isi", "bensin", "parkir", "listrik", "pulsa", "tagihan", "nabung", "cicilan",
+    ],
+    QUESTION: [
+        "berapa", "brp", "kapan", "siapa", "dimana", "di mana", "apa", "apakah", "total",
+        "gimana", "bagaimana", "kenapa", "mengapa", "rekap", "ringkasan", "laporan", "tampilkan",
+        "lihat", "cek",
+    ],
+    SMALL_TALK: [
+        "halo", "hallo", "hai", "hi", "hello", "hey", "pagi", "siang", "sore", "malam",
+        "selamat pagi", "selamat siang", "selamat sore", "selamat malam", "assalamualaikum",
+        "makasih", "terima kasih", "thanks", "thank you", "thx", "ok", "oke", "okay", "sip",
+        "siap", "mantap", "bye", "dadah",
+    ],
+}
+
+_TOKEN_RE = re.compile(r"[a-z]+|\d+(?:[.,]\d+)*")
+_AMOUNT_UNITS = {"rb", "ribu", "k", "jt", "juta"}
+_CURRENCY_MARKERS = {"rp", "idr"}
+_THOUSANDS_RE = re.compile(r"^\d{1,3}(?:([.,])\d{3})(?:\1\d{3})*$")
+# Rupiah polos hampir selalu bulat ("15000"); tahun 19xx/20xx tetap bukan nominal
+_ROUND_AMOUNT_RE = re.compile(r"^(?!(?:19|20)\d{2}$)\d{2,}00$")
+SMALL_TALK_MAX_TOKENS = 4
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class KeywordTrie:
+    """
+    Token-level trie over keyword phrases.
+
+    Matching walks the token list once and always takes the longest phrase
+    starting at a token, so "terima kasih" wins over "terima" and "apa" never
+    matches inside "apakah".
+    """
+
+    _END = "$label"
+
+    def __init__(self, keywords: Dict[str, Iterable[str]]):
+        self._root: dict = {}
+        for label, phrases in keywords.items():
+            for phrase in phrases:
+                node = self._root
+                for token in tokenize(phrase):
+                    node = node.setdefault(token, {})
+                node[self._END] = label
+
+    def match(self, tokens: List[str]) -> List[Tuple[str, str]]:
+        """Return (phrase, label) for every non-overlapping longest match."""
+        matches = []
+        i = 0
+        while i < len(tokens):
+            node = self._root
+            best: Optional[Tuple[int, str]] = None
+            j = i
+            while j < len(tokens) and tokens[j] in node:
+                node = node[tokens[j]]
+                j += 1
+                if self._END in node:
+                    best = (j, node[self._END])
+            if best:
+                matches.append((" ".join(tokens[i:best[0]]), best[1]))
+                i = best[0]
+            else:
+                i += 1
+        return matches
+
+
+class NaiveBayesIntentModel:
+    """Multinomial Naive Bayes over unigram tokens, trained from labeled JSONL."""
+
+    def __init__(self, alpha: float = 1.0):
+        self.alpha = alpha
+        self.log_priors: Dict[str, float] = {}
+        self.log_likelihoods: Dict[str, Dict[str, float]] = {}
+        self.log_unknown: Dict[str, float] = {}
+
+    def fit(self, samples: Iterable[Tuple[str, str]]) -> "NaiveBayesIntentModel":
+        counts: Dict[str, Counter] = {}
+        docs: Counter = Counter()
+        for text, label in samples:
+            docs[label] += 1
+            counts.setdefault(label, Counter()).update(self._features(text))
+
+        vocabulary = set().union(*counts.values()) if counts else set()
+        total_docs = sum(docs.values())
+        for label, counter in counts.items():
+            denominator = sum(counter.values()) + self.alpha * (len(vocabulary) + 1)
+            self.log_priors[label] = math.log(docs[label] / total_docs)
+            self.log_likelihoods[label] = {
+                token: math.log((count + self.alpha) / denominator) for token, count in counter.items()
+            }
+            self.log_unknown[label] = math.log(self.alpha / denominator)
+        return self
+
+    @classmethod
+    def from_jsonl(cls, path: str) -> "NaiveBayesIntentModel":
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        return cls().fit((row["text"], row["label"]) for row in rows)
+
+    @staticmethod
+    def _features(text: str) -> List[str]:
+        # Angka diganti token <num> supaya nominal yang berbeda tetap satu fitur
+        return ["<num>" if token[0].isdigit() else token for token in tokenize(text)]
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Return (label, posterior probability)."""
+        features = self._features(text)
+        scores = {}
+        for label, prior in self.log_priors.items():
+            likelihoods = self.log_likelihoods[label]
+            unknown = self.log_unknown[label]
+            scores[label] = prior + sum(likelihoods.get(token, unknown) for token in features)
+        best = max(scores, key=scores.get)
+        norm = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, 1 / norm
+
+
+@dataclass
+class IntentResult:
+    intent: str
+    source: str  # "rules" atau "model"
+    matches: List[Tuple[str, str]]
+
+
+class IntentClassifier:
+    """
+    Routes an incoming text message to transaction, question, small-talk or
+    free chat.
+
+    Keyword rules are compiled into a ``KeywordTrie`` once; the optional
+    ``NaiveBayesIntentModel`` only decides when the rules find no signal.
+    """
+
+    def __init__(
+        self,
+        keywords: Dict[str, Iterable[str]] = None,
+        model: NaiveBayesIntentModel = None,
+        model_min_probability: float = 0.95
+    ):
+        self.trie = KeywordTrie(keywords or DEFAULT_KEYWORDS)
+        self.model = model
+        self.model_min_probability = model_min_probability
+        self.counts: Counter = Counter()
+
+    @classmethod
+    def from_files(
+        cls,
+        keywords_path: str = "",
+        model_path: str = "",
+        model_min_probability: float = 0.95
+    ) -> "IntentClassifier":
+        keywords = None
+        if keywords_path:
+            with open(keywords_path, encoding="utf-8") as f:
+                keywords = json.load(f)
+        model = NaiveBayesIntentModel.from_jsonl(model_path) if model_path else None
+        return cls(keywords=keywords, model=model, model_min_probability=model_min_probability)
+
+    def classify(self, text: str) -> IntentResult:
+        tokens = tokenize(text)
+        matches = self.trie.match(tokens)
+        labels = {label for _, label in matches}
+        has_amount = self._has_amount(tokens)
+
+        if QUESTION in labels or text.rstrip().endswith("?"):
+            intent = QUESTION
+        elif TRANSACTION in labels or has_amount:
+            intent = TRANSACTION
+        elif SMALL_TALK in labels and len(tokens) <= SMALL_TALK_MAX_TOKENS:
+            intent = SMALL_TALK
+        else:
+            intent = None
+
+        source = "rules"
+        if intent is None:
+            intent = CHAT
+            if self.model is not None:
+                label, probability = self.model.predict(text)
+                if probability >= self.model_min_probability:
+                    intent, source = label, "model"
+
+        self.counts[intent] += 1
+        return IntentResult(intent, source, matches)
+
+    @staticmethod
+    def _has_amount(tokens: List[str]) -> bool:
+        # Nominal dengan satuan ("25rb", "25 rb"), mata uang ("rp 25000"), pemisah
+        # ribuan ("25.000") atau angka bulat ("15000"); tahun dan PIN tidak dihitung
+        for i, token in enumerate(tokens):
+            if not token[0].isdigit():
+                continue
+            if _THOUSANDS_RE.match(token) or _ROUND_AMOUNT_RE.match(token):
+                return True
+            if i + 1 < len(tokens) and tokens[i + 1] in _AMOUNT_UNITS:
+                return True
+            if i > 0 and tokens[i - 1] in _CURRENCY_MARKERS:
+                return True
+        return False
+
+    def stats(self):
+        return dict(self.counts)
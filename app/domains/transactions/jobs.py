@@ -0,0 +1,100 @@
+import logging
+from app.config.setting import settings
+from app.shared.job_queue import Job, JobQueue
+from app.shared.whatsapp_service import AsyncWhatsAppAPI
+from app.domains.transactions.services import TransactionService
+from app.domains.users.service import UserService
+from app.domains.auth.jwt_service import JWTService
+from app.domains.transactions.idempotency import idempotency
+
+logger = logging.getLogger(__name__)
+
+IMAGE_JOB = "image_message"
+TEXT_JOB = "text_message"
+
+DASHBOARD_COMMANDS = ["dashboard", "view dashboard", "show dashboard"]
+
+
+def image_job_key(sender: str, message_id: str) -> str:
+    # Struk dari satu sender boleh diproses bersamaan (dan diekstrak dalam satu
+    # batch LLM); pesan teks tetap berurutan per sender
+    return f"{sender}:{message_id}"
+
+
+class WebhookJobHandlers:
+    """
+    Background handlers for webhook messages.
+
+    The webhook only validates and enqueues the message; the slow part
+    (media download, OCR, LLM, upload and the WhatsApp reply) runs here.
+    """
+
+    def __init__(
+        self,
+        service: TransactionService,
+        whatsapp_api: AsyncWhatsAppAPI,
+        user_service: UserService,
+        jwt_service: JWTService
+    ):
+        self.service = service
+        self.whatsapp_api = whatsapp_api
+        self.user_service = user_service
+        self.jwt_service = jwt_service
+
+    def register(self, queue: JobQueue):
+        queue.register(IMAGE_JOB, self._tracked(self.handle_image_job, queue.max_attempts))
+        queue.register(TEXT_JOB, self._tracked(self.handle_text_job, queue.max_attempts))
+
+    @staticmethod
+    def _tracked(handler, max_attempts: int):
+        # Status idempotency per message ID mengikuti hasil job
+        async def run(job: Job):
+            message_id = job.payload.get("message_id")
+            await idempotency.start(message_id)
+            try:
+                await handler(job)
+            except Exception as e:
+                # Masih ada retry di job queue: biarkan tetap "processing"
+                if job.attempts >= max_attempts:
+                    await idempotency.fail(message_id, str(e))
+                raise
+            await idempotency.complete(message_id)
+        return run
+
+    async def handle_image_job(self, job: Job):
+        sender = job.payload["sender"]
+        message_id = job.payload["message_id"]
+
+        image = await self.whatsapp_api.download_media_buffer(sender, message_id)
+        message = await self.service.handle_image(image, sender)
+        # Upsert user stats untuk pesan gambar
+        await self.user_service.upsert_user_stats(sender, last_message="[image]")
+
+        await self.reply(sender, message)
+
+    async def handle_text_job(self, job: Job):
+        sender = job.payload["sender"]
+        user_message = job.payload["body"]
+
+        # Check if user is requesting dashboard access
+        if user_message.lower().strip() in DASHBOARD_COMMANDS:
+            logger.info("User requested dashboard access")
+            # Generate JWT token for the sender
+            access_token = self.jwt_service.create_access_token(sender)
+            # Construct dashboard URL with token
+            dashboard_url = f"{settings.frontend_base_url}/dashboard?token={access_token}"
+            message = f"Here's your secure dashboard link (valid for 30 minutes):\n{dashboard_url}"
+        else:
+            # Handle regular text messages
+            logger.info("Processing user message with LLM service")
+            message = await self.service.handle_text_message(user_message, sender)
+            # Upsert user stats for text messages
+            await self.user_service.upsert_user_stats(sender, last_message=user_message)
+
+        await self.reply(sender, message)
+
+    async def reply(self, sender: str, message):
+        await self.whatsapp_api.send_text_message(
+            recipient=sender,
+            body=message
+        )
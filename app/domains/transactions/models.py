@@ -1,12 +1,12 @@
 # app/domains/transactions/models.py
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional
 
 class Item(BaseModel):
     name: str
     price: int
-    quantity: int
+    quantity: int = 1
     discount: Optional[int] = None
 
 class Transaction(BaseModel):
@@ -17,4 +17,11 @@ class Transaction(BaseModel):
     category: str
     note: Optional[str] = None
     source: Optional[str] = None
-    items: List[Item]
+    full_address: Optional[str] = None
+    items: List[Item] = Field(default_factory=list)
+
+    @field_validator("type")
+    @classmethod
+    def normalize_type(cls, value: str) -> str:
+        # LLM kadang mengembalikan "Expense"/"Income", statistik memakai huruf kecil
+        return value.strip().lower()
@@ -0,0 +1,86 @@
+import copy
+import datetime
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from app.config.mongodb import mongodb
+from app.config.setting import settings
+
+logger = logging.getLogger(__name__)
+
+
+class OCRResultCache:
+    """
+    Content-addressed cache for OCR text and the parsed LLM result.
+
+    Entries are keyed by the SHA-256 of the decoded image bytes. A small
+    in-memory LRU sits in front of the ``ocr_cache`` Mongo collection, whose
+    ``created_at`` TTL index (see ``app.config.indexes``) expires old entries.
+    """
+
+    collection_name = "ocr_cache"
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or settings.ocr_cache_max_entries
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+        self.memory_hits = 0
+        self.mongo_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(image_bytes) -> str:
+        return hashlib.sha256(image_bytes).hexdigest()
+
+    async def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        entry = self._memory.get(digest)
+        if entry is not None:
+            self._memory.move_to_end(digest)
+            self.memory_hits += 1
+            return copy.deepcopy(entry)
+
+        if mongodb.db is not None:
+            doc = await mongodb.db[self.collection_name].find_one(
+                {"_id": digest}, {"ocr_text": 1, "parsed": 1}
+            )
+            if doc is not None:
+                entry = {"ocr_text": doc["ocr_text"], "parsed": doc.get("parsed")}
+                self._remember(digest, entry)
+                self.mongo_hits += 1
+                return copy.deepcopy(entry)
+
+        self.misses += 1
+        return None
+
+    async def set(self, digest: str, ocr_text: str, parsed: Optional[Dict[str, Any]]):
+        entry = {"ocr_text": ocr_text, "parsed": copy.deepcopy(parsed)}
+        self._remember(digest, entry)
+
+        if mongodb.db is not None:
+            try:
+                await mongodb.db[self.collection_name].update_one(
+                    {"_id": digest},
+                    {"$set": {**entry, "created_at": datetime.datetime.utcnow()}},
+                    upsert=True
+                )
+            except Exception as e:
+                # Cache gagal disimpan tidak boleh menggagalkan pemrosesan gambar
+                logger.error(f"Failed to persist OCR cache entry: {e}")
+
+    def _remember(self, digest: str, entry: Dict[str, Any]):
+        self._memory[digest] = entry
+        self._memory.move_to_end(digest)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.memory_hits + self.mongo_hits
+        lookups = hits + self.misses
+        return {
+            "memory_entries": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "mongo_hits": self.mongo_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
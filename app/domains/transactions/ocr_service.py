@@ -1,4 +1,165 @@
-from app.shared.azure_ocr_service import AzureOCRService
+import logging
+from dataclasses import dataclass
+from typing import List, Optional
+from app.config.setting import settings
+from app.shared.azure_ocr_service import AzureOCRService, AsyncAzureOCRService
+from app.shared.image_preprocessing import ImagePreprocessor, PreprocessOptions
+from app.shared.local_ocr_service import LocalOCRService
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OCRResult:
+    text: str
+    confidence: Optional[float] = None
+    engine: str = ""
+
+
+class OCREngine:
+    """Interface of an OCR engine used by OCRProcessor."""
+
+    name = "base"
+
+    async def read(self, image) -> OCRResult:
+        raise NotImplementedError
+
+    @property
+    def in_flight(self) -> int:
+        return 0
+
+    async def warm_up(self):
+        pass
+
+    async def aclose(self):
+        pass
+
+
+class AzureOCREngine(OCREngine):
+    name = "azure"
+
+    def __init__(self, service: AsyncAzureOCRService):
+        self.service = service
+
+    async def read(self, image) -> OCRResult:
+        text, confidence = await self.service.read_image(image)
+        return OCRResult(text, confidence, self.name)
+
+    @property
+    def in_flight(self) -> int:
+        return self.service.in_flight
+
+    async def aclose(self):
+        await self.service.aclose()
+
+
+class LocalOCREngine(OCREngine):
+    name = "local"
+
+    def __init__(self, service: LocalOCRService):
+        self.service = service
+
+    async def read(self, image) -> OCRResult:
+        text, confidence = await self.service.read_image(image)
+        return OCRResult(text, confidence, self.name)
+
+    @property
+    def in_flight(self) -> int:
+        return self.service.in_flight
+
+    async def warm_up(self):
+        await self.service.warm_up()
+
+    async def aclose(self):
+        self.service.shutdown()
+
+
+class OCRRouter(OCREngine):
+    """
+    Picks the local or Azure engine per image and falls back to the other.
+
+    Small images, or any image while Azure already has ``azure_max_in_flight``
+    operations running, go to the local engine first. A failure, or a result
+    below ``min_confidence``, is retried on the other engine.
+    """
+
+    name = "router"
+
+    def __init__(
+        self,
+        azure: OCREngine,
+        local: OCREngine,
+        local_max_bytes: int = 300_000,
+        azure_max_in_flight: int = 8,
+        min_confidence: float = 0.6
+    ):
+        self.azure = azure
+        self.local = local
+        self.local_max_bytes = local_max_bytes
+        self.azure_max_in_flight = azure_max_in_flight
+        self.min_confidence = min_confidence
+        self.routed = {azure.name: 0, local.name: 0}
+        self.fallbacks = 0
+
+    def order(self, image) -> List[OCREngine]:
+        if len(image) <= self.local_max_bytes or self.azure.in_flight >= self.azure_max_in_flight:
+            return [self.local, self.azure]
+        return [self.azure, self.local]
+
+    async def read(self, image) -> OCRResult:
+        primary, secondary = self.order(memoryview(image).cast("B"))
+        self.routed[primary.name] += 1
+        try:
+            result = await primary.read(image)
+        except Exception as e:
+            logger.warning(f"OCR engine '{primary.name}' failed, falling back to '{secondary.name}': {e}")
+            self.fallbacks += 1
+            return await secondary.read(image)
+
+        if result.confidence is not None and result.confidence < self.min_confidence:
+            logger.info(f"Low OCR confidence {result.confidence:.2f} from '{primary.name}', trying '{secondary.name}'")
+            self.fallbacks += 1
+            try:
+                other = await secondary.read(image)
+            except Exception as e:
+                logger.warning(f"OCR engine '{secondary.name}' failed: {e}")
+                return result
+            if (other.confidence or 0) > result.confidence:
+                return other
+        return result
+
+    async def warm_up(self):
+        await self.local.warm_up()
+
+    async def aclose(self):
+        await self.azure.aclose()
+        await self.local.aclose()
+
+    def stats(self):
+        return {"routed": dict(self.routed), "fallbacks": self.fallbacks}
+
+
+def build_engine(async_ocr_service: AsyncAzureOCRService) -> OCREngine:
+    """Build the OCR engine selected by ``settings.ocr_engine``."""
+    azure = AzureOCREngine(async_ocr_service)
+    if settings.ocr_engine == "azure":
+        return azure
+
+    local = LocalOCREngine(LocalOCRService(
+        backend=settings.ocr_local_backend,
+        langs=[lang.strip() for lang in settings.ocr_lang.split(",")],
+        workers=settings.ocr_local_workers
+    ))
+    if settings.ocr_engine == "local":
+        return local
+    return OCRRouter(
+        azure,
+        local,
+        local_max_bytes=settings.ocr_local_max_bytes,
+        azure_max_in_flight=settings.ocr_azure_max_in_flight,
+        min_confidence=settings.ocr_min_confidence
+    )
+
 
 class OCRProcessor:
     def __init__(self):
@@ -6,6 +167,21 @@ class OCRProcessor:
         Initialize the OCRProcessor class with Azure OCR service.
         """
         self.ocr_service = AzureOCRService()
+        self.async_ocr_service = AsyncAzureOCRService()
+        self.engine = build_engine(self.async_ocr_service)
+
+        # Optional preprocessing stage before OCR and upload
+        self.preprocessor = None
+        if settings.image_preprocess_enabled:
+            self.preprocessor = ImagePreprocessor(
+                PreprocessOptions(
+                    grayscale=settings.image_preprocess_grayscale,
+                    max_long_edge=settings.image_preprocess_max_long_edge,
+                    format=settings.image_preprocess_format,
+                    quality=settings.image_preprocess_quality
+                ),
+                workers=settings.image_preprocess_workers
+            )
 
 
     
@@ -25,4 +201,58 @@ class OCRProcessor:
         :param image_bytes: Image in bytes format.
         :return: Extracted text as a single string.
         """
-        return self.ocr_service.read_text_from_image_bytes(image_bytes)
\ No newline at end of file
+        return self.ocr_service.read_text_from_image_bytes(image_bytes)
+
+    async def azure_ocr_url_async(self, image_url: str):
+        """
+        Perform OCR using the asyncio Azure OCR client.
+
+        :param image_url: URL of the image.
+        :return: Extracted text as a single string.
+        """
+        return await self.async_ocr_service.read_text_from_url(image_url)
+
+    async def azure_ocr_async(self, image_bytes: bytes):
+        """
+        Perform OCR using the asyncio Azure OCR client.
+
+        :param image_bytes: Image in bytes format.
+        :return: Extracted text as a single string.
+        """
+        return await self.async_ocr_service.read_text_from_image_bytes(image_bytes)
+
+    async def read_text(self, image) -> str:
+        """
+        Perform OCR with the configured engine (azure, local or auto routing).
+
+        :param image: Image as bytes or memoryview.
+        :return: Extracted text as a single string.
+        """
+        result = await self.engine.read(image)
+        logger.info(f"OCR by '{result.engine}' engine, confidence {result.confidence}")
+        return result.text
+
+    async def warm_up(self):
+        try:
+            await self.engine.warm_up()
+        except Exception as e:
+            logger.error(f"OCR engine warm-up failed: {e}")
+
+    async def prepare(self, image):
+        """
+        Run the preprocessing stage (rotate, grayscale, resize, recompress) if
+        it is enabled, otherwise return the image unchanged.
+
+        :param image: Image as bytes or memoryview.
+        :return: Image to send to OCR and upload.
+        """
+        if self.preprocessor is None:
+            return image
+        return await self.preprocessor.run(image)
+
+    async def aclose(self):
+        await self.engine.aclose()
+        if not isinstance(self.engine, (AzureOCREngine, OCRRouter)):
+            await self.async_ocr_service.aclose()
+        if self.preprocessor is not None:
+            self.preprocessor.shutdown()
@@ -0,0 +1,106 @@
+import json
+from typing import Any, Dict, List
+from pydantic import ValidationError
+from app.domains.transactions.models import Transaction
+
+_DECODER = json.JSONDecoder()
+
+
+class OutputParseError(Exception):
+    """Raised when an LLM answer cannot be turned into a valid transaction."""
+
+    def __init__(self, message: str, raw: str):
+        super().__init__(message)
+        self.raw = raw
+
+
+def extract_json(raw: str, expect: str = "{") -> Any:
+    """
+    Pull the first JSON value starting with ``expect`` ("{" or "[") out of an
+    LLM answer.
+
+    Markdown fences, prose before the value and trailing text after it are
+    ignored: decoding starts at each candidate bracket and stops at the end
+    of the first complete value.
+    """
+    position = raw.find(expect)
+    while position != -1:
+        try:
+            value, _ = _DECODER.raw_decode(raw, position)
+            return value
+        except json.JSONDecodeError:
+            position = raw.find(expect, position + 1)
+    raise ValueError(f"No JSON value starting with {expect!r} found")
+
+
+class TransactionOutputParser:
+    """
+    Turns raw LLM text into a validated transaction dict.
+
+    ``parsed`` counts answers valid on the first try, ``repaired`` those
+    fixed by the repair retry and ``failed`` those lost after it; the
+    counters are updated by ``OpenAIProcessor.extract_transaction``.
+    """
+
+    def __init__(self):
+        self.parsed = 0
+        self.repaired = 0
+        self.failed = 0
+        self.structured = 0
+
+    def validate(self, data: Any) -> Dict[str, Any]:
+        """Validate a decoded object against ``Transaction``."""
+        if not isinstance(data, dict):
+            raise ValueError(f"Expected a JSON object, got {type(data).__name__}")
+        return Transaction.model_validate(data).model_dump()
+
+    def parse(self, raw: str) -> Dict[str, Any]:
+        try:
+            return self.validate(extract_json(raw))
+        except (ValueError, ValidationError) as e:
+            raise OutputParseError(str(e), raw) from e
+
+    def parse_batch(self, raw: str) -> Dict[int, Dict[str, Any]]:
+        """
+        Map ``index`` to the validated transaction from a batch answer.
+
+        Entries that are not objects, have no usable ``index`` or fail
+        validation are dropped so their jobs can fall back.
+        """
+        items = extract_json(raw, "[")
+        if not isinstance(items, list):
+            raise ValueError("Batch response is not a JSON array")
+        results = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            try:
+                index = int(item.pop("index"))
+                if index not in results:
+                    results[index] = self.validate(item)
+                    self.parsed += 1
+            except (KeyError, TypeError, ValueError, ValidationError):
+                continue
+        return results
+
+    @staticmethod
+    def error_summary(error: Exception) -> str:
+        """Short, prompt-friendly description of what was wrong."""
+        cause = error.__cause__ or error
+        if isinstance(cause, ValidationError):
+            lines: List[str] = [
+                f"- {'.'.join(str(p) for p in err['loc']) or 'root'}: {err['msg']}" for err in cause.errors()
+            ]
+            return "\n".join(lines)
+        return str(cause)
+
+    def stats(self):
+        total = self.parsed + self.repaired + self.failed
+        return {
+            "parsed": self.parsed,
+            "repaired": self.repaired,
+            "failed": self.failed,
+            "structured": self.structured,
+            "first_pass_failure_rate": round((self.repaired + self.failed) / total, 4) if total else 0.0,
+            "failure_rate": round(self.failed / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,91 @@
+from typing import Any, Dict, List
+
+# Template balasan per bahasa; dikompilasi sekali (bound str.format) di ReplyRenderer
+REPLY_TEMPLATES: Dict[str, Dict[str, Any]] = {
+    "id": {
+        "saved": "Transaksi tersimpan: {type} {amount} untuk {category}.",
+        "source": "Tempat: {source}",
+        "when": "Tanggal: {date}{time}",
+        "items": "Rincian:",
+        "item": "- {name}{quantity} {price}",
+        "more_items": "...dan {count} item lainnya",
+        "duplicate": "Transaksi {amount} pada {date} sudah tercatat sebelumnya.",
+        "failed": "Maaf, struknya gagal diproses. Coba kirim ulang sebentar lagi.",
+        "types": {"expense": "pengeluaran", "income": "pemasukan"},
+        "thousands": ".",
+    },
+    "en": {
+        "saved": "Transaction saved: {type} of {amount} for {category}.",
+        "source": "Merchant: {source}",
+        "when": "Date: {date}{time}",
+        "items": "Items:",
+        "item": "- {name}{quantity} {price}",
+        "more_items": "...and {count} more",
+        "duplicate": "The {amount} transaction on {date} was already recorded.",
+        "failed": "Sorry, the receipt could not be processed. Please send it again in a moment.",
+        "types": {"expense": "expense", "income": "income"},
+        "thousands": ",",
+    },
+}
+
+
+class ReplyRenderer:
+    """
+    Renders the WhatsApp confirmation for a saved receipt from the parsed
+    transaction, without an LLM call. Used by ``handle_image`` when
+    ``REPLY_MODE=template``; ``llm`` keeps the ``answer_with_db_resume`` summary.
+    """
+
+    def __init__(self, language: str = "id", max_items: int = 5):
+        if language not in REPLY_TEMPLATES:
+            raise ValueError(f"Unsupported reply language: {language}")
+        templates = REPLY_TEMPLATES[language]
+        self.language = language
+        self.max_items = max_items
+        self._format = {key: value.format for key, value in templates.items() if isinstance(value, str)}
+        self._types = templates["types"]
+        self._thousands = templates["thousands"]
+
+    def amount(self, value) -> str:
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            return str(value)
+        return "Rp" + f"{value:,}".replace(",", self._thousands)
+
+    def render(self, transaction: Dict[str, Any]) -> str:
+        f = self._format
+        type_ = str(transaction.get("type") or "").lower()
+        lines: List[str] = [f["saved"](
+            type=self._types.get(type_, type_),
+            amount=self.amount(transaction.get("amount")),
+            category=transaction.get("category") or "-"
+        )]
+        if transaction.get("source"):
+            lines.append(f["source"](source=transaction["source"]))
+        if transaction.get("date"):
+            time_ = transaction.get("time")
+            lines.append(f["when"](date=transaction["date"], time=f" {time_}" if time_ else ""))
+
+        items = transaction.get("items") or []
+        if items:
+            lines.append(f["items"]())
+            for item in items[:self.max_items]:
+                quantity = item.get("quantity") or 1
+                lines.append(f["item"](
+                    name=item.get("name", "-"),
+                    quantity=f" x{quantity}" if quantity != 1 else "",
+                    price=self.amount((item.get("price") or 0) * quantity)
+                ))
+            if len(items) > self.max_items:
+                lines.append(f["more_items"](count=len(items) - self.max_items))
+        return "\n".join(lines)
+
+    def failed(self) -> str:
+        return self._format["failed"]()
+
+    def duplicate(self, transaction: Dict[str, Any]) -> str:
+        return self._format["duplicate"](
+            amount=self.amount(transaction.get("amount")),
+            date=transaction.get("date") or "-"
+        )
@@ -0,0 +1,351 @@
+import asyncio
+import datetime
+import logging
+import re
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+from pymongo import ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from app.config.mongodb import mongodb
+
+logger = logging.getLogger(__name__)
+
+BUILDING = "building"
+BUILT = "built"
+
+_DATE_RE = re.compile(r"^(\d{4})-(\d{2})-(\d{2})")
+
+
+def _month_key(year: int, month: int) -> str:
+    return f"{year:04d}-{month:02d}"
+
+
+def _type(value) -> Optional[str]:
+    # Data lama menyimpan "Expense"/"Income"; Transaction.normalize_type menyimpan huruf kecil
+    return str(value).strip().lower() if value is not None else None
+
+
+def _field(name) -> str:
+    # Mongo field name tidak boleh mengandung "." atau diawali "$"
+    if name is None or name == "":
+        return "unknown"
+    return str(name).replace(".", "_").replace("$", "_")
+
+
+class TransactionRollupService:
+    """
+    Monthly per-user rollups of the ``transactions`` collection.
+
+    One document per (phone_number, month) holds per-type, per-category and
+    per-day totals and counts. Every write path updates it incrementally with
+    ``$inc`` so the stats endpoints read a handful of rollup documents instead
+    of aggregating raw transactions. Soft-deleted transactions are excluded.
+
+    Users whose transactions predate the rollups are backfilled on their
+    first read: ``ensure_built`` claims the user in ``transaction_rollup_users``
+    with one atomic upsert, so only one worker across all instances rebuilds
+    them, and the others wait for the marker to turn ``built``.
+    """
+
+    collection_name = "transaction_rollups"
+    built_collection_name = "transaction_rollup_users"
+    # Claim "building" yang lebih tua dari ini dianggap worker-nya mati
+    build_lease_seconds = 300
+    build_wait_seconds = 10.0
+
+    def __init__(self):
+        self._built = set()
+        self._build_locks: Dict[str, asyncio.Lock] = {}
+
+    @property
+    def collection(self):
+        if mongodb.db is None:
+            raise Exception("MongoDB not connected")
+        return mongodb.db[self.collection_name]
+
+    @staticmethod
+    def rollup_id(phone_number: str, month_key: str) -> str:
+        return f"{phone_number}:{month_key}"
+
+    @staticmethod
+    def _contribution(doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return the month, day and amount a transaction adds to its rollup."""
+        if not doc or doc.get("is_deleted"):
+            return None
+        match = _DATE_RE.match(str(doc.get("date") or ""))
+        amount = doc.get("amount")
+        if not match or not doc.get("phone_number") or not isinstance(amount, (int, float)):
+            return None
+        year, month, day = match.groups()
+        return {
+            "phone_number": doc["phone_number"],
+            "month": f"{year}-{month}",
+            "day": day,
+            "amount": amount,
+            "type": _type(doc.get("type")),
+            "category": doc.get("category"),
+        }
+
+    async def _apply(self, doc: Dict[str, Any], sign: int):
+        c = self._contribution(doc)
+        if c is None:
+            return
+
+        amount = c["amount"] * sign
+        type_key = _field(c["type"])
+        category_key = _field(c["category"])
+        inc = {
+            "total_count": sign,
+            f"types.{type_key}.total": amount,
+            f"types.{type_key}.count": sign,
+            f"categories.{category_key}.total": amount,
+            f"categories.{category_key}.count": sign,
+            f"days.{c['day']}.total": amount,
+            f"days.{c['day']}.count": sign,
+            "version": 1,
+        }
+        update = {
+            "$inc": inc,
+            "$set": {"updated_at": datetime.datetime.utcnow()},
+            "$setOnInsert": {"phone_number": c["phone_number"], "month": c["month"]},
+        }
+        if sign > 0:
+            update["$set"][f"categories.{category_key}.type"] = c["type"]
+
+        await self.collection.update_one(
+            {"_id": self.rollup_id(c["phone_number"], c["month"])},
+            update,
+            upsert=True
+        )
+
+    async def _safe_apply(self, doc: Optional[Dict[str, Any]], sign: int):
+        try:
+            await self._apply(doc, sign)
+        except Exception as e:
+            # Rollup yang gagal bisa diperbaiki dengan rebuild, jangan gagalkan write utama
+            logger.error(f"Failed to update transaction rollup: {e}")
+
+    async def on_insert(self, doc: Dict[str, Any]):
+        await self._safe_apply(doc, 1)
+
+    async def on_update(self, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]):
+        await self._safe_apply(before, -1)
+        await self._safe_apply(after, 1)
+
+    async def on_delete(self, before: Optional[Dict[str, Any]]):
+        await self._safe_apply(before, -1)
+
+    async def touch(self, doc: Optional[Dict[str, Any]]):
+        """Bump the month's version for a change that does not affect totals (e.g. image_url)."""
+        c = self._contribution(doc)
+        if c is None:
+            return
+        try:
+            await self.collection.update_one(
+                {"_id": self.rollup_id(c["phone_number"], c["month"])},
+                {"$inc": {"version": 1}, "$set": {"updated_at": datetime.datetime.utcnow()}}
+            )
+        except Exception as e:
+            logger.error(f"Failed to bump transaction rollup version: {e}")
+
+    async def ensure_built(self, phone_number: str):
+        """Backfill the user's rollups from raw transactions if they were never built."""
+        if phone_number in self._built:
+            return
+        # Lock lokal hanya supaya request bersamaan di proses ini tidak ikut polling Mongo
+        lock = self._build_locks.setdefault(phone_number, asyncio.Lock())
+        async with lock:
+            if phone_number not in self._built:
+                await self._build_once(phone_number)
+                self._built.add(phone_number)
+        self._build_locks.pop(phone_number, None)
+
+    async def _build_once(self, phone_number: str):
+        markers = mongodb.db[self.built_collection_name]
+        deadline = time.monotonic() + self.build_wait_seconds
+        while True:
+            now = datetime.datetime.utcnow()
+            try:
+                previous = await markers.find_one_and_update(
+                    {"_id": phone_number},
+                    {"$setOnInsert": {"state": BUILDING, "started_at": now}},
+                    upsert=True,
+                    return_document=ReturnDocument.BEFORE
+                )
+            except DuplicateKeyError:
+                # Instance lain meng-claim pada saat yang sama
+                previous = {"state": BUILDING, "started_at": now}
+
+            if previous is None:
+                owner = True
+            elif previous.get("state", BUILT) == BUILT:
+                return
+            else:
+                # Claim lama dari worker yang mati boleh diambil alih
+                lease = datetime.timedelta(seconds=self.build_lease_seconds)
+                owner = previous.get("started_at", now) < now - lease and (await markers.update_one(
+                    {"_id": phone_number, "state": BUILDING, "started_at": previous.get("started_at")},
+                    {"$set": {"started_at": now}}
+                )).modified_count == 1
+
+            if owner:
+                try:
+                    count = await self.rebuild(phone_number)
+                except BaseException:
+                    await markers.delete_one({"_id": phone_number, "state": BUILDING})
+                    raise
+                logger.info(f"Backfilled {count} rollup documents for {phone_number}")
+                return
+
+            if time.monotonic() >= deadline:
+                # Jangan tahan request terlalu lama; rollup dibaca apa adanya dulu
+                logger.warning(f"Rollups for {phone_number} still being built elsewhere")
+                return
+            await asyncio.sleep(0.2)
+
+    async def _find(self, phone_number: str, month: Optional[int], year: Optional[int]) -> List[Dict[str, Any]]:
+        await self.ensure_built(phone_number)
+        if month and year:
+            doc = await self.collection.find_one({"_id": self.rollup_id(phone_number, _month_key(year, month))})
+            return [doc] if doc else []
+        return await self.collection.find({"phone_number": phone_number}).to_list(length=None)
+
+    async def get_version(self, phone_number: str, month: int, year: int) -> str:
+        """Version marker of a month's rollup; changes on every write to that month."""
+        await self.ensure_built(phone_number)
+        doc = await self.collection.find_one(
+            {"_id": self.rollup_id(phone_number, _month_key(year, month))},
+            {"version": 1, "updated_at": 1}
+        )
+        if not doc:
+            return "0"
+        return f"{doc.get('version', 0)}:{doc.get('updated_at')}"
+
+    async def get_summary(self, phone_number: str, month: Optional[int] = None, year: Optional[int] = None):
+        summary = defaultdict(int)
+        for doc in await self._find(phone_number, month, year):
+            for type_key, values in doc.get("types", {}).items():
+                if values.get("count", 0) > 0:
+                    summary[_type(type_key)] += values.get("total", 0)
+        return dict(summary)
+
+    async def get_categories(self, phone_number: str, month: int, year: int):
+        doc = (await self._find(phone_number, month, year) or [{}])[0]
+        result = [
+            {"_id": category, "type": _type(values.get("type")), "total": values.get("total", 0)}
+            for category, values in doc.get("categories", {}).items()
+            if values.get("count", 0) > 0
+        ]
+        result.sort(key=lambda item: item["total"], reverse=True)
+        return result
+
+    async def get_daily_totals(self, phone_number: str, month: int, year: int):
+        doc = (await self._find(phone_number, month, year) or [{}])[0]
+        result = [
+            {"date": f"{_month_key(year, month)}-{day}", "total": values.get("total", 0), "transaction_count": values.get("count", 0)}
+            for day, values in doc.get("days", {}).items()
+            if values.get("count", 0) > 0
+        ]
+        result.sort(key=lambda item: item["date"], reverse=True)
+        return result
+
+    async def rebuild(self, phone_number: Optional[str] = None) -> int:
+        """
+        Recompute rollups from the raw ``transactions`` collection.
+
+        Each month document is replaced in place (upsert) in one bulk write,
+        so readers never see the user's rollups missing and a concurrent
+        ``$inc`` upsert cannot collide with an insert. A transaction written
+        while the rebuild reads may still be counted or missed in that month,
+        so a full rebuild is best run when the webhook is quiet. Returns the
+        number of rollup documents written.
+        """
+        query = {"is_deleted": {"$ne": True}}
+        if phone_number:
+            query["phone_number"] = phone_number
+
+        rollups: Dict[str, Dict[str, Any]] = {}
+        cursor = mongodb.db["transactions"].find(
+            query, {"phone_number": 1, "date": 1, "amount": 1, "type": 1, "category": 1}
+        )
+        async for doc in cursor:
+            c = self._contribution(doc)
+            if c is None:
+                continue
+            rollup = rollups.setdefault(self.rollup_id(c["phone_number"], c["month"]), {
+                "phone_number": c["phone_number"],
+                "month": c["month"],
+                "total_count": 0,
+                "types": {},
+                "categories": {},
+                "days": {},
+                "version": 0,
+            })
+            rollup["total_count"] += 1
+            for group, key in (("types", _field(c["type"])), ("categories", _field(c["category"])), ("days", c["day"])):
+                bucket = rollup[group].setdefault(key, {"total": 0, "count": 0})
+                bucket["total"] += c["amount"]
+                bucket["count"] += 1
+            rollup["categories"][_field(c["category"])].setdefault("type", c["type"])
+
+        now = datetime.datetime.utcnow()
+        if rollups:
+            await self.collection.bulk_write(
+                [ReplaceOne({"_id": rollup_id}, {**rollup, "updated_at": now}, upsert=True)
+                 for rollup_id, rollup in rollups.items()],
+                ordered=False
+            )
+        # Bulan yang transaksinya sudah tidak ada lagi
+        stale = {"_id": {"$nin": list(rollups)}}
+        if phone_number:
+            stale["phone_number"] = phone_number
+        await self.collection.delete_many(stale)
+
+        phones = {phone_number} if phone_number else {rollup["phone_number"] for rollup in rollups.values()}
+        if phones:
+            await mongodb.db[self.built_collection_name].bulk_write(
+                [UpdateOne({"_id": phone}, {"$set": {"state": BUILT, "built_at": now}}, upsert=True) for phone in phones],
+                ordered=False
+            )
+        return len(rollups)
+
+    async def normalize_types(self) -> int:
+        """
+        One-off migration: lowercase ``type`` on stored transactions (older
+        rows have "Expense"/"Income") and rebuild all rollups. Returns the
+        number of transactions changed.
+        """
+        result = await mongodb.db["transactions"].update_many(
+            {"type": {"$type": "string", "$regex": "[A-Z]|^\\s|\\s$"}},
+            [{"$set": {"type": {"$toLower": {"$trim": {"input": "$type"}}}}}]
+        )
+        await self.rebuild()
+        return result.modified_count
+
+
+rollups = TransactionRollupService()
+
+
+async def _main(argv: List[str]):
+    await mongodb.init_db()
+    try:
+        if argv[0] == "normalize-types":
+            count = await rollups.normalize_types()
+            print(f"Normalized type on {count} transactions and rebuilt rollups")
+            return
+        count = await rollups.rebuild(argv[1] if len(argv) > 1 else None)
+        print(f"Rebuilt {count} rollup documents")
+    finally:
+        mongodb.close()
+
+
+if __name__ == "__main__":
+    # python -m app.domains.transactions.rollups rebuild [phone_number]
+    # python -m app.domains.transactions.rollups normalize-types
+    logging.basicConfig(level=logging.INFO)
+    if not sys.argv[1:] or sys.argv[1] not in ("rebuild", "normalize-types"):
+        print("Usage: python -m app.domains.transactions.rollups rebuild [phone_number] | normalize-types")
+        sys.exit(1)
+    asyncio.run(_main(sys.argv[1:]))
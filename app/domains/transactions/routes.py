@@ -1,31 +1,28 @@
-from fastapi import APIRouter, Request, Depends, HTTPException, Query
+from fastapi import APIRouter, Request, Response, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+import json
 import logging
 from typing import Optional
 from app.domains.transactions.services import TransactionService
-from app.shared.whatsapp_service import WhatsAppAPI
-from app.domains.transactions.llm_service import OpenAIProcessor
-from app.domains.users.service import UserService
-from app.domains.auth.middleware import JWTAuthMiddleware
-from app.config.setting import settings
+from app.domains.transactions.jobs import IMAGE_JOB, TEXT_JOB, image_job_key
+from app.domains.transactions.stats_cache import stats_cache
+from app.domains.transactions.idempotency import idempotency
+from app.shared.write_behind import write_behind
+from app.domains.auth.middleware import JWTAuthMiddleware, MetricsTokenAuth
+from app.container import get_job_queue, get_transaction_service
+from app.shared.job_queue import JobQueue, QueueFullError
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-service = TransactionService()
 jwt_auth = JWTAuthMiddleware()
-
-def get_user_service(request: Request) -> UserService:
-    return request.app.state.user_service
-
-# Dependency to get whatsapp_api from app.state
-def get_whatsapp_api(request: Request) -> WhatsAppAPI:
-    return request.app.state.whatsapp_api
+metrics_auth = MetricsTokenAuth()
 
 @router.post("/webhook", response_model=None)
 async def webhook(
     request: Request,
-    whatsapp_api: WhatsAppAPI = Depends(get_whatsapp_api),
-    user_service: UserService = Depends(get_user_service)
+    job_queue: JobQueue = Depends(get_job_queue),
+    service: TransactionService = Depends(get_transaction_service)
 ):
     try:
         data = await request.json()
@@ -37,57 +34,81 @@ async def webhook(
                 return {"Status": "ignored"}  # Ignore messages from group chats
 
             mimetype = service.get_mimetype(data)
-            logger.info(f"Sender: {sender}, Mimetype: {mimetype}")
-
-            if mimetype and "image/jpeg" in mimetype:
-                message_id = data.get("data", {}).get("message", {}).get("_data", {}).get("id", {}).get("id")
-                content_base64 = whatsapp_api.download_media(sender, message_id, return_as_base64=True)
-                message = await service.handle_image(content_base64, sender)
-                # Upsert user stats untuk pesan gambar
-                await user_service.upsert_user_stats(sender, last_message="[image]")
-            else:
+            message_id = data.get("data", {}).get("message", {}).get("_data", {}).get("id", {}).get("id")
+            logger.info(f"Sender: {sender}, Mimetype: {mimetype}, Message ID: {message_id}")
+
+            is_image = bool(mimetype and "image/jpeg" in mimetype)
+            user_message = None
+            if not is_image:
                 user_message = data.get("data", {}).get("message", {}).get("_data", {}).get("body")
                 if not user_message:
                     logger.warning("No user message found in payload.")
                     return {"Status": "no_message"}
-                
-                # Check if user is requesting dashboard access
-                if user_message.lower().strip() in ["dashboard", "view dashboard", "show dashboard"]:
-                    logger.info("===============================")
-                    logger.info("User requested dashboard access")
-                    # Generate JWT token for the sender
-                    access_token = jwt_auth.jwt_service.create_access_token(sender)
-                    # Construct dashboard URL with token
-                    dashboard_url = f"{settings.frontend_base_url}/dashboard?token={access_token}"
-                    message = f"Here's your secure dashboard link (valid for 30 minutes):\n{dashboard_url}"
+
+            # Retry webhook dari gateway untuk message ID yang sama tidak diproses ulang
+            async with idempotency.ingest(message_id) as owner:
+                if not owner:
+                    logger.info(f"Duplicate webhook for message {message_id}, skipping")
+                    return {"Status": "duplicate"}
+
+                # Proses berat (download, OCR, LLM, balasan) dikerjakan di background job
+                if is_image:
+                    await job_queue.enqueue(IMAGE_JOB, image_job_key(sender, message_id), {"sender": sender, "message_id": message_id})
                 else:
-                    # Handle regular text messages
-                    logger.info("Processing user message with LLM service")
-                    message = await service.handle_text_message(user_message, sender)
-                    # Upsert user stats for text messages
-                    logger.info("Updating user stats")
-                    await user_service.upsert_user_stats(sender, last_message=user_message)
-                    logger.info("User stats updated successfully")
-
-            whatsapp_api.send_text_message(
-                recipient=sender,
-                body=message
-            )
-            return {"Status": "ok"}
+                    await job_queue.enqueue(TEXT_JOB, sender, {"sender": sender, "body": user_message, "message_id": message_id})
+
+            return {"Status": "queued"}
+    except QueueFullError as e:
+        logger.warning(f"Rejecting webhook: {e}")
+        raise HTTPException(status_code=503, detail="Server busy, please retry")
     except Exception as e:
         logger.error(f"Error processing webhook: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
+
+@router.get("/metrics", dependencies=[Depends(metrics_auth)])
+async def get_metrics(
+    job_queue: JobQueue = Depends(get_job_queue),
+    service: TransactionService = Depends(get_transaction_service)
+):
+    # Hanya membaca stats; tidak memicu pembuatan LLM chain atau OCR engine
+    return {
+        "job_queue": job_queue.stats(),
+        "write_behind": write_behind.stats(),
+        "idempotency": idempotency.stats(),
+        "stats_cache": stats_cache.stats(),
+        **service.metrics(),
+    }
     
 @router.get("/transactions")
 async def get_transactions(
     phone_number: str,
     month: Optional[int] = None,
     year: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    stream: bool = False,
+    service: TransactionService = Depends(get_transaction_service),
     authorized_phone: str = Depends(jwt_auth)
 ):
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
     try:
+        if stream:
+            # NDJSON: satu transaksi per baris, dikirim begitu dokumen keluar dari cursor
+            async def ndjson():
+                async for doc in service.iter_transactions(phone_number, month=month, year=year, fields=field_list):
+                    yield json.dumps(doc, ensure_ascii=False, default=str) + "\n"
+            return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+        if limit or cursor:
+            return await service.get_transactions_page(
+                phone_number, month=month, year=year, limit=limit or 50, cursor=cursor, fields=field_list
+            )
+
         transactions = await service.get_transactions(phone_number, month=month, year=year)
         return {"transactions": transactions}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching transactions: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -97,6 +118,7 @@ async def get_summary_stats(
     phone_number: str,
     month: Optional[int] = None,
     year: Optional[int] = None,
+    service: TransactionService = Depends(get_transaction_service),
     authorized_phone: str = Depends(jwt_auth)
 ):
     try:
@@ -111,6 +133,7 @@ async def get_daily_stats(
     phone_number: str,
     month: int,
     year: int,
+    service: TransactionService = Depends(get_transaction_service),
     authorized_phone: str = Depends(jwt_auth)
 ):
     try:
@@ -125,6 +148,7 @@ async def get_category_stats(
     phone_number: str,
     month: int,
     year: int,
+    service: TransactionService = Depends(get_transaction_service),
     authorized_phone: str = Depends(jwt_auth)
 ):
     try:
@@ -134,6 +158,29 @@ async def get_category_stats(
         logger.error(f"Error fetching category stats: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
+@router.get("/dashboard")
+async def get_dashboard(
+    request: Request,
+    response: Response,
+    phone_number: str,
+    month: int,
+    year: int,
+    service: TransactionService = Depends(get_transaction_service),
+    authorized_phone: str = Depends(jwt_auth)
+):
+    try:
+        etag = await service.get_dashboard_etag(phone_number, month, year)
+        if_none_match = request.headers.get("if-none-match", "")
+        if etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers={"ETag": etag})
+
+        dashboard = await service.get_dashboard(phone_number, month, year)
+        response.headers["ETag"] = etag
+        return dashboard
+    except Exception as e:
+        logger.error(f"Error fetching dashboard: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
 # @router.get("/stats/monthly_summary")
 # async def get_monthly_stats(
 #     phone_number: str,
@@ -152,6 +199,7 @@ async def get_category_stats(
 @router.delete("/transactions/{transaction_id}")
 async def delete_transaction(
     transaction_id: str,
+    service: TransactionService = Depends(get_transaction_service),
     authorized_phone: str = Depends(jwt_auth)
 ):
     try:
@@ -180,6 +228,7 @@ async def delete_transaction(
 async def update_transaction(
     transaction_id: str,
     data: dict,
+    service: TransactionService = Depends(get_transaction_service),
     authorized_phone: str = Depends(jwt_auth)
 ):
     try:
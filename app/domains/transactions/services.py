@@ -1,81 +1,274 @@
+import asyncio
 import logging
 import datetime
 import json
 from bson import ObjectId
 import base64
-from typing import Optional
+import hashlib
+import importlib
+from contextlib import nullcontext
+from typing import List, Optional
 from app.config.mongodb import mongodb
-from app.domains.transactions.llm_service import OpenAIProcessor
-from app.shared.cloudinary_service import CloudinaryService
-from app.domains.transactions.ocr_service import OCRProcessor
+from app.config.setting import settings
+from app.domains.transactions.llm_service import OpenAIProcessor, RECEIPT_UNREADABLE_REPLY
+from app.shared.storage import create_storage
+from app.shared.media_buffer import as_buffer
+from app.domains.transactions.ocr_service import OCRProcessor, OCRRouter
+from app.domains.transactions.ocr_cache import OCRResultCache
+from app.domains.transactions.chat_history import ChatHistoryCache
+from app.domains.transactions.upload_queue import ImageUploadQueue, PENDING as IMAGE_PENDING, UPLOADED as IMAGE_UPLOADED
+from app.domains.transactions.batch_extractor import BatchExtractor
+from app.domains.transactions.output_parser import OutputParseError
+from app.domains.transactions.rollups import rollups
+from app.domains.transactions.stats_cache import stats_cache
+from app.domains.transactions.replies import ReplyRenderer
+from app.shared.pipeline import PipelineMetrics, StageFailed, StagePipeline
+from pymongo import ReturnDocument
+
+# Di-import lazy oleh OpenAIProcessor / AzureOCRService, dimuat lebih dulu saat warm-up
+HEAVY_MODULES = (
+    "langchain.prompts",
+    "langchain.chains",
+    "langchain.chat_models",
+    "langchain_openai",
+    "azure.cognitiveservices.vision.computervision",
+    "msrest.authentication",
+)
+
+
+def _preload(modules):
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            logging.warning(f"Could not preload {name}: {e}")
 
 
 class TransactionService:
     def __init__(self):
-        self.openai = OpenAIProcessor()
-        self.ocr = OCRProcessor()
-        self.uploader = CloudinaryService()
-
-    async def handle_image(self, image_base64, phone_number: str):
+        # LLM chain dan OCR engine berat, dibuat saat pertama dipakai atau oleh warm_up
+        self._openai: Optional[OpenAIProcessor] = None
+        self._ocr: Optional[OCRProcessor] = None
+        self._extractor: Optional[BatchExtractor] = None
+        self.upload_queue = ImageUploadQueue(create_storage())
+        self.ocr_cache = OCRResultCache()
+        self.chat_history = ChatHistoryCache()
+        self.replies = ReplyRenderer(settings.reply_language, settings.reply_max_items)
+        self.image_pipeline = PipelineMetrics()
+
+    @property
+    def openai(self) -> OpenAIProcessor:
+        return self._ensure_openai()
+
+    @property
+    def ocr(self) -> OCRProcessor:
+        return self._ensure_ocr()
+
+    @property
+    def extractor(self) -> Optional[BatchExtractor]:
+        return self._ensure_extractor()
+
+    def _ensure_openai(self) -> OpenAIProcessor:
+        if self._openai is None:
+            self._openai = OpenAIProcessor()
+        return self._openai
+
+    def _ensure_ocr(self) -> OCRProcessor:
+        if self._ocr is None:
+            self._ocr = OCRProcessor()
+        return self._ocr
+
+    def _ensure_extractor(self) -> Optional[BatchExtractor]:
+        if self._extractor is None and settings.llm_batch_enabled:
+            self._extractor = BatchExtractor(
+                self._ensure_openai(),
+                max_batch=settings.llm_batch_max_size,
+                window=settings.llm_batch_window
+            )
+        return self._extractor
+
+    async def warm_up(self):
+        """Build the LLM chains and OCR engine ahead of the first message."""
+        # Modul SDK di-import di thread dulu supaya event loop tidak tertahan
+        await asyncio.to_thread(_preload, HEAVY_MODULES)
+        self._ensure_openai()
+        self._ensure_extractor()
+        await self._ensure_ocr().warm_up()
+
+    def metrics(self):
+        """Stats of this service; LLM and OCR components are reported only once built."""
+        openai, ocr = self._openai, self._ocr
+        return {
+            "ocr_cache": self.ocr_cache.stats(),
+            "chat_history": self.chat_history.stats(),
+            "image_upload": self.upload_queue.stats(),
+            "image_pipeline": self.image_pipeline.stats(),
+            "llm": openai.llm_client.stats() if openai else None,
+            "llm_batch": self._extractor.stats() if self._extractor else None,
+            "llm_output": openai.output_parser.stats() if openai else None,
+            "fast_parser": openai.fast_parser.stats() if openai else None,
+            "intent": openai.intent_classifier.stats() if openai else None,
+            "image_preprocessing": ocr.preprocessor.stats() if ocr and ocr.preprocessor else None,
+            "ocr_router": ocr.engine.stats() if ocr and isinstance(ocr.engine, OCRRouter) else None,
+        }
+
+    async def aclose(self):
+        await self.upload_queue.stop()
+        await self.upload_queue.storage.aclose()
+        if self._ocr is not None:
+            await self._ocr.aclose()
+
+    async def handle_image(self, image, phone_number: str):
+        """
+        Process a receipt image.
+
+        ``image`` is the decoded image as a memoryview/bytes (a base64 string
+        is still accepted). The same buffer is shared by hashing, OCR and upload.
+
+        The work runs as a stage DAG (see ``app.shared.pipeline``)::
+
+            ocr -> extract -> save_user_message
+                           -> dedupe -> store
+                           -> reply  ----------> save_reply
+
+        With ``REPLY_MODE=template`` the confirmation is rendered from the
+        parsed transaction by ``ReplyRenderer``. With ``llm`` the reply is the
+        ``answer_with_db_resume`` summary, which only needs the OCR text and
+        starts right after ``ocr``, overlapping extraction, the dedupe lookup
+        and the insert. Either way the reply is cancelled when the receipt
+        turns out to be a duplicate.
+        """
+        logging.info(f"Processing image for phone number: {phone_number}")
         try:
-            # OCR processing
-            logging.info(f"Processing image for phone number: {phone_number}")
-            try:
-                image_bytes = base64.b64decode(image_base64)
-                text_result = self.ocr.azure_ocr(image_bytes)
-            except Exception as e:
-                logging.error(f"Error during OCR processing: {str(e)}")
-                return {"OCR processing failed"}
+            image_bytes = as_buffer(image)
+            digest = self.ocr_cache.digest(image_bytes)
+        except Exception as e:
+            logging.error(f"Error processing image: {str(e)}")
+            return self.replies.failed()
+        # Gambar yang dikirim ke OCR dan storage (hasil preprocessing kalau aktif)
+        prepared = None
+
+        pipeline = StagePipeline(self.image_pipeline)
+
+        async def ocr(results):
+            nonlocal prepared
+            cached = await self.ocr_cache.get(digest)
+            if cached is not None and cached["parsed"] is not None:
+                # Gambar yang sama sudah pernah diproses, lewati OCR dan LLM
+                logging.info(f"OCR cache hit for image {digest}")
+                return {"text": cached["ocr_text"], "parsed": cached["parsed"]}
+            prepared = await self.ocr.prepare(image_bytes)
+            text_result = await self.ocr.read_text(prepared)
             logging.info(f"OCR Result: {text_result}")
-
-            # Send to OpenAI
-            result = self.openai.send_text(text_result)
-            if isinstance(result, str):
-                result = json.loads(result)
-
+            return {"text": text_result, "parsed": None}
+
+        async def extract(results):
+            text_result, result = results["ocr"]["text"], results["ocr"]["parsed"]
+            if result is None:
+                # Send to OpenAI; struk yang datang bersamaan diekstrak dalam satu request
+                if self.extractor is not None:
+                    result = await self.extractor.extract(text_result, phone_number)
+                else:
+                    result = await self.openai.extract_transaction(text_result)
+                await self.ocr_cache.set(digest, text_result, result)
             result['phone_number'] = phone_number
             result['created_at'] = datetime.datetime.utcnow().isoformat()
+            return result
 
-            await self.save_message(phone_number, "user", result)
+        async def save_user_message(results):
+            await self.save_message(phone_number, "user", results["extract"])
 
-            # Save to MongoDB
-            if mongodb.db is not None:
-                transaction_collection = mongodb.db["transactions"]
-
-                # Cek apakah record sudah ada
-                query = {
-                    "date": result.get("date"),
-                    "time": result.get("time"),
-                    "amount": result.get("amount")
-                }
-                existing = await transaction_collection.find_one(query)
-
-                if existing:
-                    logging.info(f"Transaction already exists: {existing['_id']}")
-                    existing['_id'] = str(existing['_id'])
-                    result = "Transaction already exists"
-                    await self.save_message(phone_number, "bot", result)
-                    return result
-                else:
-                    # upload to cloudinary when not exists
-                    image_data = "data:image/jpeg;base64," + image_base64
-                    image_url = self.uploader.upload_image(image_data)
-                    result['image_url'] = image_url
-
-                    insert_result = await transaction_collection.insert_one(result)
-                    logging.info(f"Inserted transaction with ID: {insert_result.inserted_id}")
-                    result['_id'] = str(insert_result.inserted_id)
-            else:
+        async def dedupe(results):
+            if mongodb.db is None:
                 raise Exception("MongoDB not connected")
-
+            result = results["extract"]
+            # Cek apakah record sudah ada
+            existing = await mongodb.db["transactions"].find_one({
+                "date": result.get("date"),
+                "time": result.get("time"),
+                "amount": result.get("amount")
+            })
+            if existing:
+                logging.info(f"Transaction already exists: {existing['_id']}")
+                # Jawaban tidak dipakai untuk transaksi duplikat
+                pipeline.cancel("reply")
+            return existing
+
+        async def store(results):
+            if results["dedupe"]:
+                return None
+            result = results["extract"]
+            # Upload gambar dikerjakan upload queue setelah insert; image_url di-patch menyusul
+            # Cache hit melewati OCR; gambar tetap di-preprocess supaya yang di-upload sama
+            image_to_store = prepared if prepared is not None else await self.ocr.prepare(image_bytes)
+            if self.upload_queue.running:
+                result['image_url'] = None
+                result['image_status'] = IMAGE_PENDING
+            else:
+                result['image_url'] = await self.upload_queue.upload_now(image_to_store)
+                result['image_status'] = IMAGE_UPLOADED
+
+            insert_result = await mongodb.db["transactions"].insert_one(result)
+            logging.info(f"Inserted transaction with ID: {insert_result.inserted_id}")
+            await rollups.on_insert(result)
+            await stats_cache.invalidate_for(result)
+            if result['image_status'] == IMAGE_PENDING:
+                await self.upload_queue.submit(insert_result.inserted_id, image_to_store)
+            result['_id'] = str(insert_result.inserted_id)
+            return insert_result.inserted_id
+
+        async def reply(results):
+            if llm_reply:
+                return await self.openai.answer_with_db_resume(results["ocr"]["text"])
+            return self.replies.render(results["extract"])
+
+        async def save_reply(results):
             # Jawab ke user
-            answer = self.openai.answer_with_db_resume(text_result)
+            if results["dedupe"]:
+                answer = "Transaction already exists" if llm_reply else self.replies.duplicate(results["extract"])
+            else:
+                answer = results["reply"]
             await self.save_message(phone_number, "bot", answer)
             return answer
 
-        except Exception as e:
+        llm_reply = settings.reply_mode == "llm"
+
+        (
+            pipeline
+            .stage("ocr", ocr)
+            .stage("extract", extract, after=["ocr"])
+            .stage("reply", reply, after=["ocr"] if llm_reply else ["extract"])
+            .stage("save_user_message", save_user_message, after=["extract"])
+            .stage("dedupe", dedupe, after=["extract"])
+            .stage("store", store, after=["dedupe"])
+            .stage("save_reply", save_reply, after=["save_user_message", "store", "reply"])
+        )
+
+        # Struk lain dari sender yang sama yang sedang diproses ikut satu batch LLM
+        extractor = self.extractor
+        try:
+            with extractor.receipt(phone_number) if extractor is not None else nullcontext():
+                results = await pipeline.run()
+        except StageFailed as e:
+            if e.stage == "ocr":
+                logging.error(f"Error during OCR processing: {str(e.error)}")
+                return RECEIPT_UNREADABLE_REPLY
+            if isinstance(e.error, OutputParseError):
+                logging.error(f"Could not parse transaction from OCR text: {e.error}")
+                return RECEIPT_UNREADABLE_REPLY
             logging.error(f"Error processing image: {str(e)}")
-            return {"error": "Failed to process image"}
+            return self.replies.failed()
+        finally:
+            logging.info(f"Image pipeline timings (ms): {self._format_timings(pipeline)}")
+
+        return results["save_reply"]
+
+    @staticmethod
+    def _format_timings(pipeline: StagePipeline) -> str:
+        return ", ".join(
+            f"{name}={timing.start_ms:.0f}+{timing.duration_ms:.0f}" + ("" if timing.status == "ok" else f" {timing.status}")
+            for name, timing in pipeline.timings.items()
+        ) + f"; critical path: {' > '.join(pipeline.critical_path())}"
 
     def is_personal_chat(self, sender: str):
         # Implement your logic to check if the chat is personal
@@ -90,14 +283,9 @@ class TransactionService:
     async def handle_text_message(self, message, sender):
         # save the message to the database
         await self.save_message(sender, "user", message)
-        
-        history = await self.get_last_message(sender, 5)
-        history = list(reversed(history))
 
-        history_message = "\n".join(
-            f"{'User' if msg['role'] == 'user' else 'Bot'}: {msg['message']}"
-            for msg in history
-        )
+        # Riwayat diambil dari ring buffer; Mongo hanya dibaca saat buffer belum warm
+        history_message = await self.chat_history.format(sender)
 
         # Hasil dari OpenAI
         result = await self.openai.handle_user_message(message, history_message, sender)
@@ -134,6 +322,8 @@ class TransactionService:
                     else:
                         insert_result = await transaction_collection.insert_one(parsed)
                         logging.info(f"Inserted transaction with ID: {insert_result.inserted_id}")
+                        await rollups.on_insert(parsed)
+                        await stats_cache.invalidate_for(parsed)
             else:
                 logging.info("Result from OpenAI is not a transaction, skipping DB insert.")
         
@@ -167,42 +357,120 @@ class TransactionService:
 
         cursor = transaction_collection.find(query)
         results = await cursor.to_list(length=None)
-        results = self.openai.convert_objectid_to_str(results)
+        results = OpenAIProcessor.convert_objectid_to_str(results)
         return results
-    
-    async def get_summary_stats(self, phone_number: str, month: Optional[int] = None, year: Optional[int] = None):
-        if mongodb.db is None:
-            raise Exception("MongoDB not connected")
 
-        collection = mongodb.db["transactions"]
-        match_stage = {"phone_number": phone_number}
+    @staticmethod
+    def encode_cursor(doc: dict) -> str:
+        raw = json.dumps({"d": doc.get("date"), "i": str(doc["_id"])})
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor: str):
+        try:
+            raw = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return raw["d"], ObjectId(raw["i"])
+        except Exception:
+            raise ValueError("Invalid cursor")
 
-        # Add date filtering if month and year are provided
+    def _transactions_query(self, phone_number: str, month: Optional[int], year: Optional[int], cursor: Optional[str] = None):
+        conditions = [{"phone_number": phone_number}]
         if month and year:
             start_date = datetime.datetime(year, month, 1)
-            if month == 12:
-                end_date = datetime.datetime(year + 1, 1, 1)
-            else:
-                end_date = datetime.datetime(year, month + 1, 1)
-            
-            match_stage["date"] = {
+            end_date = datetime.datetime(year + 1, 1, 1) if month == 12 else datetime.datetime(year, month + 1, 1)
+            conditions.append({"date": {
                 "$gte": start_date.strftime("%Y-%m-%d"),
-                "$lt": end_date.strftime("%Y-%m-%d")
-            }
+                "$lt": end_date.strftime("%Y-%m-%d"),
+            }})
 
-        pipeline = [
-            {"$match": match_stage},
-            {"$group": {
-                "_id": "$type",
-                "total": {"$sum": "$amount"}
-            }}
-        ]
-        result = await collection.aggregate(pipeline).to_list(None)
-        summary = {item["_id"]: item["total"] for item in result}
-        return summary
+        # Keyset pagination: lanjut dari (date, _id) terakhir, urutan menurun
+        if cursor:
+            last_date, last_id = self.decode_cursor(cursor)
+            conditions.append({"$or": [
+                {"date": {"$lt": last_date}},
+                {"date": last_date, "_id": {"$lt": last_id}},
+            ]})
+        return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+    @staticmethod
+    def _projection(fields: Optional[List[str]]):
+        if not fields:
+            return None
+        # date dan _id selalu ikut karena dipakai sebagai cursor
+        return {field: 1 for field in [*fields, "date", "_id"]}
+
+    @staticmethod
+    def _serialize(doc: dict) -> dict:
+        return {k: (str(v) if isinstance(v, ObjectId) else v) for k, v in doc.items()}
+
+    async def get_transactions_page(
+        self,
+        phone_number: str,
+        month: Optional[int] = None,
+        year: Optional[int] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None
+    ):
+        if mongodb.db is None:
+            raise Exception("MongoDB not connected")
+
+        query = self._transactions_query(phone_number, month, year, cursor)
+        find_cursor = (
+            mongodb.db["transactions"]
+            .find(query, self._projection(fields))
+            .sort([("date", -1), ("_id", -1)])
+            .limit(limit + 1)
+        )
+        docs = await find_cursor.to_list(length=limit + 1)
+
+        # Ambil satu dokumen ekstra untuk tahu apakah masih ada halaman berikutnya
+        next_cursor = self.encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+        return {
+            "transactions": [self._serialize(doc) for doc in docs[:limit]],
+            "next_cursor": next_cursor,
+        }
+
+    async def iter_transactions(
+        self,
+        phone_number: str,
+        month: Optional[int] = None,
+        year: Optional[int] = None,
+        fields: Optional[List[str]] = None,
+        batch_size: int = 200
+    ):
+        """Yield transactions one by one as the Motor cursor produces them."""
+        if mongodb.db is None:
+            raise Exception("MongoDB not connected")
+
+        query = self._transactions_query(phone_number, month, year)
+        find_cursor = (
+            mongodb.db["transactions"]
+            .find(query, self._projection(fields))
+            .sort([("date", -1), ("_id", -1)])
+            .batch_size(batch_size)
+        )
+        async for doc in find_cursor:
+            yield self._serialize(doc)
+    
+    async def get_summary_stats(self, phone_number: str, month: Optional[int] = None, year: Optional[int] = None):
+        if mongodb.db is None:
+            raise Exception("MongoDB not connected")
+
+        # Dibaca dari transaction_rollups, bukan agregasi ulang transaksi mentah
+        return await stats_cache.get_or_compute(
+            phone_number, month, year, "summary",
+            lambda: rollups.get_summary(phone_number, month, year)
+        )
 
-    # change to filter that the data shown is not deleted (soft delete)
     async def get_daily_stats(self, phone_number: str, month: int, year: int):
+        return await stats_cache.get_or_compute(
+            phone_number, month, year, "daily",
+            lambda: self._compute_daily_stats(phone_number, month, year)
+        )
+
+    # change to filter that the data shown is not deleted (soft delete)
+    async def _compute_daily_stats(self, phone_number: str, month: int, year: int):
         if mongodb.db is None:
             raise Exception("MongoDB not connected")
 
@@ -225,6 +493,16 @@ class TransactionService:
                     "is_deleted": {"$ne": True}  # exclude soft-deleted items
                 }
             },
+            *self._daily_stats_stages()
+        ]
+
+        result = await collection.aggregate(pipeline).to_list(None)
+        return result
+
+    @staticmethod
+    def _daily_stats_stages():
+        # Dipakai bersama oleh get_daily_stats dan facet "daily" di get_dashboard
+        return [
             {
                 "$group": {
                     "_id": "$date",
@@ -263,35 +541,19 @@ class TransactionService:
                 "$sort": {"date": -1}
             }
         ]
-
-
-
-        result = await collection.aggregate(pipeline).to_list(None)
-        return result
     
-    @staticmethod
-    async def save_message(phone_number, role, message):
-        # Implement your logic to save the message to the database
-        logging.info(mongodb.db is not None)
-        if mongodb.db is not None:
-            transaction_collection = mongodb.db["chats"]
-            insert_result = await transaction_collection.insert_one({
-                "phone_number": phone_number,
-                "role": role,  # "user" atau "bot"
-                "message": message,
-                "timestamp": datetime.datetime.utcnow()
-            })
-            logging.info(f"Inserted message with ID: {insert_result.inserted_id}")
-            return str(insert_result.inserted_id)
-        else:
-            raise Exception("MongoDB not connected")
-        
+    async def save_message(self, phone_number, role, message):
+        # Write-through ke koleksi chats dan ring buffer riwayat
+        inserted_id = await self.chat_history.append(phone_number, role, message)
+        logging.info(f"Inserted message with ID: {inserted_id}")
+        return inserted_id
+
     async def get_last_message(self, phone_number: str, limit: int = 5):
         if mongodb.db is not None:
             transaction_collection = mongodb.db["chats"]
             cursor = transaction_collection.find({"phone_number": phone_number}).sort("timestamp", -1).limit(limit)
             results = await cursor.to_list(length=limit)
-            results = self.openai.convert_objectid_to_str(results)
+            results = OpenAIProcessor.convert_objectid_to_str(results)
             return results
         else:
             raise Exception("MongoDB not connected")
@@ -394,61 +656,99 @@ class TransactionService:
         if mongodb.db is None:
             raise Exception("MongoDB not connected")
 
-        collection = mongodb.db["transactions"]
+        # Dibaca dari transaction_rollups, sudah diurutkan berdasarkan total
+        return await stats_cache.get_or_compute(
+            phone_number, month, year, "category",
+            lambda: rollups.get_categories(phone_number, month, year)
+        )
+    
+    async def get_dashboard(self, phone_number: str, month: int, year: int):
+        return await stats_cache.get_or_compute(
+            phone_number, month, year, "dashboard",
+            lambda: self._compute_dashboard(phone_number, month, year)
+        )
 
-        # Tentukan range tanggal awal dan akhir bulan
-        start_date = datetime.datetime(year, month, 1)
-        if month == 12:
-            end_date = datetime.datetime(year + 1, 1, 1)
-        else:
-            end_date = datetime.datetime(year, month + 1, 1)
+    async def _compute_dashboard(self, phone_number: str, month: int, year: int):
+        """
+        Compute summary, daily, category and transaction views of one month in
+        a single ``$facet`` aggregation (one scan, one round-trip).
+        """
+        if mongodb.db is None:
+            raise Exception("MongoDB not connected")
 
-        # Ubah tanggal ke format string sesuai format data di MongoDB (yyyy-mm-dd)
-        start_date_str = start_date.strftime('%Y-%m-%d')
-        end_date_str = end_date.strftime('%Y-%m-%d')
+        start_date = datetime.datetime(year, month, 1)
+        end_date = datetime.datetime(year + 1, 1, 1) if month == 12 else datetime.datetime(year, month + 1, 1)
+        not_deleted = {"$match": {"is_deleted": {"$ne": True}}}
 
-        logging.info("===============this is get category stats===============")
-        logging.info(f"Start Date: {start_date_str}, End Date: {end_date_str}")
-        
         pipeline = [
             {
                 "$match": {
                     "phone_number": phone_number,
-                    "date": {"$gte": start_date_str, "$lt": end_date_str}
+                    "date": {"$gte": start_date.strftime('%Y-%m-%d'), "$lt": end_date.strftime('%Y-%m-%d')}
                 }
             },
             {
-                "$group": {
-                    "_id": "$category",
-                    "type": {"$first": "$type"},
-                    "total": {"$sum": "$amount"}
+                "$facet": {
+                    "summary": [
+                        not_deleted,
+                        {"$group": {"_id": {"$toLower": "$type"}, "total": {"$sum": "$amount"}}}
+                    ],
+                    "daily_stats": [not_deleted, *self._daily_stats_stages()],
+                    "category_stats": [
+                        not_deleted,
+                        {"$group": {"_id": "$category", "type": {"$first": {"$toLower": "$type"}}, "total": {"$sum": "$amount"}}},
+                        {"$sort": {"total": -1}}
+                    ],
+                    "transactions": [
+                        {"$sort": {"date": -1, "_id": -1}},
+                        {"$addFields": {"_id": {"$toString": "$_id"}}}
+                    ],
                 }
-            },
-            {
-                "$sort": {"total": -1}
             }
         ]
 
-        logging.info(f"Pipeline: {pipeline}")
-        result = await collection.aggregate(pipeline).to_list(None)
-        return result
-    
+        result = await mongodb.db["transactions"].aggregate(pipeline).to_list(None)
+        facets = result[0] if result else {}
+        return {
+            "summary": {item["_id"]: item["total"] for item in facets.get("summary", [])},
+            "daily_stats": facets.get("daily_stats", []),
+            "category_stats": facets.get("category_stats", []),
+            "transactions": facets.get("transactions", []),
+        }
+
+    async def get_dashboard_etag(self, phone_number: str, month: int, year: int) -> str:
+        """
+        Cheap ETag for a month's dashboard, derived from the rollup version that
+        every transaction write bumps, so it can be checked without the scan.
+        """
+        version = await rollups.get_version(phone_number, month, year)
+        raw = f"{phone_number}:{year}-{month}:{version}"
+        return '"' + hashlib.sha1(raw.encode()).hexdigest() + '"'
+
     # delete transaction, make it soft delete
     async def delete_transaction(self, transaction_id: str):
         if mongodb.db is None:
             raise Exception("MongoDB not connected")
 
         collection = mongodb.db["transactions"]
-        result = await collection.update_one(
+        before = await collection.find_one_and_update(
             {"_id": ObjectId(transaction_id)}, 
-            {"$set": {"is_deleted": True}}
+            {"$set": {"is_deleted": True}},
+            return_document=ReturnDocument.BEFORE
         )
-        return result
+        if before and not before.get("is_deleted"):
+            await rollups.on_delete(before)
+            await stats_cache.invalidate_for(before)
+        return before
 
     async def update_transaction(self, transaction_id: str, data: dict):
         if mongodb.db is None:
             raise Exception("MongoDB not connected")
 
+        # type disimpan huruf kecil, sama seperti Transaction.normalize_type
+        if isinstance(data.get("type"), str):
+            data["type"] = data["type"].strip().lower()
+
         # Hitung ulang amount kalau field items dikirim
         if "items" in data:
             try:
@@ -457,8 +757,14 @@ class TransactionService:
                 raise ValueError(f"Invalid item format: {e}")
 
         collection = mongodb.db["transactions"]
-        result = await collection.update_one(
+        before = await collection.find_one_and_update(
             {"_id": ObjectId(transaction_id)},
-            {"$set": data}
+            {"$set": data},
+            return_document=ReturnDocument.BEFORE
         )
-        return result
\ No newline at end of file
+        if before:
+            after = {**before, **data}
+            await rollups.on_update(before, after)
+            await stats_cache.invalidate_for(before)
+            await stats_cache.invalidate_for(after)
+        return before
\ No newline at end of file
@@ -0,0 +1,128 @@
+import json
+import logging
+import re
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+from app.config.setting import settings
+from app.shared.cache import InMemoryCacheBackend, RedisCacheBackend
+
+logger = logging.getLogger(__name__)
+
+VIEWS = ("summary", "daily", "category", "dashboard")
+
+_DATE_RE = re.compile(r"^(\d{4})-(\d{2})")
+
+
+class StatsCache:
+    """
+    Cache for the stats endpoints, keyed by (phone_number, month, year, view).
+
+    Entries are invalidated precisely by the transaction write paths: a write
+    drops every view of the affected month plus the all-time summary.
+
+    Invalidation works by generation: every (phone_number, period) has a
+    generation token that is part of the value keys, and a write replaces
+    the token. A value computed while a write lands is stored under the old
+    generation and is never read, instead of being served until the TTL.
+    """
+
+    def __init__(self, backend=None, ttl_seconds: int = None):
+        self.backend = backend or InMemoryCacheBackend(settings.stats_cache_max_entries)
+        self.ttl_seconds = ttl_seconds or settings.stats_cache_ttl_seconds
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def configure(self, backend):
+        self.backend = backend
+
+    @staticmethod
+    def key(phone_number: str, month: Optional[int], year: Optional[int], view: str) -> str:
+        # Tanpa month dan year lengkap, stats dihitung untuk semua waktu
+        period = f"{year}-{month}" if month and year else "all"
+        return f"stats:{phone_number}:{period}:{view}"
+
+    @staticmethod
+    def generation_key(phone_number: str, month: Optional[int], year: Optional[int]) -> str:
+        period = f"{year}-{month}" if month and year else "all"
+        return f"stats:{phone_number}:{period}:gen"
+
+    async def get_or_compute(
+        self,
+        phone_number: str,
+        month: Optional[int],
+        year: Optional[int],
+        view: str,
+        compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        try:
+            # Generation dibaca sebelum compute; invalidasi di tengah compute menggantinya
+            generation = await self.backend.get(self.generation_key(phone_number, month, year)) or "0"
+            key = f"{self.key(phone_number, month, year, view)}:{generation}"
+            cached = await self.backend.get(key)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Stats cache get failed: {e}")
+            self.misses += 1
+            return await compute()
+
+        if cached is not None:
+            self.hits += 1
+            return json.loads(cached)
+
+        self.misses += 1
+        value = await compute()
+        try:
+            await self.backend.set(key, json.dumps(value, default=str), self.ttl_seconds)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Stats cache set failed: {e}")
+        return value
+
+    async def invalidate(self, phone_number: str, month: Optional[int], year: Optional[int]):
+        periods = [(None, None)]
+        if month and year:
+            periods.append((month, year))
+        generation = uuid.uuid4().hex[:12]
+        try:
+            for period_month, period_year in periods:
+                # Harus hidup lebih lama dari value yang ditulis dengan generation sebelumnya
+                await self.backend.set(
+                    self.generation_key(phone_number, period_month, period_year), generation, self.ttl_seconds * 2
+                )
+            self.invalidations += 1
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Stats cache invalidation failed: {e}")
+
+    async def invalidate_for(self, doc: Optional[Dict[str, Any]]):
+        """Invalidate the month a transaction document belongs to."""
+        if not doc or not doc.get("phone_number"):
+            return
+        match = _DATE_RE.match(str(doc.get("date") or ""))
+        if match:
+            await self.invalidate(doc["phone_number"], int(match.group(2)), int(match.group(1)))
+        else:
+            await self.invalidate(doc["phone_number"], None, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+        }
+
+
+def create_backend():
+    if settings.stats_cache_backend == "redis":
+        return RedisCacheBackend(settings.stats_cache_redis_url)
+    return InMemoryCacheBackend(settings.stats_cache_max_entries)
+
+
+stats_cache = StatsCache()
@@ -0,0 +1,200 @@
+import asyncio
+import datetime
+import logging
+import random
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from bson import Binary, ObjectId
+from app.config.mongodb import mongodb
+from app.config.setting import settings
+from app.shared.storage import StorageBackend
+from app.domains.transactions.rollups import rollups
+from app.domains.transactions.stats_cache import stats_cache
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+UPLOADED = "uploaded"
+FAILED = "failed"
+
+
+@dataclass
+class UploadTask:
+    transaction_id: ObjectId
+    image: Any  # memoryview/bytes
+    attempts: int = 0
+    url: Optional[str] = None
+    created_at: datetime.datetime = field(default_factory=datetime.datetime.utcnow)
+
+
+class ImageUploadQueue:
+    """
+    Uploads receipt images off the reply path.
+
+    ``handle_image`` inserts the transaction with ``image_status: pending``
+    and submits the image here; a bounded pool of workers uploads it to the
+    storage backend, then patches ``image_url`` and ``image_status`` on the
+    transaction. Failed uploads are retried with backoff and, after
+    ``max_attempts``, written with the image to ``image_upload_dead_letters``.
+    """
+
+    collection_name = "transactions"
+    dead_letter_collection = "image_upload_dead_letters"
+
+    def __init__(
+        self,
+        storage: StorageBackend,
+        workers: int = None,
+        maxsize: int = None,
+        max_attempts: int = None,
+        backoff: float = 1.0
+    ):
+        self.storage = storage
+        self.workers = workers or settings.image_upload_workers
+        self.maxsize = maxsize or settings.image_upload_queue_size
+        self.max_attempts = max_attempts or settings.image_upload_max_attempts
+        self.backoff = backoff
+        # Dibuat saat start supaya terikat ke event loop yang berjalan
+        self._queue: Optional["asyncio.Queue[UploadTask]"] = None
+        self._tasks: List[asyncio.Task] = []
+
+        self.submitted = 0
+        self.uploaded = 0
+        self.retries = 0
+        self.dead_lettered = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(i)))
+
+    async def stop(self, timeout: float = 10.0):
+        """Wait up to ``timeout`` for queued uploads, dead-letter the rest."""
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self._queue.qsize()} image uploads still queued at shutdown")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        while not self._queue.empty():
+            await self._dead_letter(self._queue.get_nowait(), "shutdown before upload")
+
+    async def submit(self, transaction_id: ObjectId, image) -> bool:
+        """
+        Queue an upload for ``transaction_id``. Waits when the queue is full
+        (backpressure on the job worker, not on the webhook). Returns False
+        when the queue is not running so the caller can upload inline.
+        """
+        if not self.running:
+            return False
+        await self._queue.put(UploadTask(transaction_id, image))
+        self.submitted += 1
+        return True
+
+    async def upload_now(self, image) -> str:
+        return await self.storage.put(image)
+
+    async def _worker(self, index: int):
+        while True:
+            task = await self._queue.get()
+            try:
+                await self._process(task)
+            except asyncio.CancelledError:
+                # Dihentikan saat shutdown di tengah upload/backoff: simpan dulu, jangan hilang
+                await asyncio.shield(self._settle_cancelled(task))
+                raise
+            except Exception as e:
+                logger.error(f"Image upload worker {index} error: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, task: UploadTask):
+        while True:
+            task.attempts += 1
+            try:
+                url = await self.storage.put(task.image, str(task.transaction_id))
+            except Exception as e:
+                if task.attempts >= self.max_attempts:
+                    await self._dead_letter(task, str(e))
+                    return
+                self.retries += 1
+                delay = self.backoff * (2 ** (task.attempts - 1)) * (0.5 + random.random())
+                logger.warning(f"Upload for transaction {task.transaction_id} failed, retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+                continue
+
+            self.uploaded += 1
+            task.url = url
+            await self._patch(task.transaction_id, {"image_url": url, "image_status": UPLOADED})
+            return
+
+    async def _settle_cancelled(self, task: UploadTask):
+        if task.url is not None:
+            # Upload sudah selesai, tinggal patch transaksinya
+            try:
+                await self._patch(task.transaction_id, {"image_url": task.url, "image_status": UPLOADED})
+            except Exception as e:
+                logger.error(f"Failed to patch uploaded image for {task.transaction_id}: {e}")
+            return
+        await self._dead_letter(task, "shutdown during upload")
+
+    async def _patch(self, transaction_id: ObjectId, fields: Dict[str, Any]):
+        if mongodb.db is None:
+            return
+        doc = await mongodb.db[self.collection_name].find_one_and_update(
+            {"_id": transaction_id},
+            {"$set": fields},
+            projection={"phone_number": 1, "date": 1, "amount": 1, "is_deleted": 1}
+        )
+        # image_url ikut di list/dashboard: naikkan versi rollup (ETag) dan buang cache stats
+        await rollups.touch(doc)
+        await stats_cache.invalidate_for(doc)
+
+    async def _dead_letter(self, task: UploadTask, error: str):
+        self.dead_lettered += 1
+        logger.error(f"Upload for transaction {task.transaction_id} dead-lettered after {task.attempts} attempts: {error}")
+        if mongodb.db is None:
+            return
+        try:
+            await mongodb.db[self.dead_letter_collection].insert_one({
+                "transaction_id": task.transaction_id,
+                "image": Binary(bytes(task.image)),
+                "error": error,
+                "attempts": task.attempts,
+                "created_at": task.created_at,
+                "failed_at": datetime.datetime.utcnow(),
+            })
+            await self._patch(task.transaction_id, {"image_status": FAILED})
+        except Exception as e:
+            logger.error(f"Failed to dead-letter upload for {task.transaction_id}: {e}")
+
+    async def requeue_dead_letters(self, limit: int = 100) -> int:
+        """Move dead-lettered uploads back onto the queue; returns how many."""
+        if mongodb.db is None or not self.running:
+            return 0
+        collection = mongodb.db[self.dead_letter_collection]
+        count = 0
+        async for doc in collection.find({}).limit(limit):
+            await self._queue.put(UploadTask(doc["transaction_id"], memoryview(doc["image"])))
+            await collection.delete_one({"_id": doc["_id"]})
+            count += 1
+        return count
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "submitted": self.submitted,
+            "uploaded": self.uploaded,
+            "retries": self.retries,
+            "dead_lettered": self.dead_lettered,
+        }
@@ -1,5 +1,6 @@
 import datetime
 from app.config.mongodb import mongodb
+from app.shared.write_behind import write_behind
 
 class UserService:
     def __init__(self):
@@ -37,7 +38,9 @@ class UserService:
         if inc_dict:
             update["$inc"] = inc_dict
 
-        await self.users.update_one(
+        # Ditulis lewat write-behind; upsert beruntun untuk nomor yang sama digabung jadi satu
+        await write_behind.update(
+            self.users,
             {"phone_number": phone_number},
             update,
             upsert=True
@@ -1,8 +1,10 @@
+import asyncio
 import io
-from azure.cognitiveservices.vision.computervision import ComputerVisionClient
-from msrest.authentication import CognitiveServicesCredentials
+import httpx
 import os
 import time
+from app.config.setting import settings
+from app.shared.media_buffer import aiter_chunks
 
 class AzureOCRService:
     def __init__(self):
@@ -13,6 +15,10 @@ class AzureOCRService:
         self.endpoint = os.getenv("AZURE_OCR_ENDPOINT")
         self.key = os.getenv("AZURE_OCR_KEY")
 
+        # SDK Azure hanya dipakai jalur sinkron; di-import saat client dibuat
+        from azure.cognitiveservices.vision.computervision import ComputerVisionClient
+        from msrest.authentication import CognitiveServicesCredentials
+
         # Create a client
         self.client = ComputerVisionClient(self.endpoint, CognitiveServicesCredentials(self.key))
 
@@ -87,4 +93,154 @@ class AzureOCRService:
             return "\n".join(extracted_text)
 
         # If the operation failed, return an empty string or raise an error
-        return ""
\ No newline at end of file
+        return ""
+
+class AzureOCRTimeoutError(Exception):
+    """Raised when an Azure Read operation does not finish within the timeout."""
+
+
+class AsyncAzureOCRService:
+    def __init__(
+        self,
+        timeout: float = None,
+        max_concurrency: int = None,
+        poll_initial: float = None,
+        poll_max: float = None
+    ):
+        """
+        Initialize the asyncio Azure OCR client.
+
+        Talks to the Read 3.2 REST API directly over a shared httpx connection
+        pool, so polling never blocks the event loop.
+        """
+        self.endpoint = (settings.azure_ocr_endpoint or "").rstrip("/")
+        self.key = settings.azure_ocr_key
+        self.timeout = timeout or settings.azure_ocr_timeout
+        self.poll_initial = poll_initial or settings.azure_ocr_poll_initial
+        self.poll_max = poll_max or settings.azure_ocr_poll_max
+
+        max_concurrency = max_concurrency or settings.azure_ocr_max_concurrency
+        self.max_concurrency = max_concurrency
+        # Dibuat saat pertama dipakai supaya terikat ke event loop yang berjalan
+        self._semaphore = None
+        self._in_flight = 0
+        self.client = httpx.AsyncClient(
+            headers={"Ocp-Apim-Subscription-Key": self.key},
+            timeout=httpx.Timeout(10.0),
+            limits=httpx.Limits(max_connections=max_concurrency * 2, max_keepalive_connections=max_concurrency)
+        )
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def read_text_from_url(self, image_url: str) -> str:
+        """
+        Read text from an image URL using Azure OCR.
+
+        :param image_url: URL of the image.
+        :return: Extracted text as a single string.
+        """
+        result = await self._analyze(json={"url": image_url})
+        return self.extract_text(result)
+
+    async def read_text_from_image_bytes(self, image_bytes) -> str:
+        """
+        Read text from an image using Azure OCR with image bytes.
+
+        :param image_bytes: Image in bytes format.
+        :return: Extracted text as a single string.
+        """
+        result = await self._analyze(image=memoryview(image_bytes).cast("B"))
+        return self.extract_text(result)
+
+    async def read_image(self, image_bytes):
+        """
+        Read text and the mean word confidence from an image.
+
+        :param image_bytes: Image in bytes format.
+        :return: (extracted text, mean confidence between 0 and 1 or None).
+        """
+        result = await self._analyze(image=memoryview(image_bytes).cast("B"))
+        return self.extract_text(result), self.extract_confidence(result)
+
+    async def _analyze(self, **request_kwargs) -> dict:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            self._in_flight += 1
+            try:
+                return await asyncio.wait_for(self._submit_and_poll(**request_kwargs), self.timeout)
+            except asyncio.TimeoutError:
+                raise AzureOCRTimeoutError(f"Azure OCR did not finish within {self.timeout}s")
+            finally:
+                self._in_flight -= 1
+
+    async def _submit_and_poll(self, **request_kwargs) -> dict:
+        response = await self._submit(**request_kwargs)
+        while response.status_code == 429:
+            await asyncio.sleep(self._retry_after(response) or self.poll_max)
+            response = await self._submit(**request_kwargs)
+        response.raise_for_status()
+        operation_location = response.headers["Operation-Location"]
+
+        # Poll dimulai cepat lalu melambat, kecuali server minta Retry-After
+        delay = self.poll_initial
+        await asyncio.sleep(self._retry_after(response) or delay)
+        while True:
+            response = await self.client.get(operation_location)
+            if response.status_code == 429:
+                await asyncio.sleep(self._retry_after(response) or delay)
+                continue
+            response.raise_for_status()
+            result = response.json()
+            if result.get("status") not in ["notStarted", "running"]:
+                return result
+
+            delay = min(delay * 2, self.poll_max)
+            await asyncio.sleep(self._retry_after(response) or delay)
+
+    async def _submit(self, json: dict = None, image: memoryview = None):
+        url = f"{self.endpoint}/vision/v3.2/read/analyze"
+        if image is None:
+            return await self.client.post(url, json=json)
+        # Kirim buffer gambar per potongan, tanpa menyalin seluruh isinya
+        return await self.client.post(
+            url,
+            content=aiter_chunks(image),
+            headers={"Content-Type": "application/octet-stream", "Content-Length": str(len(image))}
+        )
+
+    @staticmethod
+    def _retry_after(response) -> float:
+        value = response.headers.get("Retry-After")
+        try:
+            return float(value) if value else 0.0
+        except ValueError:
+            return 0.0
+
+    @staticmethod
+    def extract_text(result: dict) -> str:
+        # If the operation failed, return an empty string
+        if result.get("status") != "succeeded":
+            return ""
+
+        extracted_text = []
+        for read_result in result.get("analyzeResult", {}).get("readResults", []):
+            for line in read_result.get("lines", []):
+                extracted_text.append(line["text"])
+        return "\n".join(extracted_text)
+
+    @staticmethod
+    def extract_confidence(result: dict):
+        confidences = [
+            word["confidence"]
+            for read_result in result.get("analyzeResult", {}).get("readResults", [])
+            for line in read_result.get("lines", [])
+            for word in line.get("words", [])
+            if "confidence" in word
+        ]
+        return sum(confidences) / len(confidences) if confidences else None
+
+    async def aclose(self):
+        await self.client.aclose()
@@ -0,0 +1,147 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+class InMemoryCacheBackend:
+    """Bounded in-process cache with LRU eviction and a per-entry TTL."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: int):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    async def aclose(self):
+        pass
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisCacheBackend:
+    """
+    Cache backend speaking the Redis protocol (RESP) over a single connection.
+
+    Only GET, SET EX and DEL are used, so any Redis-compatible server works,
+    including a local stand-in for tests and benchmarks.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0"):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self._command("GET", key)
+        return value.decode() if value is not None else None
+
+    async def set(self, key: str, value: str, ttl: int):
+        await self._command("SET", key, value, "EX", str(ttl))
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self._command("DEL", *keys)
+
+    async def aclose(self):
+        self._reset()
+
+    async def _command(self, *args: str):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            try:
+                if self._writer is None:
+                    await self._connect()
+                return await self._send(*args)
+            except RedisError:
+                # Error dari server adalah balasan lengkap, koneksi masih sinkron
+                raise
+            except BaseException:
+                # Putus, timeout atau cancel di tengah command: balasan yang belum
+                # terbaca akan dibaca command berikutnya, jadi tutup koneksinya
+                self._reset()
+                raise
+
+    def _reset(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = None
+        self._writer = None
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            if self.password:
+                await self._send("AUTH", self.password)
+            if self.db:
+                await self._send("SELECT", str(self.db))
+        except BaseException:
+            # AUTH/SELECT gagal: jangan pakai koneksi yang belum siap
+            self._reset()
+            raise
+
+    async def _send(self, *args: str):
+        parts: List[bytes] = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg.encode() if isinstance(arg, str) else arg
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._writer.write(b"".join(parts))
+        await self._writer.drain()
+        return await self._read_reply()
+
+    async def _read_reply(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b"+":
+            return payload.decode()
+        if prefix == b"-":
+            raise RedisError(payload.decode())
+        if prefix == b":":
+            return int(payload)
+        if prefix == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2]
+        if prefix == b"*":
+            length = int(payload)
+            if length == -1:
+                return None
+            return [await self._read_reply() for _ in range(length)]
+        # Stream tidak sinkron lagi, perlakukan seperti koneksi putus
+        raise ConnectionError(f"Unexpected Redis reply: {line!r}")
@@ -1,7 +1,6 @@
 from dotenv import load_dotenv
 import os
-import cloudinary
-import cloudinary.uploader
+from app.shared.media_buffer import MemoryViewReader
 
 class CloudinaryService:
     def __init__(self):
@@ -13,6 +12,12 @@ class CloudinaryService:
         self.folder = os.getenv("CLOUDINARY_FOLDER")
 
     def upload_image(self, image_bytes, filename=None):
+        # SDK Cloudinary di-import saat upload pertama, bukan saat startup
+        import cloudinary.uploader
+
+        # Buffer (bytes/memoryview) dibungkus sebagai file-like supaya tidak perlu data URI base64
+        if not isinstance(image_bytes, str):
+            image_bytes = MemoryViewReader(image_bytes)
         result = cloudinary.uploader.upload(
             image_bytes,
             public_id=filename,  # Optional
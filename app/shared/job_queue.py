@@ -0,0 +1,216 @@
+import asyncio
+import datetime
+import logging
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at capacity and cannot accept more work."""
+
+
+@dataclass
+class Job:
+    kind: str
+    key: str
+    payload: Dict[str, Any]
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    attempts: int = 0
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class InMemoryJobBackend:
+    """Backend yang tidak menyimpan apa-apa; job hilang kalau proses restart."""
+
+    async def save(self, job: Job):
+        pass
+
+    async def mark_done(self, job: Job):
+        pass
+
+    async def mark_failed(self, job: Job, error: str):
+        pass
+
+    async def load_pending(self) -> List[Job]:
+        return []
+
+
+class MongoJobBackend:
+    """
+    Persist jobs in a Mongo collection so they survive a restart.
+
+    Jobs that had not finished when the process stopped are loaded again on
+    startup and re-enqueued.
+    """
+
+    def __init__(self, db, collection_name: str = "jobs"):
+        self.collection = db[collection_name]
+
+    async def save(self, job: Job):
+        await self.collection.insert_one({
+            "_id": job.id,
+            "kind": job.kind,
+            "key": job.key,
+            "payload": job.payload,
+            "status": "pending",
+            "attempts": job.attempts,
+            "created_at": datetime.datetime.utcnow(),
+        })
+
+    async def mark_done(self, job: Job):
+        await self.collection.delete_one({"_id": job.id})
+
+    async def mark_failed(self, job: Job, error: str):
+        await self.collection.update_one(
+            {"_id": job.id},
+            {"$set": {"status": "failed", "error": error, "attempts": job.attempts}}
+        )
+
+    async def load_pending(self) -> List[Job]:
+        cursor = self.collection.find({"status": "pending"}).sort("created_at", 1)
+        docs = await cursor.to_list(length=None)
+        return [
+            Job(kind=doc["kind"], key=doc["key"], payload=doc["payload"], id=doc["_id"], attempts=doc.get("attempts", 0))
+            for doc in docs
+        ]
+
+
+JobHandler = Callable[[Job], Awaitable[Any]]
+
+
+class JobQueue:
+    """
+    Bounded in-process job queue with a fixed worker pool.
+
+    Jobs that share the same key (e.g. the sender's phone number) are run one at
+    a time in the order they were enqueued, while jobs for different keys run
+    concurrently up to ``workers``.
+    """
+
+    def __init__(self, workers: int = 4, maxsize: int = 1000, max_attempts: int = 1, backend=None):
+        self.workers = workers
+        self.maxsize = maxsize
+        self.max_attempts = max_attempts
+        self.backend = backend or InMemoryJobBackend()
+        self.handlers: Dict[str, JobHandler] = {}
+
+        self._pending: Dict[str, Deque[Job]] = {}
+        self._ready: "asyncio.Queue[str]" = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._depth = 0
+        self._in_flight = 0
+
+        self._enqueued = 0
+        self._processed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def register(self, kind: str, handler: JobHandler):
+        self.handlers[kind] = handler
+
+    async def start(self):
+        for job in await self.backend.load_pending():
+            logger.info(f"Re-enqueueing persisted job {job.id} ({job.kind})")
+            self._push(job)
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(i)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(self, kind: str, key: str, payload: Dict[str, Any]) -> Job:
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        if self._depth >= self.maxsize:
+            self._rejected += 1
+            raise QueueFullError(f"Job queue is full ({self.maxsize} jobs)")
+
+        job = Job(kind=kind, key=key, payload=payload)
+        await self.backend.save(job)
+        self._push(job)
+        self._enqueued += 1
+        return job
+
+    def _push(self, job: Job):
+        queue = self._pending.get(job.key)
+        if queue is None:
+            # Key belum aktif, worker bisa langsung mengambilnya
+            self._pending[job.key] = deque([job])
+            self._ready.put_nowait(job.key)
+        else:
+            queue.append(job)
+        self._depth += 1
+
+    async def _worker(self, index: int):
+        while True:
+            key = await self._ready.get()
+            job = self._pending[key].popleft()
+            self._depth -= 1
+            self._in_flight += 1
+
+            wait = time.monotonic() - job.enqueued_at
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+
+            try:
+                await self._run(job)
+            finally:
+                self._in_flight -= 1
+                # Job berikutnya untuk key yang sama baru boleh jalan setelah ini selesai
+                if self._pending[key]:
+                    self._ready.put_nowait(key)
+                else:
+                    del self._pending[key]
+
+    async def _run(self, job: Job):
+        handler = self.handlers[job.kind]
+        while True:
+            job.attempts += 1
+            try:
+                await handler(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if job.attempts < self.max_attempts:
+                    logger.warning(f"Job {job.id} ({job.kind}) failed, retrying: {e}")
+                    continue
+                logger.error(f"Job {job.id} ({job.kind}) failed: {e}")
+                self._failed += 1
+                await self._safe(self.backend.mark_failed(job, str(e)))
+                return
+            self._processed += 1
+            await self._safe(self.backend.mark_done(job))
+            return
+
+    @staticmethod
+    async def _safe(coro):
+        try:
+            await coro
+        except Exception as e:
+            logger.error(f"Job backend error: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        started = self._processed + self._failed + self._in_flight
+        return {
+            "workers": self.workers,
+            "maxsize": self.maxsize,
+            "depth": self._depth,
+            "in_flight": self._in_flight,
+            "active_keys": len(self._pending),
+            "enqueued": self._enqueued,
+            "processed": self._processed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "avg_wait_ms": round(self._total_wait / started * 1000, 2) if started else 0.0,
+            "max_wait_ms": round(self._max_wait * 1000, 2),
+        }
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class LLMTimeoutError(Exception):
+    """Raised when an LLM call does not finish within its timeout."""
+
+
+class _InFlight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncLLMClient:
+    """
+    Shared entry point for async LangChain calls.
+
+    Every call goes through ``ainvoke`` behind a semaphore, gets a per-call
+    timeout, and identical in-flight requests (same chain, same inputs) are
+    coalesced so they share a single upstream call.
+    """
+
+    def __init__(self, max_concurrency: int = 8, timeout: float = 60.0):
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        # Dibuat saat pertama dipakai supaya terikat ke event loop yang berjalan
+        self._semaphore = None
+        self._in_flight: Dict[Hashable, _InFlight] = {}
+
+        self.calls = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    async def invoke(self, chain, inputs: Dict[str, Any], timeout: float = None) -> Any:
+        key = self._key(chain, inputs)
+        entry = self._in_flight.get(key)
+        if entry is None:
+            # Call upstream jalan di task sendiri, jadi cancel pada pemanggil pertama
+            # tidak ikut membatalkan pemanggil lain yang menunggu hasil yang sama
+            task = asyncio.ensure_future(self._call(chain, inputs, timeout or self.timeout))
+            entry = self._in_flight[key] = _InFlight(task)
+            task.add_done_callback(lambda t: self._finished(key, t))
+        else:
+            self.coalesced += 1
+
+        entry.waiters += 1
+        try:
+            return await asyncio.shield(entry.task)
+        finally:
+            entry.waiters -= 1
+            # Semua pemanggil sudah pergi, tidak ada yang butuh hasilnya lagi
+            if entry.waiters == 0 and not entry.task.done():
+                entry.task.cancel()
+                if self._in_flight.get(key) is entry:
+                    del self._in_flight[key]
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        entry = self._in_flight.get(key)
+        if entry is not None and entry.task is task:
+            del self._in_flight[key]
+        # Hindari warning "exception was never retrieved" kalau tidak ada yang menunggu
+        if not task.cancelled():
+            task.exception()
+
+    async def _call(self, chain, inputs: Dict[str, Any], timeout: float) -> Any:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            self.calls += 1
+            try:
+                return await asyncio.wait_for(chain.ainvoke(inputs), timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise LLMTimeoutError(f"LLM call did not finish within {timeout}s")
+            except Exception:
+                self.errors += 1
+                raise
+
+    @staticmethod
+    def _key(chain, inputs: Dict[str, Any]) -> Tuple[int, str]:
+        return id(chain), json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "in_flight": len(self._in_flight),
+        }
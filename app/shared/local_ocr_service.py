@@ -0,0 +1,101 @@
+import asyncio
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+# Model OCR per worker process, dimuat sekali oleh _init_worker
+_backend = None
+_reader = None
+
+
+def _init_worker(backend: str, langs: List[str]):
+    global _backend, _reader
+    _backend = backend
+    if backend == "easyocr":
+        import easyocr
+        _reader = easyocr.Reader(langs, gpu=False, verbose=False)
+    else:
+        import pytesseract
+        _reader = pytesseract
+
+
+def _warmup() -> int:
+    return os.getpid()
+
+
+def _read(data: bytes) -> Tuple[str, Optional[float]]:
+    if _backend == "easyocr":
+        results = _reader.readtext(data)
+        lines = [text for _, text, _ in results]
+        confidences = [conf for _, _, conf in results]
+    else:
+        from PIL import Image
+
+        image = Image.open(io.BytesIO(data))
+        output = _reader.image_to_data(image, output_type=_reader.Output.DICT)
+        grouped = {}
+        confidences = []
+        for i, word in enumerate(output["text"]):
+            conf = float(output["conf"][i])
+            if not word.strip() or conf < 0:
+                continue
+            key = (output["block_num"][i], output["par_num"][i], output["line_num"][i])
+            grouped.setdefault(key, []).append(word)
+            confidences.append(conf / 100)
+        lines = [" ".join(words) for words in grouped.values()]
+
+    confidence = sum(confidences) / len(confidences) if confidences else None
+    return "\n".join(lines), confidence
+
+
+class LocalOCRService:
+    def __init__(self, backend: str = "easyocr", langs: List[str] = None, workers: int = 1):
+        """
+        Offline OCR using easyocr or tesseract in a warm process pool.
+
+        The model is loaded once per worker process (pool initializer), not
+        per call, and ``warm_up`` starts the workers ahead of the first image.
+        """
+        self.backend = backend
+        self.langs = langs or ["en"]
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.backend, self.langs)
+            )
+        return self._executor
+
+    async def warm_up(self):
+        loop = asyncio.get_running_loop()
+        pool = self._pool()
+        await asyncio.gather(*(loop.run_in_executor(pool, _warmup) for _ in range(self.workers)))
+
+    async def read_image(self, image_bytes) -> Tuple[str, Optional[float]]:
+        """
+        Read text from an image.
+
+        :param image_bytes: Image as bytes or memoryview.
+        :return: (extracted text, mean confidence between 0 and 1 or None).
+        """
+        loop = asyncio.get_running_loop()
+        self._in_flight += 1
+        try:
+            return await loop.run_in_executor(self._pool(), _read, bytes(image_bytes))
+        finally:
+            self._in_flight -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
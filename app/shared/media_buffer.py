@@ -0,0 +1,116 @@
+import binascii
+import io
+import re
+from typing import Optional
+
+_STRIP_RE = re.compile(rb"[\\\s]")
+
+
+class StreamingBase64Decoder:
+    """
+    Incrementally decode the base64 value of one JSON string field.
+
+    Feed the raw JSON response body chunk by chunk; the decoded bytes are
+    written straight into a single ``bytearray`` so the full base64 text and
+    the parsed JSON document are never held in memory.
+    """
+
+    def __init__(self, field: str = "data"):
+        self._marker = re.compile(rb'"' + re.escape(field.encode()) + rb'"\s*:\s*"')
+        self._head = bytearray()
+        self._carry = b""
+        self._state = "search"
+        self.buffer = bytearray()
+
+    @property
+    def done(self) -> bool:
+        return self._state == "done"
+
+    def feed(self, chunk: bytes):
+        if self._state == "done":
+            return
+        if self._state == "search":
+            self._head += chunk
+            match = self._marker.search(self._head)
+            if match is None:
+                # Simpan ekor saja, cukup untuk mendeteksi marker yang terpotong
+                del self._head[:-64]
+                return
+            chunk = bytes(self._head[match.end():])
+            self._head = bytearray()
+            self._state = "value"
+
+        end = chunk.find(b'"')
+        segment = chunk if end == -1 else chunk[:end]
+        self._decode(segment, final=end != -1)
+        if end != -1:
+            self._state = "done"
+
+    def _decode(self, segment: bytes, final: bool):
+        # JSON boleh meng-escape "/" menjadi "\/"; whitespace juga diabaikan
+        data = self._carry + _STRIP_RE.sub(b"", segment)
+        if final:
+            data += b"=" * (-len(data) % 4)
+        usable = len(data) if final else len(data) - len(data) % 4
+        if usable:
+            self.buffer += binascii.a2b_base64(data[:usable])
+        self._carry = data[usable:]
+
+    def result(self) -> memoryview:
+        if self._state != "done":
+            raise ValueError("Media field not found or truncated in response")
+        return memoryview(self.buffer)
+
+
+class MemoryViewReader(io.RawIOBase):
+    """Read-only file-like object over a memoryview, for SDKs that want ``read()``."""
+
+    def __init__(self, view, name: str = "image.jpg"):
+        self._view = memoryview(view).cast("B")
+        self._pos = 0
+        self.name = name
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = min(len(b), len(self._view) - self._pos)
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        else:
+            self._pos = len(self._view) + offset
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+
+def iter_chunks(view, chunk_size: int = 64 * 1024):
+    """Yield successive slices of a buffer without copying the whole thing."""
+    view = memoryview(view).cast("B")
+    for start in range(0, len(view), chunk_size):
+        yield bytes(view[start:start + chunk_size])
+
+
+async def aiter_chunks(view, chunk_size: int = 64 * 1024):
+    for chunk in iter_chunks(view, chunk_size):
+        yield chunk
+
+
+def as_buffer(image) -> Optional[memoryview]:
+    """Accept a base64 string, bytes or a memoryview and return a memoryview."""
+    if image is None:
+        return None
+    if isinstance(image, str):
+        return memoryview(binascii.a2b_base64(image))
+    return memoryview(image).cast("B")
@@ -0,0 +1,175 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+StageFn = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class StageFailed(Exception):
+    """Raised by ``StagePipeline.run`` when a stage raises; ``__cause__`` is the original error."""
+
+    def __init__(self, stage: str, error: BaseException):
+        super().__init__(f"Stage '{stage}' failed: {error}")
+        self.stage = stage
+        self.error = error
+
+
+@dataclass
+class StageTiming:
+    start_ms: float
+    duration_ms: float
+    status: str  # "ok", "failed" atau "cancelled"
+
+
+class PipelineMetrics:
+    """Aggregated per-stage timings over many runs of the same pipeline."""
+
+    def __init__(self):
+        self.runs = 0
+        self.failures = 0
+        self.total_ms = 0.0
+        self.stage_sum_ms = 0.0
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    def record(self, total_ms: float, timings: Dict[str, StageTiming], failed: bool):
+        self.runs += 1
+        self.failures += failed
+        self.total_ms += total_ms
+        for name, timing in timings.items():
+            stage = self.stages.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "cancelled": 0})
+            if timing.status == "cancelled":
+                stage["cancelled"] += 1
+                continue
+            stage["count"] += 1
+            stage["total_ms"] += timing.duration_ms
+            stage["max_ms"] = max(stage["max_ms"], timing.duration_ms)
+            self.stage_sum_ms += timing.duration_ms
+
+    def stats(self):
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "avg_ms": round(self.total_ms / self.runs, 2) if self.runs else 0.0,
+            # Rata-rata jumlah durasi semua stage, kalau dijalankan berurutan
+            "avg_sequential_ms": round(self.stage_sum_ms / self.runs, 2) if self.runs else 0.0,
+            "stages": {
+                name: {
+                    "count": int(s["count"]),
+                    "avg_ms": round(s["total_ms"] / s["count"], 2) if s["count"] else 0.0,
+                    "max_ms": round(s["max_ms"], 2),
+                    "cancelled": int(s["cancelled"]),
+                }
+                for name, s in self.stages.items()
+            },
+        }
+
+
+class StagePipeline:
+    """
+    Runs async stages as a DAG: every stage starts as soon as the stages it
+    depends on have finished, so independent stages overlap and the total
+    time follows the critical path instead of the sum of all stages.
+
+    Each stage function receives the results of the stages completed so far
+    (keyed by stage name). A stage may ``cancel`` another one whose result is
+    no longer needed; dependents then see ``None`` for it.
+    """
+
+    def __init__(self, metrics: Optional[PipelineMetrics] = None):
+        self.metrics = metrics
+        self._stages: Dict[str, Tuple[StageFn, Tuple[str, ...]]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._cancelled: set = set()
+        self.results: Dict[str, Any] = {}
+        self.timings: Dict[str, StageTiming] = {}
+        self._start = 0.0
+
+    def stage(self, name: str, fn: StageFn, after: Iterable[str] = ()) -> "StagePipeline":
+        after = tuple(after)
+        for dep in after:
+            if dep not in self._stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self._stages[name] = (fn, after)
+        return self
+
+    def cancel(self, name: str):
+        task = self._tasks.get(name)
+        if task is not None and not task.done():
+            self._cancelled.add(name)
+            task.cancel()
+
+    async def run(self) -> Dict[str, Any]:
+        self._start = time.perf_counter()
+        # Stage didaftarkan setelah dependensinya, jadi urutan dict sudah topologis
+        for name, (fn, after) in self._stages.items():
+            self._tasks[name] = asyncio.ensure_future(self._run_stage(name, fn, after))
+
+        tasks = list(self._tasks.values())
+        failed = False
+        try:
+            # Berhenti di kegagalan pertama, stage lain tidak perlu ditunggu selesai
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for name, task in self._tasks.items():
+                if task.cancelled():
+                    self._record(name, None, "cancelled")
+                    continue
+                if task.done() and task.exception() is not None:
+                    failed = True
+                    error = task.exception()
+                    raise error if isinstance(error, StageFailed) else StageFailed(name, error)
+            return self.results
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if self.metrics is not None:
+                self.metrics.record((time.perf_counter() - self._start) * 1000, self.timings, failed)
+
+    async def _run_stage(self, name: str, fn: StageFn, after: Tuple[str, ...]):
+        for dep in after:
+            try:
+                await asyncio.shield(self._tasks[dep])
+            except asyncio.CancelledError:
+                if dep not in self._cancelled:
+                    raise
+            except StageFailed:
+                raise
+            except Exception as e:
+                raise StageFailed(dep, e) from e
+
+        started = time.perf_counter()
+        try:
+            result = await fn(self.results)
+        except asyncio.CancelledError:
+            self._record(name, started, "cancelled")
+            raise
+        except Exception as e:
+            self._record(name, started, "failed")
+            raise StageFailed(name, e) from e
+        self._record(name, started, "ok")
+        self.results[name] = result
+        return result
+
+    def _record(self, name: str, started: Optional[float], status: str):
+        if name in self.timings:
+            return
+        now = time.perf_counter()
+        started = started if started is not None else now
+        self.timings[name] = StageTiming(
+            start_ms=round((started - self._start) * 1000, 2),
+            duration_ms=round((now - started) * 1000, 2),
+            status=status
+        )
+
+    def critical_path(self) -> List[str]:
+        """Stages on the longest finish-time chain of the last run."""
+        finish = {name: t.start_ms + t.duration_ms for name, t in self.timings.items()}
+        if not finish:
+            return []
+        path = [max(finish, key=finish.get)]
+        while True:
+            deps = [d for d in self._stages[path[-1]][1] if d in finish]
+            if not deps:
+                return list(reversed(path))
+            path.append(max(deps, key=finish.get))
@@ -0,0 +1,69 @@
+import asyncio
+import os
+import uuid
+from typing import Optional
+from app.config.setting import settings
+
+
+def image_extension(data) -> str:
+    """File extension from the image's magic bytes; preprocessing may emit WebP."""
+    head = bytes(memoryview(data)[:12])
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    if head[:8] == b"\x89PNG\r\n\x1a\n":
+        return "png"
+    return "jpg"
+
+
+class StorageBackend:
+    """Where receipt images are stored; ``put`` returns the public URL."""
+
+    async def put(self, data, key: Optional[str] = None) -> str:
+        raise NotImplementedError
+
+    async def aclose(self):
+        pass
+
+
+class CloudinaryStorage(StorageBackend):
+    def __init__(self, service=None):
+        if service is None:
+            from app.shared.cloudinary_service import CloudinaryService
+            service = CloudinaryService()
+        self.service = service
+
+    async def put(self, data, key: Optional[str] = None) -> str:
+        # SDK Cloudinary sinkron, jalankan di thread supaya event loop tidak tertahan
+        return await asyncio.to_thread(self.service.upload_image, data, key)
+
+
+class LocalDiskStorage(StorageBackend):
+    """
+    Stand-in backend that writes images under ``root`` and returns
+    ``base_url/<key>.<ext>`` (extension from the image bytes). Useful for offline development, tests and
+    benchmarks; ``latency`` simulates a remote object store.
+    """
+
+    def __init__(self, root: str, base_url: str = "", latency: float = 0.0):
+        self.root = root
+        self.base_url = base_url.rstrip("/") or f"file://{os.path.abspath(root)}"
+        self.latency = latency
+        os.makedirs(root, exist_ok=True)
+
+    def _write(self, path: str, data):
+        with open(path, "wb") as f:
+            f.write(data)
+
+    async def put(self, data, key: Optional[str] = None) -> str:
+        key = key or uuid.uuid4().hex
+        filename = f"{key}.{image_extension(data)}"
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        await asyncio.to_thread(self._write, os.path.join(self.root, filename), data)
+        return f"{self.base_url}/{filename}"
+
+
+def create_storage() -> StorageBackend:
+    if settings.image_storage_backend == "local":
+        return LocalDiskStorage(settings.image_storage_local_root, settings.image_storage_local_base_url)
+    return CloudinaryStorage()
@@ -1,8 +1,21 @@
-import requests
+import asyncio
+import datetime
+import random
+import httpx
 import logging
 import base64
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from app.shared.media_buffer import StreamingBase64Decoder
+
+# Error sebelum request sampai ke gateway; aman diulang walau POST tidak idempoten
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+MAX_RETRY_AFTER = 30.0
 
 class WhatsAppAPI:
+    """Synchronous client (OTP); ``requests`` is imported on first call."""
+
     def __init__(self, api_url, session, endpoints):
         """Inisialisasi objek WhatsAppAPI dengan URL API dan session"""
         self.api_url = api_url
@@ -20,6 +33,7 @@ class WhatsAppAPI:
         }
 
         logging.info(f"Sending message to {recipient}: {body}")
+        import requests
         # Kirim request ke API WhatsApp
         response = requests.post(url, headers=headers, json=payload)
         
@@ -31,9 +45,172 @@ class WhatsAppAPI:
         url = f"{self.api_url}/message/downloadMedia/{self.session}"
         headers = {"Content-Type": "application/json"}
         payload = {"chatId": chat_id, "messageId": message_id}
+        import requests
         response = requests.post(url, headers=headers, json=payload)
         response.raise_for_status()
         media_data = response.json().get("messageMedia", {}).get("data")
         if return_as_base64:
             return media_data
-        return base64.b64decode(media_data)
\ No newline at end of file
+        return base64.b64decode(media_data)
+
+class AsyncWhatsAppAPI:
+    def __init__(
+        self,
+        api_url,
+        session,
+        endpoints,
+        timeout: float = 10.0,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        max_connections: int = 20
+    ):
+        """
+        Versi async dari WhatsAppAPI.
+
+        Memakai satu httpx.AsyncClient (connection pool keep-alive) untuk semua
+        request, dengan timeout, retry ber-jitter untuk 5xx/connection error,
+        dan antrean kirim per penerima supaya urutan pesan tetap terjaga.
+        Kirim pesan tidak idempoten: hanya diulang kalau request belum sampai
+        ke gateway, atau 429/503 dengan Retry-After, supaya tidak terkirim dobel.
+        """
+        self.api_url = api_url
+        self.session = session
+        self.endpoints = endpoints
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.client = httpx.AsyncClient(
+            headers={"Content-Type": "application/json"},
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+        # recipient -> (lock, jumlah pengirim yang sedang menunggu/memakai)
+        self._recipients: Dict[str, Tuple[asyncio.Lock, int]] = {}
+
+    def _url(self, endpoint):
+        return f"{self.api_url}{self.endpoints[endpoint]}{self.session}"
+
+    async def _post(self, url, payload, idempotent: bool = True):
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                response = await self.client.post(url, json=payload)
+                retry_after = self._retry_after(response)
+                # 5xx setelah request diterima bisa berarti pesan sudah terkirim
+                retryable = retry_after is not None or (idempotent and response.status_code >= 500)
+                if not retryable or attempt >= self.max_retries:
+                    return response
+                logging.warning(f"WhatsApp API returned {response.status_code}, retrying")
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries or not (idempotent or isinstance(e, _NOT_SENT_ERRORS)):
+                    raise
+                logging.warning(f"WhatsApp API connection error, retrying: {e}")
+            attempt += 1
+            if retry_after is not None:
+                await asyncio.sleep(retry_after)
+            else:
+                # Exponential backoff dengan full jitter
+                await asyncio.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    @staticmethod
+    def _retry_after(response) -> Optional[float]:
+        """Seconds from ``Retry-After`` on a 429/503, capped at ``MAX_RETRY_AFTER``; else None."""
+        value = response.headers.get("Retry-After")
+        if response.status_code not in (429, 503) or not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                when = parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                return None
+            seconds = (when - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+        return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+    @asynccontextmanager
+    async def _recipient_slot(self, recipient):
+        lock, users = self._recipients.get(recipient, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._recipients[recipient] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._recipients[recipient]
+            if users == 1:
+                del self._recipients[recipient]
+            else:
+                self._recipients[recipient] = (lock, users - 1)
+
+    async def send_text_message(self, recipient, body, content_type="string"):
+        """Mengirim pesan ke WhatsApp"""
+        payload = {
+            "chatId": recipient,
+            "contentType": content_type,
+            "content": body
+        }
+        logging.info(f"Sending message to {recipient}: {body}")
+        async with self._recipient_slot(recipient):
+            return await self._post(self._url("send_message"), payload, idempotent=False)
+
+    async def send_bulk(self, messages, concurrency: int = 10, content_type="string"):
+        """
+        Kirim banyak pesan sekaligus (broadcast/reminder).
+
+        :param messages: Iterable of (recipient, body) tuples.
+        :param concurrency: Maximum number of sends in flight at once.
+        :return: List of responses or exceptions, in the same order as ``messages``.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def send(recipient, body):
+            async with semaphore:
+                return await self.send_text_message(recipient, body, content_type)
+
+        return await asyncio.gather(
+            *(send(recipient, body) for recipient, body in messages),
+            return_exceptions=True
+        )
+
+    async def download_media(self, chat_id, message_id, return_as_base64=False):
+        """download media"""
+        payload = {"chatId": chat_id, "messageId": message_id}
+        response = await self._post(self._url("download_media"), payload)
+        response.raise_for_status()
+        media_data = response.json().get("messageMedia", {}).get("data")
+        if return_as_base64:
+            return media_data
+        return base64.b64decode(media_data)
+
+    async def download_media_buffer(self, chat_id, message_id) -> memoryview:
+        """
+        Download media and decode it while the response is streaming in.
+
+        Returns a memoryview over a single decoded buffer; the base64 text and
+        the JSON document are never materialized as a whole.
+        """
+        payload = {"chatId": chat_id, "messageId": message_id}
+        url = self._url("download_media")
+        attempt = 0
+        while True:
+            try:
+                async with self.client.stream("POST", url, json=payload) as response:
+                    if response.status_code >= 500 and attempt < self.max_retries:
+                        logging.warning(f"WhatsApp API returned {response.status_code}, retrying")
+                    else:
+                        response.raise_for_status()
+                        decoder = StreamingBase64Decoder("data")
+                        async for chunk in response.aiter_bytes():
+                            decoder.feed(chunk)
+                        return decoder.result()
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise
+                logging.warning(f"WhatsApp API connection error, retrying: {e}")
+            attempt += 1
+            await asyncio.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    async def aclose(self):
+        await self.client.aclose()
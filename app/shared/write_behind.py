@@ -0,0 +1,236 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app.config.setting import settings
+
+logger = logging.getLogger(__name__)
+
+_DUPLICATE_KEY = 11000
+_MERGEABLE = {"$set", "$setOnInsert", "$inc"}
+
+
+def _merge_update(target: Dict[str, Any], update: Dict[str, Any]) -> bool:
+    """
+    Fold ``update`` into ``target`` in place; returns False when the
+    operators cannot be combined safely.
+    """
+    if not set(update) <= _MERGEABLE or not set(target) <= _MERGEABLE:
+        return False
+    for field, value in update.get("$set", {}).items():
+        target.setdefault("$set", {})[field] = value
+    for field, value in update.get("$setOnInsert", {}).items():
+        target.setdefault("$setOnInsert", {}).setdefault(field, value)
+    for field, value in update.get("$inc", {}).items():
+        inc = target.setdefault("$inc", {})
+        inc[field] = inc.get(field, 0) + value
+    return True
+
+
+class WriteBehindBuffer:
+    """
+    Buffers fire-and-forget Mongo writes and sends them as unordered
+    ``insert_many`` / ``bulk_write`` batches.
+
+    A batch is flushed when ``max_batch`` writes are pending, every
+    ``flush_interval`` seconds, and on ``stop``. Upserts with the same
+    filter are merged into one ``UpdateOne`` ($set: last wins, $inc: summed,
+    $setOnInsert: first wins). Inserted documents get a client-side
+    ObjectId so callers still receive the id immediately.
+
+    When the buffer is not running, writes go straight to Mongo.
+    """
+
+    def __init__(
+        self,
+        max_batch: int = 200,
+        flush_interval: float = 0.25,
+        max_pending: int = 10_000
+    ):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        # full_name koleksi -> (koleksi, dokumen)
+        self._inserts: Dict[str, Tuple[Any, List[Dict[str, Any]]]] = {}
+        # full_name koleksi -> (koleksi, {(filter, upsert): update})
+        self._updates: Dict[str, Tuple[Any, Dict[Tuple[str, bool, int], Tuple[Dict, Dict]]]] = {}
+        self._pending = 0
+        self._unmergeable = 0
+        self._lock: Optional[asyncio.Lock] = None
+        self._timer: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+        self.flushes = 0
+        self.inserted = 0
+        self.updated = 0
+        self.merged = 0
+        self.write_errors = 0
+        self.requeued = 0
+        self.dropped = 0
+        self.last_flush_ms = 0.0
+        self.last_batch_size = 0
+
+    @property
+    def running(self) -> bool:
+        return self._timer is not None
+
+    async def start(self):
+        if self._timer is None:
+            self._lock = asyncio.Lock()
+            self._timer = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the timer and flush everything still buffered."""
+        if self._timer is not None:
+            self._timer.cancel()
+            try:
+                await self._timer
+            except asyncio.CancelledError:
+                pass
+            self._timer = None
+        if self._flush_task is not None:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        await self.flush()
+
+    async def insert(self, collection, doc: Dict[str, Any]) -> ObjectId:
+        doc.setdefault("_id", ObjectId())
+        if not self.running:
+            await collection.insert_one(doc)
+            return doc["_id"]
+
+        self._inserts.setdefault(collection.full_name, (collection, []))[1].append(doc)
+        await self._added()
+        return doc["_id"]
+
+    async def update(self, collection, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False):
+        if not self.running:
+            await collection.update_one(filter, update, upsert=upsert)
+            return
+
+        key = (json.dumps(filter, sort_keys=True, default=str), upsert, 0)
+        if self._queue_update(collection, key, filter, update):
+            await self._added()
+
+    def _queue_update(self, collection, key, filter: Dict[str, Any], update: Dict[str, Any]) -> bool:
+        """Queue an update; returns False when it was merged into a pending one."""
+        ops = self._updates.setdefault(collection.full_name, (collection, {}))[1]
+        existing = ops.get(key)
+        if existing is not None and _merge_update(existing[1], update):
+            self.merged += 1
+            return False
+        if existing is not None:
+            # Operator yang tidak bisa digabung tetap dikirim sebagai op terpisah
+            self._unmergeable += 1
+            key = key[:2] + (self._unmergeable,)
+        ops[key] = (filter, {op: dict(fields) for op, fields in update.items()})
+        return True
+
+    async def _added(self):
+        self._pending += 1
+        if self._pending >= self.max_pending:
+            # Backpressure: penulis menunggu flush kalau Mongo tertinggal jauh
+            await self.flush()
+        elif self._pending >= self.max_batch and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self.flush())
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Write-behind flush failed: {e}")
+
+    async def flush(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self._pending:
+                return
+            inserts, self._inserts = self._inserts, {}
+            updates, self._updates = self._updates, {}
+            batch_size, self._pending = self._pending, 0
+
+            start = time.perf_counter()
+            await asyncio.gather(
+                *(self._flush_inserts(collection, docs) for collection, docs in inserts.values()),
+                *(self._flush_updates(collection, ops) for collection, ops in updates.values())
+            )
+            self.flushes += 1
+            self.last_batch_size = batch_size
+            self.last_flush_ms = round((time.perf_counter() - start) * 1000, 2)
+
+    async def _flush_inserts(self, collection, docs: List[Dict[str, Any]]):
+        try:
+            result = await collection.insert_many(docs, ordered=False)
+            self.inserted += len(result.inserted_ids)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            # Duplicate key berarti dokumen sudah tertulis di flush sebelumnya yang di-retry
+            failed = [err for err in errors if err.get("code") != _DUPLICATE_KEY]
+            self.inserted += e.details.get("nInserted", 0)
+            self.write_errors += len(failed)
+            if failed:
+                logger.error(f"Write-behind insert into {collection.full_name} lost {len(failed)} docs: {failed[0].get('errmsg')}")
+        except Exception as e:
+            logger.error(f"Write-behind insert into {collection.full_name} failed, requeueing: {e}")
+            for doc in docs:
+                self._requeue_insert(collection, doc)
+
+    async def _flush_updates(self, collection, ops: Dict[Any, Tuple[Dict, Dict]]):
+        requests = [UpdateOne(filter, update, upsert=key[1]) for key, (filter, update) in ops.items()]
+        try:
+            result = await collection.bulk_write(requests, ordered=False)
+            self.updated += result.matched_count + result.upserted_count
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            self.updated += e.details.get("nMatched", 0) + e.details.get("nUpserted", 0)
+            self.write_errors += len(errors)
+            if errors:
+                logger.error(f"Write-behind bulk_write on {collection.full_name} lost {len(errors)} ops: {errors[0].get('errmsg')}")
+        except Exception as e:
+            # Di-retry sekali lagi di flush berikutnya; $inc bisa terhitung dua kali
+            # kalau Mongo sempat menerapkan batch sebelum koneksi putus
+            logger.error(f"Write-behind bulk_write on {collection.full_name} failed, requeueing: {e}")
+            for key, (filter, update) in ops.items():
+                if self._pending >= self.max_pending:
+                    self.dropped += 1
+                    continue
+                if self._queue_update(collection, key[:2] + (0,), filter, update):
+                    self._pending += 1
+                self.requeued += 1
+
+    def _requeue_insert(self, collection, doc: Dict[str, Any]):
+        if self._pending >= self.max_pending:
+            self.dropped += 1
+            return
+        self._inserts.setdefault(collection.full_name, (collection, []))[1].append(doc)
+        self._pending += 1
+        self.requeued += 1
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "pending": self._pending,
+            "flushes": self.flushes,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "merged": self.merged,
+            "write_errors": self.write_errors,
+            "requeued": self.requeued,
+            "dropped": self.dropped,
+            "last_batch_size": self.last_batch_size,
+            "last_flush_ms": self.last_flush_ms,
+        }
+
+
+write_behind = WriteBehindBuffer(
+    max_batch=settings.write_behind_max_batch,
+    flush_interval=settings.write_behind_flush_interval,
+    max_pending=settings.write_behind_max_pending
+)
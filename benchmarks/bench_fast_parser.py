@@ -0,0 +1,99 @@
+"""
+Accuracy, coverage and latency of the rule-based fast-path parser.
+
+Each corpus line is ``{"text": ..., "expected": {...} | null}``. ``expected``
+holds the fields the parser must get right (a ``null`` field is not checked);
+``"expected": null`` means the message must be left to the LLM. All dates in
+the corpus are relative to ``--today``.
+
+Before the corpus it checks that "today" is taken in the parser's timezone:
+at 2025-04-13 17:30 UTC (00:30 WIB on the 14th) a message without a date
+must be dated 2025-04-14 and "kemarin" 2025-04-13.
+
+    python benchmarks/bench_fast_parser.py --min-accuracy 1.0
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.domains.transactions.fast_parser import FastTransactionParser  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "fast_parser_corpus.jsonl")
+
+
+def load_corpus(path: str):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def mismatches(result, expected):
+    if expected is None:
+        return [] if result is None else [f"accepted (confidence {result.confidence})"]
+    if result is None:
+        return ["fell back to LLM"]
+    actual = result.transaction.model_dump()
+    return [f"{field}: {actual.get(field)!r} != {value!r}"
+            for field, value in expected.items() if value is not None and actual.get(field) != value]
+
+
+def timezone_errors():
+    """Pin a UTC clock just after WIB midnight; the server's own zone must not matter."""
+    fast = FastTransactionParser(timezone="Asia/Jakarta")
+    now = datetime.datetime(2025, 4, 13, 17, 30, tzinfo=datetime.timezone.utc)
+    today = fast.today(now)
+    errors = []
+    if today != datetime.date(2025, 4, 14):
+        errors.append(f"today at {now.isoformat()} is {today}, expected 2025-04-14")
+    for text, expected in (("keluar 25rb makan siang", "2025-04-14"), ("kemarin beli bensin 50rb", "2025-04-13")):
+        result = fast.parse(text, today)
+        if result is None or result.transaction.date != expected:
+            errors.append(f"{text!r} dated {result.transaction.date if result else None}, expected {expected}")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--today", default="2025-04-14")
+    parser.add_argument("--min-confidence", type=float, default=0.75)
+    parser.add_argument("--min-accuracy", type=float, default=0.0, help="exit non-zero below this accuracy")
+    parser.add_argument("--iterations", type=int, default=200, help="latency loop count over the corpus")
+    args = parser.parse_args()
+
+    tz_errors = timezone_errors()
+    for error in tz_errors:
+        print(f"BAD timezone: {error}")
+
+    today = datetime.date.fromisoformat(args.today)
+    corpus = load_corpus(args.corpus)
+    fast = FastTransactionParser(min_confidence=args.min_confidence)
+
+    correct = accepted = wrong_accepts = 0
+    for case in corpus:
+        result = fast.try_parse(case["text"], today)
+        errors = mismatches(result, case["expected"])
+        accepted += result is not None
+        correct += not errors
+        wrong_accepts += bool(errors) and result is not None
+        confidence = f"{result.confidence:.2f}" if result else " -- "
+        print(f"{'OK ' if not errors else 'BAD'} [{confidence}] {case['text']}" + (f"  ({'; '.join(errors)})" if errors else ""))
+
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        for case in corpus:
+            fast.parse(case["text"], today)
+    per_message_us = (time.perf_counter() - start) / (args.iterations * len(corpus)) * 1e6
+
+    accuracy = correct / len(corpus)
+    print(f"\n{len(corpus)} messages: accuracy {accuracy:.2%}, coverage {accepted / len(corpus):.2%} "
+          f"handled without LLM, {wrong_accepts} wrong accepts, {per_message_us:.1f} us per message")
+    sys.exit(1 if accuracy < args.min_accuracy or tz_errors else 0)
+
+
+if __name__ == "__main__":
+    main()
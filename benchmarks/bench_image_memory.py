@@ -0,0 +1,108 @@
+"""
+Peak memory per concurrent image for the webhook image path.
+
+Compares the old flow (``response.json()`` -> base64 string -> ``b64decode``
+-> ``BytesIO`` for OCR -> ``data:`` URI for Cloudinary) with the streaming
+flow (``StreamingBase64Decoder`` -> one buffer shared as a memoryview by
+hashing, OCR and upload).
+
+Each mode runs in its own subprocess so ``ru_maxrss`` is not polluted by the
+other one.
+
+    python benchmarks/bench_image_memory.py --size-mb 3 --concurrency 8
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.shared.media_buffer import StreamingBase64Decoder, MemoryViewReader, iter_chunks  # noqa: E402
+
+CHUNK_SIZE = 64 * 1024
+
+
+def make_body(size: int) -> bytes:
+    """Fake /message/downloadMedia response, as sent by the WhatsApp gateway."""
+    image = os.urandom(size)
+    return json.dumps({
+        "success": True,
+        "messageMedia": {"mimetype": "image/jpeg", "data": base64.b64encode(image).decode(), "filesize": size},
+    }).encode()
+
+
+async def before(body: bytes, hold: float):
+    content = bytes(body)                                   # requests: response.content
+    data = json.loads(content.decode())["messageMedia"]["data"]  # response.json()
+    del content
+    image = base64.b64decode(data)                          # handle_image
+    hashlib.sha256(image).hexdigest()
+    stream = io.BytesIO(image)                              # AzureOCRService
+    await asyncio.sleep(hold)                               # OCR round-trip
+    data_uri = "data:image/jpeg;base64," + data             # upload_image
+    payload = data_uri.encode()                             # multipart body
+    await asyncio.sleep(hold)                               # upload round-trip
+    return len(stream.getvalue()) + len(payload)
+
+
+async def after(body: bytes, hold: float):
+    decoder = StreamingBase64Decoder("data")
+    for start in range(0, len(body), CHUNK_SIZE):           # response.aiter_bytes()
+        decoder.feed(body[start:start + CHUNK_SIZE])
+    image = decoder.result()
+    hashlib.sha256(image).hexdigest()
+    sent = sum(len(chunk) for chunk in iter_chunks(image))  # OCR upload, chunked
+    await asyncio.sleep(hold)
+    payload = MemoryViewReader(image).read()                # Cloudinary reads the file-like once
+    await asyncio.sleep(hold)
+    return sent + len(payload)
+
+
+def peak_rss_kb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+async def run_mode(mode: str, size: int, concurrency: int, hold: float):
+    bodies = [make_body(size) for _ in range(concurrency)]
+    baseline = peak_rss_kb()
+    fn = before if mode == "before" else after
+    await asyncio.gather(*(fn(body, hold) for body in bodies))
+    peak = peak_rss_kb()
+    print(json.dumps({"mode": mode, "baseline_kb": baseline, "peak_kb": peak}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=3.0, help="decoded image size")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--hold", type=float, default=0.05, help="simulated OCR/upload latency in seconds")
+    parser.add_argument("--mode", choices=["before", "after"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    size = int(args.size_mb * 1024 * 1024)
+
+    if args.mode:
+        asyncio.run(run_mode(args.mode, size, args.concurrency, args.hold))
+        return
+
+    print(f"image size: {args.size_mb} MB, concurrency: {args.concurrency}")
+    for mode in ("before", "after"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--size-mb", str(args.size_mb),
+             "--concurrency", str(args.concurrency), "--hold", str(args.hold)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(out)
+        per_image_mb = (result["peak_kb"] - result["baseline_kb"]) / 1024 / args.concurrency
+        print(f"{mode:>6}: peak RSS {result['peak_kb'] / 1024:8.1f} MB, "
+              f"{per_image_mb:6.2f} MB per concurrent image ({per_image_mb / args.size_mb:.2f}x image size)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+End-to-end latency of the receipt image flow run stage by stage (old
+``handle_image``) vs as the ``StagePipeline`` DAG it uses now.
+
+Stages are simulated with sleeps of the given latencies, so no OCR engine,
+LLM or Mongo is needed. The DAG has the same shape as ``handle_image`` with
+``REPLY_MODE=llm``: the LLM reply only depends on the OCR text and overlaps
+extraction, the dedupe lookup and the insert.
+
+    python benchmarks/bench_image_pipeline.py --runs 20 --llm 1.2
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.shared.pipeline import PipelineMetrics, StagePipeline  # noqa: E402
+
+
+def build(args, metrics: PipelineMetrics) -> StagePipeline:
+    def sleep(seconds):
+        async def stage(results):
+            await asyncio.sleep(seconds)
+        return stage
+
+    return (
+        StagePipeline(metrics)
+        .stage("ocr", sleep(args.ocr))
+        .stage("extract", sleep(args.llm), after=["ocr"])
+        .stage("reply", sleep(args.llm), after=["ocr"])
+        .stage("save_user_message", sleep(args.db), after=["extract"])
+        .stage("dedupe", sleep(args.db), after=["extract"])
+        .stage("store", sleep(args.db * 3), after=["dedupe"])
+        .stage("save_reply", sleep(args.db), after=["save_user_message", "store", "reply"])
+    )
+
+
+async def run(args):
+    sequential = []
+    for _ in range(args.runs):
+        pipeline = build(args, None)
+        start = time.perf_counter()
+        for fn, _after in pipeline._stages.values():
+            await fn({})
+        sequential.append(time.perf_counter() - start)
+
+    metrics = PipelineMetrics()
+    dag = []
+    for _ in range(args.runs):
+        pipeline = build(args, metrics)
+        start = time.perf_counter()
+        await pipeline.run()
+        dag.append(time.perf_counter() - start)
+
+    for label, latencies in (("sequential", sequential), ("dag", dag)):
+        latencies.sort()
+        print(f"{label:>10}: p50 {latencies[len(latencies) // 2] * 1000:7.1f} ms, max {latencies[-1] * 1000:7.1f} ms")
+    print(f"critical path: {' > '.join(pipeline.critical_path())}")
+    print(f"metrics: {metrics.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--ocr", type=float, default=0.6, help="simulated OCR time")
+    parser.add_argument("--llm", type=float, default=1.2, help="simulated time per LLM call")
+    parser.add_argument("--db", type=float, default=0.02, help="simulated Mongo round-trip")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Accuracy and latency of the intent classifier against the labeled set.
+
+Compares the old ``seems_like_transaction`` substring check (transaction vs
+everything else) with the compiled keyword rules, and evaluates the optional
+Naive Bayes model with k-fold cross-validation so it is never scored on its
+own training rows.
+
+    python benchmarks/bench_intent.py --folds 4
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.domains.transactions.intent import IntentClassifier, NaiveBayesIntentModel, TRANSACTION  # noqa: E402
+
+DEFAULT_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "intent_labeled.jsonl")
+
+
+def legacy_seems_like_transaction(text: str) -> bool:
+    keywords = ["beli", "bayar", "transfer", "topup", "makan", "keluar", "uang", "rp", "IDR"]
+    question_words = ["berapa", "kapan", "siapa", "dimana", "apa", "total"]
+    return (
+        any(k in text.lower() for k in keywords) and
+        not any(q in text.lower() for q in question_words)
+    )
+
+
+def time_per_call(fn, texts, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for text in texts:
+            fn(text)
+    return (time.perf_counter() - start) / (iterations * len(texts)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DEFAULT_DATA)
+    parser.add_argument("--folds", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--min-probability", type=float, default=0.95, help="INTENT_MODEL_MIN_PROBABILITY")
+    parser.add_argument("--verbose", action="store_true", help="print misclassified rows")
+    args = parser.parse_args()
+
+    with open(args.data, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    texts = [row["text"] for row in rows]
+
+    legacy_ok = sum(legacy_seems_like_transaction(r["text"]) == (r["label"] == TRANSACTION) for r in rows)
+    classifier = IntentClassifier()
+    binary_ok = rules_ok = 0
+    for row in rows:
+        intent = classifier.classify(row["text"]).intent
+        binary_ok += (intent == TRANSACTION) == (row["label"] == TRANSACTION)
+        rules_ok += intent == row["label"]
+        if args.verbose and intent != row["label"]:
+            print(f"rules: {row['text']!r} -> {intent} (expected {row['label']})")
+
+    shuffled = rows[:]
+    random.Random(0).shuffle(shuffled)
+    hybrid_ok = model_ok = 0
+    for fold in range(args.folds):
+        test = shuffled[fold::args.folds]
+        train = [r for i, r in enumerate(shuffled) if i % args.folds != fold]
+        model = NaiveBayesIntentModel().fit((r["text"], r["label"]) for r in train)
+        hybrid = IntentClassifier(model=model, model_min_probability=args.min_probability)
+        for row in test:
+            model_ok += model.predict(row["text"])[0] == row["label"]
+            hybrid_ok += hybrid.classify(row["text"]).intent == row["label"]
+
+    n = len(rows)
+    print(f"{n} labeled messages")
+    print(f"transaction vs rest: legacy substring {legacy_ok / n:.2%}, compiled rules {binary_ok / n:.2%}")
+    print(f"4-way intent: rules {rules_ok / n:.2%}, naive bayes ({args.folds}-fold) {model_ok / n:.2%}, "
+          f"rules + model fallback {hybrid_ok / n:.2%} (min probability {args.min_probability})")
+    if hybrid_ok < rules_ok:
+        print("model fallback lowers accuracy: leave INTENT_MODEL_PATH empty or raise the threshold")
+
+    full_model = NaiveBayesIntentModel().fit((r["text"], r["label"]) for r in rows)
+    hybrid = IntentClassifier(model=full_model, model_min_probability=args.min_probability)
+    print(f"latency per message: legacy {time_per_call(legacy_seems_like_transaction, texts, args.iterations):.1f} us, "
+          f"rules {time_per_call(classifier.classify, texts, args.iterations):.1f} us, "
+          f"rules + model {time_per_call(hybrid.classify, texts, args.iterations):.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Prompt tokens, requests and wall time for a burst of receipts from one
+sender extracted one by one (``extract_transaction``) vs through
+``BatchExtractor`` (``send_batch``).
+
+Both runs go through the real path: each receipt is an image job on a
+``JobQueue`` keyed with ``image_job_key``, and the handler wraps the
+receipt in ``BatchExtractor.receipt`` the way ``handle_image`` does, with
+a simulated OCR step (``--ocr`` seconds plus up to ``--ocr-jitter``) before
+extraction. The run fails (exit code 1) when a burst is never batched.
+
+By default the LLM is simulated: prompts are rendered from the real
+templates and each call sleeps ``--base-latency`` plus ``--per-token`` per
+prompt token, so the run is free and repeatable. ``--live`` sends the
+requests to OpenAI (needs OPENAI_API_KEY) and also checks that the batched
+results parse.
+
+    python benchmarks/bench_llm_batch.py --receipts 8 --workers 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv()
+
+from app.domains.transactions.batch_extractor import BatchExtractor  # noqa: E402
+from app.domains.transactions.jobs import IMAGE_JOB, image_job_key  # noqa: E402
+from app.domains.transactions.llm_service import OpenAIProcessor  # noqa: E402
+from app.domains.transactions.output_parser import TransactionOutputParser  # noqa: E402
+from app.shared.job_queue import JobQueue  # noqa: E402
+
+SENDER = "6281234567890@c.us"
+
+SAMPLE_RECEIPTS = [
+    "ALFAMART JL RAYA BOGOR 12\n14-04-2025 10:43\nINDOMIE KPDS76G 1 13.900\nDLMNT BBQ 250G 1 8.600\nHEMAT -2.600\nTOTAL 19.900\nTUNAI 20.000",
+    "BCA mobile\nTransfer Berhasil\n14/04/2025 08:12\nKe: SAMBARA PROV JABAR\nRp 350.000,00\nBerita: pajak motor",
+    "INDOMARET\n13.04.2025 19:02\nAQUA 600ML 2 7.000\nROTI TAWAR 1 15.500\nTOTAL 22.500",
+    "KOPI KENANGAN\n14/04/25 15:20\nKOPI KENANGAN MANTAN 1 24.000\nTOTAL 24.000\nGOPAY",
+    "PLN Prabayar\nToken Listrik\n12-04-2025\nNominal Rp200.000\nAdmin Rp2.500",
+    "DANA\nUang masuk dari BUDI SANTOSO\n11 Apr 2025 21:14\nRp1.000.000",
+    "SHELL CIBUBUR\n10/04/2025 07:55\nV-POWER 12.3L\nTOTAL Rp 200.000",
+    "RS MITRA\nKwitansi 10-04-2025\nKonsultasi dokter 250.000\nObat 180.000\nTotal 430.000",
+]
+
+
+FAKE_TRANSACTION = {"type": "expense", "amount": 1, "date": "2025-04-14", "category": "Others", "items": []}
+
+
+def count_tokens(text: str) -> int:
+    try:
+        import tiktoken
+        return len(tiktoken.get_encoding("o200k_base").encode(text))
+    except Exception:
+        # tiktoken tidak terpasang atau file encoding tidak bisa diunduh
+        return len(text) // 4
+
+
+class SimulatedProcessor:
+    """Renders the real prompts for token counting and fakes the LLM call."""
+
+    def __init__(self, processor: OpenAIProcessor, base_latency: float, per_token: float):
+        self.processor = processor
+        self.base_latency = base_latency
+        self.per_token = per_token
+        self.output_parser = TransactionOutputParser()
+        self.requests = 0
+        self.prompt_tokens = 0
+
+    async def _call(self, prompt: str, output_tokens: int):
+        tokens = count_tokens(prompt)
+        self.requests += 1
+        self.prompt_tokens += tokens
+        await asyncio.sleep(self.base_latency + (tokens + output_tokens * 4) * self.per_token)
+
+    async def extract_transaction(self, text: str) -> dict:
+        await self._call(self.processor.send_text_prompt.format(text=text), 150)
+        return self.output_parser.parse(json.dumps(FAKE_TRANSACTION))
+
+    async def send_batch(self, texts) -> str:
+        blocks = "\n".join(f"### Begin Message {i} ###\n{t}\n### End Message {i} ###" for i, t in enumerate(texts))
+        await self._call(self.processor.send_batch_prompt.format(texts=blocks), 150 * len(texts))
+        return json.dumps([dict(FAKE_TRANSACTION, index=i) for i in range(len(texts))])
+
+
+async def burst(args, receipts, target, extractor):
+    """Push ``receipts`` from one sender through a JobQueue; returns (wall time, results)."""
+    rng = random.Random(0)
+    results = []
+
+    async def handle(job):
+        text = receipts[job.payload["index"]]
+        if extractor is None:
+            await asyncio.sleep(args.ocr + rng.random() * args.ocr_jitter)
+            results.append(await target.extract_transaction(text))
+            return
+        with extractor.receipt(SENDER):
+            await asyncio.sleep(args.ocr + rng.random() * args.ocr_jitter)
+            results.append(await extractor.extract(text, SENDER))
+
+    queue = JobQueue(workers=args.workers, maxsize=len(receipts))
+    queue.register(IMAGE_JOB, handle)
+    await queue.start()
+    start = time.perf_counter()
+    for index in range(len(receipts)):
+        await queue.enqueue(IMAGE_JOB, image_job_key(SENDER, f"msg-{index}"), {"index": index})
+    while len(results) < len(receipts) and queue.stats()["failed"] == 0:
+        await asyncio.sleep(0.005)
+    elapsed = time.perf_counter() - start
+    await queue.stop()
+    return elapsed, results
+
+
+async def run(args):
+    processor = OpenAIProcessor()
+    receipts = (SAMPLE_RECEIPTS * (args.receipts // len(SAMPLE_RECEIPTS) + 1))[:args.receipts]
+
+    def make_target():
+        if args.live:
+            return processor
+        return SimulatedProcessor(processor, args.base_latency, args.per_token)
+
+    single = make_target()
+    single_time, _ = await burst(args, receipts, single, None)
+
+    batched = make_target()
+    extractor = BatchExtractor(batched, max_batch=args.max_batch, window=args.window)
+    batch_time, results = await burst(args, receipts, batched, extractor)
+    parsed = sum(isinstance(r, dict) for r in results)
+
+    print(f"{len(receipts)} receipts from one sender, {args.workers} workers, "
+          f"max batch {args.max_batch}, window {args.window}s")
+    if not args.live:
+        print(f"  single : {single.requests:3d} requests, {single.prompt_tokens:6d} prompt tokens, {single_time:.2f}s")
+        print(f"  batched: {batched.requests:3d} requests, {batched.prompt_tokens:6d} prompt tokens, {batch_time:.2f}s")
+        print(f"  prompt tokens per receipt: {single.prompt_tokens / len(receipts):.0f} -> "
+              f"{batched.prompt_tokens / len(receipts):.0f}")
+    else:
+        print(f"  single : {single_time:.2f}s, llm stats {processor.llm_client.stats()}")
+        print(f"  batched: {batch_time:.2f}s")
+    print(f"  extractor: {extractor.stats()}, {parsed}/{len(receipts)} results parsed")
+
+    if len(receipts) > 1 and args.workers > 1 and extractor.batches == 0:
+        print("FAIL: a burst from one sender was never batched")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--receipts", type=int, default=8)
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4, help="JOB_QUEUE_WORKERS")
+    parser.add_argument("--window", type=float, default=0.3, help="LLM_BATCH_WINDOW")
+    parser.add_argument("--ocr", type=float, default=0.6, help="simulated OCR time per receipt")
+    parser.add_argument("--ocr-jitter", type=float, default=0.4, help="extra random OCR time per receipt")
+    parser.add_argument("--base-latency", type=float, default=0.4, help="simulated fixed latency per request")
+    parser.add_argument("--per-token", type=float, default=0.0002, help="simulated latency per token")
+    parser.add_argument("--live", action="store_true", help="call OpenAI instead of simulating")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
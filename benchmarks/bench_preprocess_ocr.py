@@ -0,0 +1,99 @@
+"""
+Image preprocessing benchmark: payload size, OCR latency and OCR text
+equivalence for original vs preprocessed receipts.
+
+Every image in ``--images`` is OCR'd twice through the async Azure client,
+once as received and once after ``preprocess_image``. The texts are compared
+with a normalized similarity ratio; the run fails if any image falls below
+``--min-similarity``. Needs AZURE_OCR_ENDPOINT / AZURE_OCR_KEY in the env.
+
+    python benchmarks/bench_preprocess_ocr.py --images ./receipts --max-edge 1600
+"""
+import argparse
+import asyncio
+import difflib
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv()
+
+from app.shared.azure_ocr_service import AsyncAzureOCRService  # noqa: E402
+from app.shared.image_preprocessing import PreprocessOptions, preprocess_image  # noqa: E402
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+async def timed_ocr(ocr: AsyncAzureOCRService, data: bytes):
+    start = time.perf_counter()
+    text = await ocr.read_text_from_image_bytes(data)
+    return text, time.perf_counter() - start
+
+
+async def run(args):
+    options = PreprocessOptions(
+        grayscale=not args.color,
+        max_long_edge=args.max_edge,
+        format=args.format,
+        quality=args.quality
+    )
+    paths = sorted(p for p in Path(args.images).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    if not paths:
+        print(f"No images found in {args.images}")
+        return 1
+
+    ocr = AsyncAzureOCRService()
+    failures = 0
+    totals = {"orig_bytes": 0, "prep_bytes": 0, "orig_ocr": 0.0, "prep_ocr": 0.0, "prep_time": 0.0}
+    try:
+        for path in paths:
+            original = path.read_bytes()
+            start = time.perf_counter()
+            prepared = preprocess_image(original, options)
+            prep_time = time.perf_counter() - start
+
+            orig_text, orig_ocr = await timed_ocr(ocr, original)
+            prep_text, prep_ocr = await timed_ocr(ocr, prepared)
+            similarity = difflib.SequenceMatcher(None, normalize(orig_text), normalize(prep_text)).ratio()
+            ok = similarity >= args.min_similarity
+            failures += not ok
+
+            totals["orig_bytes"] += len(original)
+            totals["prep_bytes"] += len(prepared)
+            totals["orig_ocr"] += orig_ocr
+            totals["prep_ocr"] += prep_ocr
+            totals["prep_time"] += prep_time
+            print(f"{'OK ' if ok else 'BAD'} {path.name}: {len(original) / 1024:7.1f} KB -> {len(prepared) / 1024:7.1f} KB, "
+                  f"OCR {orig_ocr:5.2f}s -> {prep_ocr:5.2f}s (+{prep_time * 1000:.0f} ms prep), similarity {similarity:.3f}")
+    finally:
+        await ocr.aclose()
+
+    n = len(paths)
+    print(f"\n{n} images, payload {totals['prep_bytes'] / totals['orig_bytes']:.2%} of original, "
+          f"mean OCR {totals['orig_ocr'] / n:.2f}s -> {totals['prep_ocr'] / n:.2f}s, "
+          f"mean preprocessing {totals['prep_time'] / n * 1000:.0f} ms, {failures} below similarity threshold")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", required=True, help="directory of receipt images")
+    parser.add_argument("--max-edge", type=int, default=1600)
+    parser.add_argument("--format", choices=["JPEG", "WEBP"], default="JPEG")
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--color", action="store_true", help="keep colour instead of converting to grayscale")
+    parser.add_argument("--min-similarity", type=float, default=0.95)
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Reply latency per receipt image with the LLM summary (``REPLY_MODE=llm``,
+old flow) vs the local ``ReplyRenderer`` templates (``REPLY_MODE=template``).
+
+OCR, extraction and Mongo are simulated with sleeps in the same stage DAG
+as ``handle_image``; LLM calls are sleeps of ``--llm`` seconds behind a
+semaphore of ``--llm-concurrency`` (like ``AsyncLLMClient``), the template
+reply is the real renderer on synthetic receipts. Also reports the raw
+render time.
+
+    python benchmarks/bench_replies.py --images 30 --llm 1.2 --language en
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.shared.pipeline import StagePipeline  # noqa: E402
+from app.domains.transactions.replies import ReplyRenderer  # noqa: E402
+
+ITEMS = ["Nasi goreng", "Es teh manis", "Ayam bakar", "Kopi susu", "Roti bakar", "Air mineral", "Sate ayam"]
+SOURCES = ["Warung Makan Sederhana", "Indomaret", "Kopi Kenangan", None]
+
+
+def receipt(rng: random.Random) -> dict:
+    items = [
+        {"name": rng.choice(ITEMS), "price": rng.randrange(5, 60) * 1000, "quantity": rng.randint(1, 3)}
+        for _ in range(rng.randint(1, 9))
+    ]
+    return {
+        "type": "expense",
+        "amount": sum(item["price"] * item["quantity"] for item in items),
+        "date": "2025-04-14",
+        "time": "12:30",
+        "category": "Food_and_drinks",
+        "source": rng.choice(SOURCES),
+        "items": items,
+    }
+
+
+async def handle(args, renderer: ReplyRenderer, llm: asyncio.Semaphore, transaction: dict, llm_reply: bool) -> float:
+    def sleep(seconds, value=None):
+        async def stage(results):
+            await asyncio.sleep(seconds)
+            return value
+        return stage
+
+    async def call_llm(value):
+        # Sama seperti AsyncLLMClient: jumlah request LLM paralel dibatasi
+        async with llm:
+            await asyncio.sleep(args.llm)
+        return value
+
+    async def extract(results):
+        return await call_llm(transaction)
+
+    async def reply(results):
+        if llm_reply:
+            return await call_llm("summary")
+        return renderer.render(results["extract"])
+
+    pipeline = (
+        StagePipeline()
+        .stage("ocr", sleep(args.ocr))
+        .stage("extract", extract, after=["ocr"])
+        .stage("reply", reply, after=["ocr"] if llm_reply else ["extract"])
+        .stage("save_user_message", sleep(args.db), after=["extract"])
+        .stage("dedupe", sleep(args.db), after=["extract"])
+        .stage("store", sleep(args.db * 3), after=["dedupe"])
+        .stage("save_reply", sleep(args.db), after=["save_user_message", "store", "reply"])
+    )
+    start = time.perf_counter()
+    await pipeline.run()
+    return time.perf_counter() - start
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    renderer = ReplyRenderer(args.language)
+    receipts = [receipt(rng) for _ in range(args.images)]
+
+    start = time.perf_counter()
+    for transaction in receipts * 100:
+        renderer.render(transaction)
+    render_us = (time.perf_counter() - start) / (len(receipts) * 100) * 1e6
+
+    for mode, llm_reply in (("llm", True), ("template", False)):
+        llm = asyncio.Semaphore(args.llm_concurrency)
+        latencies = sorted(await asyncio.gather(*(handle(args, renderer, llm, t, llm_reply) for t in receipts)))
+        print(f"{mode:>8}: reply p50 {latencies[len(latencies) // 2] * 1000:7.1f} ms, "
+              f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:7.1f} ms, "
+              f"LLM calls per image {2 if llm_reply else 1}")
+    print(f"render: {render_us:.1f} us per receipt\n\nexample:\n{renderer.render(receipts[0])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=30)
+    parser.add_argument("--ocr", type=float, default=0.6, help="simulated OCR time")
+    parser.add_argument("--llm", type=float, default=1.2, help="simulated time per LLM call")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="LLM_MAX_CONCURRENCY")
+    parser.add_argument("--db", type=float, default=0.02, help="simulated Mongo round-trip")
+    parser.add_argument("--language", default="id", choices=["id", "en"])
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
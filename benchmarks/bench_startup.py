@@ -0,0 +1,128 @@
+"""
+Cold-start budget: import time of the app module and time to first response.
+
+Runs ``python -X importtime -c "import main"`` in fresh interpreters, parses
+the per-module report and fails (exit code 1) when the median import time
+exceeds ``--budget-ms`` or when a module that must load lazily (LangChain,
+the Azure, Cloudinary and Motor SDKs, requests) shows up at import time.
+
+With ``--serve`` it also starts ``uvicorn main:app`` and polls ``/healthz``
+until the first 200, checked against ``--ready-budget-ms``. That needs the
+real ``.env`` (startup connects to Mongo).
+
+    python benchmarks/bench_startup.py --runs 5 --budget-ms 800
+    python benchmarks/bench_startup.py --serve --ready-budget-ms 1000
+"""
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAZY_MODULES = ("langchain", "langchain_core", "langchain_community", "langchain_openai", "azure", "msrest", "cloudinary", "motor", "requests")
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def import_report(module: str):
+    """Return (cumulative_us of ``module``, [(self_us, name)], wall_s) for one fresh import."""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    entries, total = [], 0
+    for line in proc.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = int(match[1]), int(match[2]), match[3], match[4]
+        entries.append((self_us, name))
+        if name == module and len(indent) == 1:
+            total = cumulative_us
+    return total, entries, wall
+
+
+def time_to_first_response(timeout: float) -> float:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                raise SystemExit(f"uvicorn exited with code {proc.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/healthz", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise SystemExit(f"/healthz did not answer within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=800.0, help="median import time budget")
+    parser.add_argument("--top", type=int, default=15, help="heaviest top-level packages to list")
+    parser.add_argument("--serve", action="store_true", help="also measure time to first /healthz response")
+    parser.add_argument("--ready-budget-ms", type=float, default=1000.0)
+    args = parser.parse_args()
+
+    totals, walls = [], []
+    for _ in range(args.runs):
+        total, entries, wall = import_report(args.module)
+        totals.append(total / 1000)
+        walls.append(wall * 1000)
+
+    by_package = defaultdict(int)
+    for self_us, name in entries:
+        by_package[name.split(".")[0]] += self_us
+    print(f"heaviest packages (self time, last run):")
+    for package, self_us in sorted(by_package.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {package:<28} {self_us / 1000:8.1f} ms")
+
+    median = statistics.median(totals)
+    print(f"\nimport {args.module}: median {median:.1f} ms (min {min(totals):.1f}, max {max(totals):.1f}), "
+          f"interpreter + import wall {statistics.median(walls):.1f} ms, budget {args.budget_ms:.0f} ms")
+
+    failures = []
+    if median > args.budget_ms:
+        failures.append(f"import time {median:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+    eager = sorted({name.split(".")[0] for _, name in entries} & set(LAZY_MODULES))
+    if eager:
+        failures.append(f"loaded at import time but should be lazy: {', '.join(eager)}")
+
+    if args.serve:
+        ready = time_to_first_response(timeout=30) * 1000
+        print(f"time to first /healthz response: {ready:.1f} ms, budget {args.ready_budget_ms:.0f} ms")
+        if ready > args.ready_budget_ms:
+            failures.append(f"time to first response {ready:.1f} ms exceeds budget {args.ready_budget_ms:.0f} ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
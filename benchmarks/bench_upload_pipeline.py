@@ -0,0 +1,91 @@
+"""
+Reply latency for receipt images with the upload inline (old flow: upload,
+then insert, then reply) vs deferred through ``ImageUploadQueue``.
+
+Uses ``LocalDiskStorage`` with a simulated remote latency, so no Cloudinary
+account or Mongo is needed (the image_url patch is skipped without Mongo).
+``--fail-rate`` makes uploads fail randomly to exercise retries and the
+dead-letter path.
+
+    python benchmarks/bench_upload_pipeline.py --images 50 --upload-latency 0.8
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId  # noqa: E402
+from app.shared.storage import LocalDiskStorage  # noqa: E402
+from app.domains.transactions.upload_queue import ImageUploadQueue  # noqa: E402
+
+
+class FlakyStorage(LocalDiskStorage):
+    def __init__(self, root: str, latency: float, fail_rate: float):
+        super().__init__(root, latency=latency)
+        self.fail_rate = fail_rate
+
+    async def put(self, data, key=None) -> str:
+        if random.random() < self.fail_rate:
+            await asyncio.sleep(self.latency)
+            raise ConnectionError("simulated upload failure")
+        return await super().put(data, key)
+
+
+async def run(args):
+    image = memoryview(os.urandom(args.size_kb * 1024))
+    with tempfile.TemporaryDirectory() as root:
+        storage = FlakyStorage(root, args.upload_latency, args.fail_rate)
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def inline():
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    await storage.put(image)
+                except ConnectionError:
+                    pass
+                await asyncio.sleep(args.work)  # insert + reply
+                return time.perf_counter() - start
+
+        queue = ImageUploadQueue(storage, workers=args.workers, maxsize=args.images, max_attempts=3, backoff=0.05)
+        await queue.start()
+
+        async def deferred():
+            async with semaphore:
+                start = time.perf_counter()
+                await asyncio.sleep(args.work)  # insert + reply
+                await queue.submit(ObjectId(), image)
+                return time.perf_counter() - start
+
+        for label, fn in (("inline", inline), ("deferred", deferred)):
+            start = time.perf_counter()
+            latencies = sorted(await asyncio.gather(*(fn() for _ in range(args.images))))
+            reply_time = time.perf_counter() - start
+            if label == "deferred":
+                await queue.stop(timeout=60)
+            total = time.perf_counter() - start
+            print(f"{label:>8}: reply p50 {latencies[len(latencies) // 2] * 1000:7.1f} ms, "
+                  f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:7.1f} ms, "
+                  f"all replies in {reply_time:.2f}s, all uploads done in {total:.2f}s")
+        print(f"queue: {queue.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=50)
+    parser.add_argument("--size-kb", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8, help="job queue workers handling images")
+    parser.add_argument("--workers", type=int, default=4, help="upload workers")
+    parser.add_argument("--upload-latency", type=float, default=0.8)
+    parser.add_argument("--work", type=float, default=0.05, help="simulated insert + reply time")
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
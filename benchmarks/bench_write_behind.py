@@ -0,0 +1,117 @@
+"""
+Mongo round-trips and per-message write latency (time spent awaiting writes) for chat logs and user
+stats, written directly vs through ``WriteBehindBuffer``.
+
+Each simulated text message does what the webhook path does: insert the
+user turn, insert the bot turn and upsert the sender's user stats. The
+collection is simulated with a fixed round-trip time per operation, so the
+run needs no database and shows the number of operations sent.
+
+    python benchmarks/bench_write_behind.py --messages 2000 --senders 50 --rtt 0.002
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.shared.write_behind import WriteBehindBuffer  # noqa: E402
+
+
+class Result:
+    def __init__(self, inserted_ids=None):
+        self.inserted_ids = inserted_ids or []
+        self.matched_count = 0
+        self.upserted_count = 0
+
+
+class SimulatedCollection:
+    def __init__(self, name: str, rtt: float):
+        self.full_name = f"bench.{name}"
+        self.rtt = rtt
+        self.ops = 0
+
+    async def _round_trip(self):
+        self.ops += 1
+        await asyncio.sleep(self.rtt)
+
+    async def insert_one(self, doc):
+        await self._round_trip()
+
+    async def update_one(self, filter, update, upsert=False):
+        await self._round_trip()
+
+    async def insert_many(self, docs, ordered=True):
+        await self._round_trip()
+        return Result([doc["_id"] for doc in docs])
+
+    async def bulk_write(self, requests, ordered=True):
+        await self._round_trip()
+        result = Result()
+        result.matched_count = len(requests)
+        return result
+
+
+async def handle_message(buffer, chats, users, sender: str, work: float):
+    now = datetime.datetime.utcnow()
+    start = time.perf_counter()
+    await buffer.insert(chats, {"phone_number": sender, "role": "user", "message": "makan 25rb", "timestamp": now})
+    write_time = time.perf_counter() - start
+    await asyncio.sleep(work)  # parser / LLM di antara dua turn
+    start = time.perf_counter()
+    await buffer.insert(chats, {"phone_number": sender, "role": "bot", "message": "Transaksi berhasil disimpan.", "timestamp": now})
+    await buffer.update(users, {"phone_number": sender}, {
+        "$setOnInsert": {"first_seen": now},
+        "$set": {"last_active": now, "last_message": "makan 25rb"},
+        "$inc": {"total_messages": 1}
+    }, upsert=True)
+    return write_time + time.perf_counter() - start
+
+
+async def run_mode(write_behind: bool, args):
+    chats, users = SimulatedCollection("chats", args.rtt), SimulatedCollection("users", args.rtt)
+    buffer = WriteBehindBuffer(max_batch=args.max_batch, flush_interval=args.flush_interval)
+    if write_behind:
+        await buffer.start()
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(i):
+        async with semaphore:
+            return await handle_message(buffer, chats, users, f"62800{i % args.senders:04d}", args.work)
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(one(i) for i in range(args.messages)))
+    await buffer.stop()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    ops = chats.ops + users.ops
+    label = "write-behind" if write_behind else "direct"
+    print(f"{label:>12}: {ops:6d} Mongo ops ({ops / args.messages:.3f} per message), "
+          f"p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms, "
+          f"{args.messages / elapsed:.0f} msg/s")
+    if write_behind:
+        print(f"{'':>12}  {buffer.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--senders", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rtt", type=float, default=0.002, help="simulated Mongo round-trip in seconds")
+    parser.add_argument("--work", type=float, default=0.005, help="simulated processing time between turns")
+    parser.add_argument("--max-batch", type=int, default=200)
+    parser.add_argument("--flush-interval", type=float, default=0.25)
+    args = parser.parse_args()
+
+    for write_behind in (False, True):
+        asyncio.run(run_mode(write_behind, args))
+
+
+if __name__ == "__main__":
+    main()
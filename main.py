@@ -1,14 +1,11 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.domains.transactions.routes import router as transaction_router
+from app.container import Container
+from app.domains.transactions import routes as transaction_routes
 from app.domains.otp.routes import router as otp_router
-from app.shared.whatsapp_service import WhatsAppAPI  # Pastikan ini diimpor dengan benar
-from app.domains.otp.otp_service import OTPService
-from app.config.mongodb import mongodb
-from app.domains.users.service import UserService
 from app.config.setting import settings
 import logging
-import os
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -18,7 +15,21 @@ logging.basicConfig(
     format="%(asctime)s [%(levelname)s] %(name)s - %(message)s"
 )
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Satu container per proses worker; service dibagikan lewat Depends
+    logging.info(f"Allowed origins: {settings.parsed_origins}")
+    container = Container()
+    app.state.container = container
+    await container.startup()
+    try:
+        yield
+    finally:
+        await container.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # origins = settings.allowed_origins.split(",")
 
@@ -31,9 +42,6 @@ app = FastAPI()
 #     allow_headers=["*"],
 # )
 
-print("Allowed origins:", settings.parsed_origins)
-
-
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.parsed_origins,
@@ -42,38 +50,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.on_event("startup")
-async def startup():
-    # Inisialisasi WhatsAppAPI di sini untuk menghindari circular import
-    api_url = settings.whatsapp_api_url
-    session = settings.whatsapp_session
-    ENDPOINTS = {
-        "send_message": "/client/sendMessage/",
-        "status_typing": "/chat/sendStateTyping/",
-        "status_recording": "/chat/sendStateRecording/",
-        "download_media": "/message/downloadMedia/",
-    }
-    whatsapp_api = WhatsAppAPI(api_url, session, ENDPOINTS)
-    app.state.whatsapp_api = whatsapp_api  # Simpan objek ke state FastAPI
-
-    # Initialize MongoDB connection
-    try:
-        await mongodb.init_db()
-        collection = mongodb.db.transactions
-        count = await collection.count_documents({})
-        logging.info(f"MongoDB connected. Found {count} documents in 'transactions' collection.")
-    except Exception as e:
-        logging.error(f"MongoDB connection failed: {str(e)}")
-        raise
-        
-    app.state.user_service = UserService()
-    app.state.otp_service = OTPService(whatsapp_api)
-
-@app.on_event("shutdown")
-def shutdown_db():
-    mongodb.close()
+@app.get("/healthz")
+async def healthz():
+    # Siap melayani begitu lifespan startup selesai; "warm" = LLM/OCR sudah dimuat
+    return {"status": "ok", "warm": app.state.container.warm}
 
 
-app.include_router(transaction_router, prefix="/api", tags=["Transaction"])
+app.include_router(transaction_routes.router, prefix="/api", tags=["Transaction"])
 app.include_router(otp_router, prefix="/otp", tags=["OTP"])
 